@@ -1,5 +1,10 @@
 from __future__ import annotations
+import hashlib
+from typing import Any, Optional
+
+from jose import jwt
 from motor.core import AgnosticDatabase
+from odmantic import ObjectId
 
 from app.db.base import CRUDBase
 from app.auth.models import Token
@@ -8,46 +13,58 @@ from app.auth.schemas import RefreshTokenCreate, RefreshTokenUpdate
 from app.config import settings
 
 
+def hash_token(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
 class CRUDToken(CRUDBase[Token, RefreshTokenCreate, RefreshTokenUpdate]):
     # Everything is user-dependent
     async def create(
         self, db: AgnosticDatabase, *, obj_in: str, user_obj: User
     ) -> Token:
-        db_obj = await self.engine.find_one(self.model, self.model.token == obj_in)
-        if db_obj:
-            if db_obj.authenticates_id != user_obj.id:
-                raise ValueError("Token mismatch between key and user.")
-            return db_obj
-        else:
-            new_token = self.model(token=obj_in, authenticates_id=user_obj)
-            user_obj.refresh_tokens.append(new_token.id)
-            await self.engine.save_all([new_token, user_obj])
-            return new_token
-
-    async def get(self, *, user: User, token: str) -> Token:
+        # Minted by security.create_refresh_token just before, the claims are ours
+        claims = jwt.get_unverified_claims(obj_in)
+        db_obj = self.model(
+            token_hash=hash_token(obj_in), user_id=user_obj.id, family=claims["fam"]
+        )
+        await self.engine.get_collection(self.model).insert_one(db_obj.model_dump_doc())
+        return db_obj
+
+    async def get(self, db: AgnosticDatabase, *, token: str) -> Optional[Token]:
         return await self.engine.find_one(
-            User, ((User.id == user.id) & (User.refresh_tokens == token))
+            self.model, self.model.token_hash == hash_token(token)
         )
 
+    async def consume(self, db: AgnosticDatabase, *, token: str) -> Optional[Token]:
+        """Remove a refresh token so it cannot be used again, and return it.
+
+        None when it is unknown, already used, revoked or expired.
+        """
+        document = await self.engine.get_collection(self.model).find_one_and_delete(
+            {"token": hash_token(token)}
+        )
+        return self.model.model_validate_doc(document) if document else None
+
     async def get_multi(
-        self, *, user: User, page: int = 0, page_break: bool = False
+        self, db: AgnosticDatabase, *, user: User, page: int = 0, page_break: bool = False
     ) -> list[Token]:
         offset = (
             {"skip": page * settings.MULTI_MAX, "limit": settings.MULTI_MAX}
             if page_break
             else {}
         )
-        return await self.engine.find(
-            User, (User.refresh_tokens.in_([user.refresh_tokens])), **offset
-        )
+        return await self.engine.find(self.model, self.model.user_id == user.id, **offset)
 
     async def remove(self, db: AgnosticDatabase, *, db_obj: Token) -> None:
-        users = []
-        async for user in self.engine.find(User, User.refresh_tokens.in_([db_obj.id])):
-            user.refresh_tokens.remove(db_obj.id)
-            users.append(user)
-        await self.engine.save(users)
         await self.engine.delete(db_obj)
 
+    async def revoke_family(self, db: AgnosticDatabase, *, family: str) -> int:
+        result = await self.engine.get_collection(self.model).delete_many({"family": family})
+        return result.deleted_count
+
+    async def revoke_user(self, db: AgnosticDatabase, *, user_id: Any) -> int:
+        result = await self.engine.get_collection(self.model).delete_many({"user_id": ObjectId(user_id)})
+        return result.deleted_count
+
 
 token = CRUDToken(Token)
@@ -1,3 +1,6 @@
+from typing import Dict
+import time
+
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt
@@ -9,35 +12,125 @@ from app.auth import schemas
 from app.user import models
 from app.user import crud as user_crud
 from app.auth import crud as auth_crud
+from app.auth import models as auth_models
+from app.cache import TTLCache, get_cache_backend
 from app.config import settings
 from app.deps import get_db
 
 reusable_oauth2 = OAuth2PasswordBearer(tokenUrl=f"{settings.API_V1_STR}/auth/login/oauth")
 
 
-def get_token_payload(token: str) -> schemas.TokenPayload:
+# Access tokens already verified by this worker, by digest. Entries never
+# outlive the token, and are read-only for callers.
+verified_tokens = TTLCache(
+    maxsize=settings.TOKEN_CACHE_MAXSIZE, ttl=settings.TOKEN_CACHE_TTL_SECONDS
+)
+# Digest -> exp of the access tokens revoked before they expire, kept whole
+# rather than bounded, an evicted entry would make its token valid again
+revoked_tokens: Dict[str, float] = {}
+_revoked_prune_at = 1024
+
+
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_403_FORBIDDEN,
+        detail="Could not validate credentials",
+    )
+
+
+def _revoked_key(digest: str) -> str:
+    return f"revoked-token:{digest}"
+
+
+def _is_revoked(digest: str) -> bool:
+    expires = revoked_tokens.get(digest)
+    if expires is None:
+        return False
+    if expires <= time.time():
+        del revoked_tokens[digest]
+        return False
+    return True
+
+
+def _remember_revoked(digest: str, expires: float) -> None:
+    global _revoked_prune_at
+    revoked_tokens[digest] = expires
+    verified_tokens.pop(digest)
+    if len(revoked_tokens) >= _revoked_prune_at:
+        now = time.time()
+        for key in [k for k, v in revoked_tokens.items() if v <= now]:
+            del revoked_tokens[key]
+        _revoked_prune_at = max(1024, 2 * len(revoked_tokens))
+
+
+async def _revoked_elsewhere(digest: str, token_data: schemas.TokenPayload) -> bool:
+    """Whether another worker revoked the token, as recorded in the cache backend."""
+    if not await get_cache_backend().get(_revoked_key(digest)):
+        return False
+    _remember_revoked(digest, token_data.exp or time.time() + settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60)
+    return True
+
+
+async def get_token_payload(token: str) -> schemas.TokenPayload:
+    """Verify a token and return its claims.
+
+    Access tokens are verified once per worker and then served from
+    `verified_tokens` until they expire or TOKEN_CACHE_TTL_SECONDS pass.
+    With a shared CACHE_BACKEND the revocations of the other workers are
+    checked on every request, cached or not.
+    """
+    digest = auth_crud.hash_token(token)
+    if _is_revoked(digest):
+        raise _credentials_exception()
+    token_data = verified_tokens.get(digest)
+    if token_data is not None:
+        if settings.CACHE_BACKEND != "local" and await _revoked_elsewhere(digest, token_data):
+            raise _credentials_exception()
+        return token_data
     try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.JWT_ALGO])
         token_data = schemas.TokenPayload(**payload)
     except (jwt.JWTError, ValidationError):
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Could not validate credentials",
-        )
+        raise _credentials_exception()
+    if token_data.refresh:
+        # Used once and checked against the token store anyway
+        return token_data
+    if await _revoked_elsewhere(digest, token_data):
+        raise _credentials_exception()
+    ttl = settings.TOKEN_CACHE_TTL_SECONDS
+    if token_data.exp is not None:
+        ttl = min(ttl, token_data.exp - time.time())
+    if ttl > 0:
+        verified_tokens.set(digest, token_data, ttl)
     return token_data
 
 
-async def get_current_user(
-    db: AgnosticDatabase = Depends(get_db), token: str = Depends(reusable_oauth2)
-) -> models.User:
-    token_data = get_token_payload(token)
+async def revoke_access_token(token: str, token_data: schemas.TokenPayload) -> None:
+    """Refuse an access token from now on, until it would have expired anyway."""
+    digest = auth_crud.hash_token(token)
+    expires = token_data.exp or time.time() + settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60
+    _remember_revoked(digest, expires)
+    remaining = int(expires - time.time()) + 1
+    if remaining > 0:
+        await get_cache_backend().set(_revoked_key(digest), True, ttl=remaining)
+
+
+async def get_access_token_payload(token: str = Depends(reusable_oauth2)) -> schemas.TokenPayload:
+    token_data = await get_token_payload(token)
     if token_data.refresh or token_data.totp:
         # Refresh token is not a valid access token and TOTP True can only be used to validate TOTP
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Could not validate credentials",
         )
-    user = await user_crud.user.get(db, id=token_data.sub)
+    return token_data
+
+
+async def get_current_user(
+    db: AgnosticDatabase = Depends(get_db),
+    token_data: schemas.TokenPayload = Depends(get_access_token_payload),
+) -> models.User:
+    user = await user_crud.user.get_cached(db, id=token_data.sub)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     return user
@@ -55,32 +148,40 @@ def get_magic_token(token: str = Depends(reusable_oauth2)) -> schemas.MagicToken
     return token_data
 
 
-async def get_refresh_user(
+async def get_refresh_token(
     db: AgnosticDatabase = Depends(get_db), token: str = Depends(reusable_oauth2)
-) -> models.User | None:
-    token_data = get_token_payload(token)
+) -> auth_models.Token:
+    token_data = await get_token_payload(token)
     if not token_data.refresh:
         # Access token is not a valid refresh token
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Could not validate credentials",
         )
-    user = await user_crud.user.get(db, id=token_data.sub)
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    if not user_crud.user.is_active(user):
-        raise HTTPException(status_code=400, detail="Inactive user")
-    # Check and revoke this refresh token
-    token_obj = await auth_crud.token.get(token=token, user=user)
+    # A single point read that also revokes it, a refresh token is used once
+    token_obj = await auth_crud.token.consume(db, token=token)
     if not token_obj:
+        if token_data.fam:
+            # Signed by us but already used, someone else has a copy of it.
+            # Revoke the whole login, whoever holds its latest token included.
+            await auth_crud.token.revoke_family(db, family=token_data.fam)
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Could not validate credentials",
         )
-    await auth_crud.token.remove(db, db_obj=token_obj)
+    return token_obj
+
 
-    # Make sure to revoke all other refresh tokens
-    return await user_crud.user.get(db=db, id=token_data.sub)
+async def get_refresh_user(
+    db: AgnosticDatabase = Depends(get_db),
+    token_obj: auth_models.Token = Depends(get_refresh_token),
+) -> models.User:
+    user = await user_crud.user.get_cached(db, id=token_obj.user_id)
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    if not user_crud.user.is_active(user):
+        raise HTTPException(status_code=400, detail="Inactive user")
+    return user
 
 
 async def get_current_active_user(
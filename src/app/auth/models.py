@@ -1,13 +1,37 @@
 from __future__ import annotations
+from datetime import datetime
 
-from odmantic import Reference
+from odmantic import Field, ObjectId
+import pymongo
 
+from app.config import settings
 from app.db.base_class import Base
 
-from app.user.models import User
+
+def datetime_utcnow_sec():
+    # The TTL index compares against UTC
+    return datetime.utcnow().replace(microsecond=0)
 
 
-# Consider reworking to consolidate information to a userId. This may not work well
 class Token(Base):
-    token: str
-    authenticates_id: User = Reference()
+    """A refresh token handed out to a user, only its hash is stored."""
+    # Stored under the key of the raw tokens it replaced, so the unique index carries over
+    token_hash: str = Field(key_name="token")
+    user_id: ObjectId
+    # Every token rotated from the same login, revoked together when one is replayed
+    family: str
+    created: datetime = Field(default_factory=datetime_utcnow_sec)
+
+    model_config = {
+        "indexes": lambda: [
+            pymongo.IndexModel([("token", pymongo.ASCENDING)], unique=True, name="token_unique"),
+            pymongo.IndexModel([("user_id", pymongo.ASCENDING)], name="user_id"),
+            pymongo.IndexModel([("family", pymongo.ASCENDING)], name="family"),
+            # MongoDB removes tokens once they expire
+            pymongo.IndexModel(
+                [("created", pymongo.ASCENDING)],
+                expireAfterSeconds=settings.REFRESH_TOKEN_EXPIRE_SECONDS,
+                name="created_ttl",
+            ),
+        ]
+    }
@@ -1,5 +1,6 @@
 from fastapi import APIRouter, Depends, HTTPException, Body, Request
-from typing import Any
+from datetime import timedelta
+from typing import Any, Optional
 from motor.core import AgnosticDatabase
 from pydantic import EmailStr
 from fastapi.responses import JSONResponse
@@ -8,9 +9,11 @@ from app.config import settings
 from app.deps import get_db
 from app.user import crud
 from app.auth import crud as auth_crud
+from app.auth import models as auth_models
+from app.user.models import User
 from app.auth import security, deps
-from app.auth.service import send_email_validation_email, send_reset_password_email
-from app.auth.schemas import EmailValidation, Token
+from app.jobs.crud import job
+from app.auth.schemas import EmailValidation, Token, TokenPayload
 from authlib.integrations.starlette_client import OAuth
 
 router = APIRouter(
@@ -142,6 +145,44 @@ async def login_with_oauth2_email(
     }
 
 
+@router.post("/refresh", response_model=Token)
+async def refresh_token(
+    db: AgnosticDatabase = Depends(get_db),
+    token_obj: auth_models.Token = Depends(deps.get_refresh_token),
+    user: User = Depends(deps.get_refresh_user),
+) -> Any:
+    """
+    Exchange a refresh token for a new access token and refresh token, each refresh token works once.
+    """
+    refresh_token = security.create_refresh_token(subject=user.id, family=token_obj.family)
+    await auth_crud.token.create(db=db, obj_in=refresh_token, user_obj=user)
+    return {
+        "access_token": security.create_access_token(subject=user.id),
+        "refresh_token": refresh_token,
+        "token_type": "bearer",
+    }
+
+
+@router.post("/logout")
+async def logout(
+    *,
+    db: AgnosticDatabase = Depends(get_db),
+    token: str = Depends(deps.reusable_oauth2),
+    token_data: TokenPayload = Depends(deps.get_access_token_payload),
+    current_user: User = Depends(deps.get_current_user),
+    refresh_token: Optional[str] = Body(None, embed=True),
+) -> JSONResponse:
+    """
+    Revoke the access token, and the login the refresh token belongs to when one is given.
+    """
+    await deps.revoke_access_token(token, token_data)
+    if refresh_token:
+        token_obj = await auth_crud.token.get(db, token=refresh_token)
+        if token_obj and token_obj.user_id == current_user.id:
+            await auth_crud.token.revoke_family(db, family=token_obj.family)
+    return JSONResponse(status_code=200, content={"message": "Logged out successfully"})
+
+
 @router.post("/verify/email")
 async def verify_email(
     *,
@@ -193,7 +234,7 @@ async def resend_code(
 
     # send email verifiication to email
     if settings.EMAILS_ENABLED and email:
-        send_email_validation_email(email_data)
+        await job.enqueue(db, "email.validation", email_data.model_dump())
 
     return JSONResponse(
         status_code=200, content={"message": "Verification code resent successfully"}
@@ -207,9 +248,16 @@ async def recover_password(email: str, db: AgnosticDatabase = Depends(get_db)) -
     """
     user = await crud.user.get_by_email(db, email=email)
     if user and crud.user.is_active(user):
-        tokens = security.create_magic_tokens(subject=user.id)
+        # Valid for as long as the reset email says
+        tokens = security.create_magic_tokens(
+            subject=user.id, expires_delta=timedelta(hours=settings.EMAIL_RESET_TOKEN_EXPIRE_HOURS)
+        )
         if settings.EMAILS_ENABLED:
-            send_reset_password_email(email_to=user.email, email=email, token=tokens[0])
+            await job.enqueue(
+                db,
+                "email.reset_password",
+                {"email_to": user.email, "email": email, "token": tokens[0]},
+            )
             return JSONResponse(
                 status_code=200,
                 content={
@@ -243,8 +291,6 @@ async def reset_password(
         raise HTTPException(
             status_code=400, detail="Password update failed; invalid claim."
         )
-    # Update the password
-    hashed_password = security.get_password_hash(new_password)
-    user.hashed_password = hashed_password
-    await user.save()
+    # Update the password, this also drops the user from the auth cache
+    await crud.user.update(db, db_obj=user, obj_in={"password": new_password})
     return {"msg": "Password updated successfully."}
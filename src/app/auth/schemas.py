@@ -31,6 +31,9 @@ class TokenPayload(BaseModel):
     sub: Optional[ObjectId] = None
     refresh: Optional[bool] = False
     totp: Optional[bool] = False
+    # Refresh tokens only, the login the token descends from
+    fam: Optional[str] = None
+    exp: Optional[int] = None
 
 
 class MagicTokenPayload(BaseModel):
@@ -1,6 +1,10 @@
 from datetime import datetime, timedelta
-from typing import Any, Union, Optional
+from typing import Any, Callable, Union, Optional
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import functools
 
+from fastapi import HTTPException
 from jose import jwt
 from passlib.context import CryptContext
 from passlib.totp import TOTP
@@ -26,6 +30,12 @@ Specifies minimum criteria:
 pwd_context = CryptContext(
     schemes=["argon2", "bcrypt"], deprecated="auto"
 )  # current defaults: $argon2id$v=19$m=65536,t=3,p=4, "bcrypt" is deprecated
+# Argon2 is deliberately slow, hashing runs on its own small pool so it never
+# blocks the event loop, and is refused outright once too much work is queued
+_hashing_executor = ThreadPoolExecutor(
+    max_workers=settings.PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash"
+)
+_hashing_pending = 0
 totp_factory = TOTP.using(
     secrets={"1": settings.TOTP_SECRET_KEY},
     issuer=settings.SERVER_NAME,
@@ -45,7 +55,8 @@ def create_access_token(
         expire = datetime.utcnow() + timedelta(
             seconds=settings.ACCESS_TOKEN_EXPIRE_MINUTES
         )
-    to_encode = {"exp": expire, "sub": str(subject), "totp": force_totp}
+    # jti keeps tokens minted in the same second apart, so one can be revoked alone
+    to_encode = {"exp": expire, "sub": str(subject), "totp": force_totp, "jti": uuid.uuid4().hex}
     encoded_jwt = jwt.encode(
         to_encode, settings.SECRET_KEY, algorithm=settings.JWT_ALGO
     )
@@ -54,15 +65,26 @@ def create_access_token(
 
 
 def create_refresh_token(
-    *, subject: Union[str, Any], expires_delta: timedelta | None = None
+    *,
+    subject: Union[str, Any],
+    expires_delta: timedelta | None = None,
+    family: str | None = None,
 ) -> str:
+    """A new refresh token, in `family` when rotated from an earlier one, else in a new family."""
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
     else:
         expire = datetime.utcnow() + timedelta(
             seconds=settings.REFRESH_TOKEN_EXPIRE_SECONDS
         )
-    to_encode = {"exp": expire, "sub": str(subject), "refresh": True}
+    to_encode = {
+        "exp": expire,
+        "sub": str(subject),
+        "refresh": True,
+        "fam": family or uuid.uuid4().hex,
+        # Tokens rotated within the same second would otherwise be identical
+        "jti": uuid.uuid4().hex,
+    }
     encoded_jwt = jwt.encode(
         to_encode, settings.SECRET_KEY, algorithm=settings.JWT_ALGO
     )
@@ -128,6 +150,34 @@ def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 
+async def _run_hashing(fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    global _hashing_pending
+    if _hashing_pending >= settings.PASSWORD_HASH_QUEUE_MAX:
+        raise HTTPException(
+            status_code=503,
+            detail="Too many password checks in progress, please try again shortly",
+            headers={"Retry-After": "1"},
+        )
+    _hashing_pending += 1
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            _hashing_executor, functools.partial(fn, *args, **kwargs)
+        )
+    finally:
+        _hashing_pending -= 1
+
+
+async def verify_password_hash_async(*, plain_password: str, hashed_password: str) -> bool:
+    return await _run_hashing(
+        verify_password_hash, plain_password=plain_password, hashed_password=hashed_password
+    )
+
+
+async def get_password_hash_async(password: str) -> str:
+    return await _run_hashing(get_password_hash, password)
+
+
 def create_verification_pin() -> str:
     return str(uuid.uuid4())[:5]
 
@@ -1,8 +1,16 @@
-from pathlib import Path
+from typing import Any, Dict, List, Tuple
 
 from app.config import settings
 from app.auth.schemas import EmailContent, EmailValidation
-from app.utilities import send_email
+from app.mail import get_mail_service
+
+
+def send_template_email(
+    email_to: str, subject: str, template_name: str, environment: Dict[str, Any]
+) -> None:
+    assert settings.EMAILS_ENABLED, "no provided configuration for email variables"
+    mail_service = get_mail_service()
+    mail_service.send(mail_service.render(email_to, subject, template_name, environment))
 
 
 def send_email_validation_email(data: EmailValidation) -> None:
@@ -10,24 +18,20 @@ def send_email_validation_email(data: EmailValidation) -> None:
     server_host = settings.SERVER_HOST
     verify_route = settings.EMAILS_VERIFICATION_ROUTE
     link = f"{server_host}{verify_route}?token={data.token}"  # Todo change this
-    with open(Path(settings.EMAIL_TEMPLATES_DIR) / "confirm_email.html") as f:
-        template_str = f.read()
-    send_email(
+    send_template_email(
         email_to=data.email,
-        subject_template=subject,
-        html_template=template_str,
+        subject=subject,
+        template_name="confirm_email.html",
         environment={"link": link},
     )
 
 
 def send_web_contact_email(data: EmailContent) -> None:
     subject = f"{settings.PROJECT_NAME} - {data.subject}"
-    with open(Path(settings.EMAIL_TEMPLATES_DIR) / "web_contact_email.html") as f:
-        template_str = f.read()
-    send_email(
+    send_template_email(
         email_to=settings.EMAILS_TO_EMAIL,
-        subject_template=subject,
-        html_template=template_str,
+        subject=subject,
+        template_name="web_contact_email.html",
         environment={"content": data.content, "email": data.email},
     )
 
@@ -35,12 +39,10 @@ def send_web_contact_email(data: EmailContent) -> None:
 def send_test_email(email_to: str) -> None:
     project_name = settings.PROJECT_NAME
     subject = f"{project_name} - Test email"
-    with open(Path(settings.EMAIL_TEMPLATES_DIR) / "test_email.html") as f:
-        template_str = f.read()
-    send_email(
+    send_template_email(
         email_to=email_to,
-        subject_template=subject,
-        html_template=template_str,
+        subject=subject,
+        template_name="test_email.html",
         environment={"project_name": settings.PROJECT_NAME, "email": email_to},
     )
 
@@ -48,17 +50,15 @@ def send_test_email(email_to: str) -> None:
 def send_magic_login_email(email_to: str, token: str) -> None:
     project_name = settings.PROJECT_NAME
     subject = f"Your {project_name} magic login"
-    with open(Path(settings.EMAIL_TEMPLATES_DIR) / "magic_login.html") as f:
-        template_str = f.read()
     server_host = settings.SERVER_HOST
     link = f"{server_host}?magic={token}"
-    send_email(
+    send_template_email(
         email_to=email_to,
-        subject_template=subject,
-        html_template=template_str,
+        subject=subject,
+        template_name="magic_login.html",
         environment={
             "project_name": settings.PROJECT_NAME,
-            "valid_minutes": int(settings.ACCESS_TOKEN_EXPIRE_SECONDS / 60),
+            "valid_minutes": settings.ACCESS_TOKEN_EXPIRE_MINUTES,
             "link": link,
         },
     )
@@ -71,20 +71,18 @@ def send_reset_password_email(email_to: str, email: str, token: str) -> None:
     reset_route = settings.EMAILS_RESET_ROUTE
     project_name = settings.PROJECT_NAME
     subject = f"{project_name} - Password recovery for user {email}"
-    with open(Path(settings.EMAIL_TEMPLATES_DIR) / "reset_password.html") as f:
-        template_str = f.read()
     server_host = settings.SERVER_HOST
     # link = f"{server_host}/reset-password?token={token}"
     link = f"{server_host}{reset_route}?token={token}"  # Todo change this
-    send_email(
+    send_template_email(
         email_to=email_to,
-        subject_template=subject,
-        html_template=template_str,
+        subject=subject,
+        template_name="reset_password.html",
         environment={
             "project_name": settings.PROJECT_NAME,
             "username": email,
             "email": email_to,
-            "valid_hours": int(settings.ACCESS_TOKEN_EXPIRE_SECONDS / 60),
+            "valid_hours": settings.EMAIL_RESET_TOKEN_EXPIRE_HOURS,
             "link": link,
         },
     )
@@ -93,13 +91,11 @@ def send_reset_password_email(email_to: str, email: str, token: str) -> None:
 def send_new_account_email(email_to: str, username: str, password: str) -> None:
     project_name = settings.PROJECT_NAME
     subject = f"{project_name} - New account for user {username}"
-    with open(Path(settings.EMAIL_TEMPLATES_DIR) / "new_account.html") as f:
-        template_str = f.read()
     link = settings.SERVER_HOST
-    send_email(
+    send_template_email(
         email_to=email_to,
-        subject_template=subject,
-        html_template=template_str,
+        subject=subject,
+        template_name="new_account.html",
         environment={
             "project_name": settings.PROJECT_NAME,
             "username": username,
@@ -108,3 +104,28 @@ def send_new_account_email(email_to: str, username: str, password: str) -> None:
             "link": link,
         },
     )
+
+
+def send_project_funded_batch(
+    project_id: str, project_title: str, amount: int, backers: List[Tuple[str, str]]
+) -> List[str]:
+    """Tell a batch of backers, as `(email, name)`, that the project reached its goal.
+
+    The batch goes out over one pooled connection. Returns the addresses
+    that were refused, raises MailBatchError, which carries the mails sent
+    already, when the connection itself fails.
+    """
+    assert settings.EMAILS_ENABLED, "no provided configuration for email variables"
+    mail_service = get_mail_service()
+    subject = f"{settings.PROJECT_NAME} - {project_title} is funded"
+    link = f"{settings.SERVER_HOST}/projects/{project_id}"
+    mails = [
+        mail_service.render(
+            email,
+            subject,
+            "project_funded.html",
+            {"project_title": project_title, "amount": amount, "backer_name": name, "link": link},
+        )
+        for email, name in backers
+    ]
+    return [mail.email_to for mail, _ in mail_service.send_batch(mails)]
@@ -0,0 +1,44 @@
+from typing import Optional
+
+from app.cache import broadcast
+from app.cache.base import CacheBackend
+from app.cache.local import LocalCacheBackend, TTLCache
+from app.cache.redis import RedisCacheBackend
+from app.config import settings
+
+__all__ = [
+    "CacheBackend",
+    "LocalCacheBackend",
+    "RedisCacheBackend",
+    "TTLCache",
+    "close_cache_backend",
+    "get_cache_backend",
+]
+
+_cache_backend: Optional[CacheBackend] = None
+
+
+def get_cache_backend() -> CacheBackend:
+    global _cache_backend
+    if _cache_backend is None:
+        if settings.CACHE_BACKEND == "redis":
+            _cache_backend = RedisCacheBackend(
+                settings.CACHE_URL,
+                ttl=settings.CACHE_DEFAULT_TTL_SECONDS,
+                prefix=settings.CACHE_KEY_PREFIX,
+                timeout=settings.CACHE_TIMEOUT_SECONDS,
+            )
+        else:
+            _cache_backend = LocalCacheBackend(
+                maxsize=settings.CACHE_MAXSIZE, ttl=settings.CACHE_DEFAULT_TTL_SECONDS
+            )
+            broadcast.subscribe("key", _cache_backend.drop_key)
+            broadcast.subscribe("tag", _cache_backend.drop_tag)
+    return _cache_backend
+
+
+async def close_cache_backend() -> None:
+    global _cache_backend
+    if _cache_backend is not None:
+        await _cache_backend.close()
+        _cache_backend = None
@@ -0,0 +1,27 @@
+from typing import Any, Iterable, Optional
+
+
+class CacheBackend:
+    """Interface of the shared cache.
+
+    Values must be JSON serializable and are to be treated as read-only by
+    callers. Entries can carry tags, and `invalidate_tags` drops every entry
+    carrying any of the given tags.
+    """
+
+    async def get(self, key: str) -> Optional[Any]:
+        raise NotImplementedError
+
+    async def set(
+        self, key: str, value: Any, ttl: Optional[int] = None, tags: Iterable[str] = ()
+    ) -> None:
+        raise NotImplementedError
+
+    async def delete(self, *keys: str) -> None:
+        raise NotImplementedError
+
+    async def invalidate_tags(self, *tags: str) -> None:
+        raise NotImplementedError
+
+    async def close(self) -> None:
+        pass
@@ -0,0 +1,127 @@
+"""Cache invalidations shared between processes through MongoDB.
+
+The local cache backend and the user cache live in each process, the API
+workers and the job worker alike. A process that drops entries from them
+publishes what it dropped, and every API process polls for what the others
+published and drops the same entries.
+"""
+import asyncio
+import logging
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, Iterable, Optional, Set
+
+from bson import ObjectId
+from motor.core import AgnosticDatabase
+
+from app.cache.models import CacheInvalidation
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+COLLECTION = "cache_invalidation"
+# Entries written this long before a poll are looked at again, covering
+# clock skew between hosts and inserts still in flight
+_LOOKBACK = timedelta(seconds=5)
+
+ORIGIN = uuid.uuid4().hex
+_handlers: Dict[str, Callable[[str], None]] = {}
+# Strong references to running inserts, the event loop only keeps weak ones
+_pending: Set[asyncio.Task] = set()
+_listener: Optional[asyncio.Task] = None
+
+
+def enabled() -> bool:
+    return settings.CACHE_INVALIDATION_POLL_SECONDS > 0
+
+
+def subscribe(kind: str, handler: Callable[[str], None]) -> None:
+    """Have `handler` drop a key of `kind` when another process invalidates it."""
+    _handlers[kind] = handler
+
+
+def _database() -> AgnosticDatabase:
+    # Imported here, the session module pulls in the metrics middleware
+    from app.db.session import MongoDatabase
+
+    return MongoDatabase()
+
+
+async def _insert(kind: str, keys: list) -> None:
+    entry = CacheInvalidation(kind=kind, keys=keys, origin=ORIGIN)
+    try:
+        await _database()[COLLECTION].insert_one(entry.model_dump_doc())
+    except Exception:
+        logger.exception(f"Could not share the invalidation of {kind} {keys}")
+
+
+def publish(kind: str, keys: Iterable[str]) -> None:
+    """Tell the other processes to drop `keys`, the caller drops its own copies.
+
+    Written in the background, outside an event loop nothing is shared.
+    """
+    keys = [str(key) for key in keys]
+    if not keys or not enabled():
+        return
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return
+    task = loop.create_task(_insert(kind, keys))
+    _pending.add(task)
+    task.add_done_callback(_pending.discard)
+
+
+def apply(entry: Dict) -> None:
+    handler = _handlers.get(entry["kind"])
+    if handler is None:
+        return
+    for key in entry["keys"]:
+        handler(key)
+
+
+async def listen(db: AgnosticDatabase, interval: float) -> None:
+    """Apply the invalidations of the other processes every `interval` seconds."""
+    seen: Dict[ObjectId, float] = {}
+    since = datetime.now(timezone.utc)
+    while True:
+        await asyncio.sleep(interval)
+        polled = datetime.now(timezone.utc)
+        try:
+            cursor = db[COLLECTION].find(
+                {"_id": {"$gte": ObjectId.from_datetime(since - _LOOKBACK)}, "origin": {"$ne": ORIGIN}},
+                {"kind": 1, "keys": 1},
+            )
+            async for entry in cursor:
+                if entry["_id"] not in seen:
+                    seen[entry["_id"]] = time.monotonic()
+                    apply(entry)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Could not read the shared cache invalidations")
+            continue
+        since = polled
+        forget = time.monotonic() - 2 * _LOOKBACK.total_seconds() - interval
+        for entry_id in [entry_id for entry_id, at in seen.items() if at < forget]:
+            del seen[entry_id]
+
+
+def start(db: AgnosticDatabase) -> None:
+    global _listener
+    if enabled() and _listener is None:
+        _listener = asyncio.create_task(listen(db, settings.CACHE_INVALIDATION_POLL_SECONDS))
+
+
+async def stop() -> None:
+    global _listener
+    if _listener is not None:
+        _listener.cancel()
+        try:
+            await _listener
+        except asyncio.CancelledError:
+            pass
+        _listener = None
+    if _pending:
+        await asyncio.gather(*_pending, return_exceptions=True)
@@ -0,0 +1,97 @@
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterable, Optional, Set, Tuple
+import time
+
+from app.cache import broadcast
+from app.cache.base import CacheBackend
+
+
+class TTLCache:
+    """Size-bounded in-process LRU cache whose entries expire after `ttl` seconds.
+
+    Not shared between worker processes, keep the ttl short for anything
+    another process may change.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._data.get(key)
+        if entry is None:
+            return default
+        expires, value = entry
+        if expires <= time.monotonic():
+            del self._data[key]
+            return default
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        self._data[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def pop(self, key: Hashable) -> Any:
+        entry = self._data.pop(key, None)
+        return entry[1] if entry else None
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.get(key, _MISSING) is not _MISSING
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+_MISSING = object()
+
+
+class LocalCacheBackend(CacheBackend):
+    """In-process LRU backend, each worker process keeps its own copy.
+
+    Deletions and tag invalidations reach the other processes through
+    `app.cache.broadcast`, within CACHE_INVALIDATION_POLL_SECONDS.
+    """
+
+    def __init__(self, maxsize: int, ttl: int):
+        self._entries = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._tags: Dict[str, Set[str]] = {}
+
+    async def get(self, key: str) -> Optional[Any]:
+        return self._entries.get(key)
+
+    async def set(
+        self, key: str, value: Any, ttl: Optional[int] = None, tags: Iterable[str] = ()
+    ) -> None:
+        self._entries.set(key, value, ttl)
+        for tag in tags:
+            keys = self._tags.setdefault(tag, set())
+            keys.add(key)
+            if len(keys) > self._entries.maxsize:
+                # Forget keys that have since expired or been evicted
+                self._tags[tag] = {k for k in keys if k in self._entries}
+
+    async def delete(self, *keys: str) -> None:
+        for key in keys:
+            self.drop_key(key)
+        broadcast.publish("key", keys)
+
+    async def invalidate_tags(self, *tags: str) -> None:
+        for tag in tags:
+            self.drop_tag(tag)
+        broadcast.publish("tag", tags)
+
+    # Applied without sharing, for the invalidations another process shared
+
+    def drop_key(self, key: str) -> None:
+        self._entries.pop(key)
+
+    def drop_tag(self, tag: str) -> None:
+        for key in self._tags.pop(tag, ()):
+            self._entries.pop(key)
@@ -0,0 +1,34 @@
+from datetime import datetime
+from typing import List
+
+from odmantic import Field
+import pymongo
+
+from app.config import settings
+from app.db.base_class import Base
+
+
+def datetime_utcnow():
+    # The TTL index compares against UTC
+    return datetime.utcnow()
+
+
+class CacheInvalidation(Base):
+    """Entries a process dropped from its in-process caches, for the other processes to drop too."""
+    # What the keys are, such as "tag" or "user"
+    kind: str
+    keys: List[str]
+    # The process that wrote it, which has applied it already
+    origin: str
+    created: datetime = Field(default_factory=datetime_utcnow)
+
+    model_config = {
+        "indexes": lambda: [
+            # Only read shortly after being written
+            pymongo.IndexModel(
+                [("created", pymongo.ASCENDING)],
+                expireAfterSeconds=settings.CACHE_INVALIDATION_RETENTION_SECONDS,
+                name="created_ttl",
+            ),
+        ]
+    }
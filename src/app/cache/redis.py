@@ -0,0 +1,195 @@
+import asyncio
+import json
+import logging
+from typing import Any, Iterable, List, Optional, Tuple
+from urllib.parse import unquote, urlparse
+
+from app.cache.base import CacheBackend
+
+logger = logging.getLogger(__name__)
+
+
+class RedisError(Exception):
+    pass
+
+
+class _Connection:
+    """A single connection speaking RESP, the Redis wire protocol."""
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+        # False once an error left a reply partly read, the next reply read
+        # would be the rest of it
+        self.in_step = True
+
+    async def execute(self, *commands: Tuple[Any, ...]) -> List[Any]:
+        """Send the commands in one round trip and return their replies in order."""
+        buffer = []
+        for args in commands:
+            encoded = [arg if isinstance(arg, bytes) else str(arg).encode() for arg in args]
+            buffer.append(b"*%d\r\n" % len(encoded))
+            for arg in encoded:
+                buffer.append(b"$%d\r\n%s\r\n" % (len(arg), arg))
+        self.writer.write(b"".join(buffer))
+        await self.writer.drain()
+
+        replies = []
+        for _ in commands:
+            try:
+                replies.append(await self._read_reply())
+            except RedisError as e:
+                # Keep reading so the connection stays in step with the server
+                replies.append(e)
+        for reply in replies:
+            if isinstance(reply, RedisError):
+                raise reply
+        return replies
+
+    async def _read_reply(self) -> Any:
+        line = await self.reader.readline()
+        if not line:
+            raise ConnectionError("Connection closed by the cache server")
+        kind, payload = line[:1], line[1:-2]
+        if kind == b"+":
+            return payload.decode()
+        if kind == b"-":
+            raise RedisError(payload.decode())
+        if kind == b":":
+            return int(payload)
+        if kind == b"$":
+            length = int(payload)
+            if length == -1:
+                return None
+            data = await self.reader.readexactly(length + 2)
+            return data[:-2]
+        if kind == b"*":
+            length = int(payload)
+            if length == -1:
+                return None
+            items = []
+            for _ in range(length):
+                try:
+                    items.append(await self._read_reply())
+                except RedisError:
+                    # Such as a failed command inside an EXEC reply
+                    self.in_step = False
+                    raise
+            return items
+        raise RedisError(f"Unexpected reply from the cache server: {line!r}")
+
+    def close(self) -> None:
+        self.writer.close()
+
+
+class RedisCacheBackend(CacheBackend):
+    """Backend shared by every worker, talking to any Redis-protocol server.
+
+    Values are stored as JSON. A tag is a Redis set holding the keys of the
+    entries carrying it. Cache server failures are logged and treated as
+    misses so they never fail a request.
+    """
+
+    def __init__(
+        self, url: str, ttl: int, prefix: str = "", pool_size: int = 10, timeout: float = 1.0
+    ):
+        parsed = urlparse(url)
+        self.host = parsed.hostname or "localhost"
+        self.port = parsed.port or 6379
+        self.password = unquote(parsed.password) if parsed.password else None
+        self.database = int(parsed.path.lstrip("/") or 0)
+        self.ttl = ttl
+        self.prefix = prefix
+        self.timeout = timeout
+        self._pool: "asyncio.LifoQueue[_Connection]" = asyncio.LifoQueue()
+        self._slots = asyncio.Semaphore(pool_size)
+
+    async def _connect(self) -> _Connection:
+        reader, writer = await asyncio.open_connection(self.host, self.port)
+        connection = _Connection(reader, writer)
+        try:
+            if self.password:
+                await connection.execute(("AUTH", self.password))
+            if self.database:
+                await connection.execute(("SELECT", self.database))
+        except BaseException:
+            # Including the cancellation of a connect that timed out
+            connection.close()
+            raise
+        return connection
+
+    async def _execute(self, *commands: Tuple[Any, ...]) -> List[Any]:
+        async with self._slots:
+            if self._pool.empty():
+                connection = await asyncio.wait_for(self._connect(), self.timeout)
+            else:
+                connection = self._pool.get_nowait()
+            try:
+                replies = await asyncio.wait_for(connection.execute(*commands), self.timeout)
+            except RedisError:
+                if connection.in_step:
+                    self._pool.put_nowait(connection)
+                else:
+                    connection.close()
+                raise
+            except (OSError, ConnectionError, asyncio.IncompleteReadError, asyncio.TimeoutError):
+                # Replies may still be on their way, they would answer the next commands
+                connection.close()
+                raise
+            self._pool.put_nowait(connection)
+            return replies
+
+    async def _execute_safely(self, *commands: Tuple[Any, ...]) -> Optional[List[Any]]:
+        try:
+            return await self._execute(*commands)
+        except asyncio.TimeoutError:
+            logger.warning(f"Cache command {commands[0][0]} timed out after {self.timeout}s")
+            return None
+        except (OSError, ConnectionError, asyncio.IncompleteReadError, RedisError) as e:
+            logger.warning(f"Cache command {commands[0][0]} failed: {e}")
+            return None
+
+    def _key(self, key: str) -> str:
+        return f"{self.prefix}{key}"
+
+    def _tag_key(self, tag: str) -> str:
+        return f"{self.prefix}tag:{tag}"
+
+    async def get(self, key: str) -> Optional[Any]:
+        replies = await self._execute_safely(("GET", self._key(key)))
+        if not replies or replies[0] is None:
+            return None
+        return json.loads(replies[0])
+
+    async def set(
+        self, key: str, value: Any, ttl: Optional[int] = None, tags: Iterable[str] = ()
+    ) -> None:
+        ttl = self.ttl if ttl is None else ttl
+        commands = [("SET", self._key(key), json.dumps(value, separators=(",", ":")), "EX", ttl)]
+        for tag in tags:
+            commands.append(("SADD", self._tag_key(tag), self._key(key)))
+            # The tag must outlive the entries it points at
+            commands.append(("EXPIRE", self._tag_key(tag), max(ttl, self.ttl)))
+        await self._execute_safely(*commands)
+
+    async def delete(self, *keys: str) -> None:
+        if keys:
+            await self._execute_safely(("DEL", *(self._key(key) for key in keys)))
+
+    async def invalidate_tags(self, *tags: str) -> None:
+        for tag in tags:
+            # Read and drop the tag set in one transaction, a key added to it
+            # in between would otherwise be lost from the tag and outlive it
+            replies = await self._execute_safely(
+                ("MULTI",),
+                ("SMEMBERS", self._tag_key(tag)),
+                ("DEL", self._tag_key(tag)),
+                ("EXEC",),
+            )
+            members = replies[-1][0] if replies and replies[-1] else []
+            if members:
+                await self._execute_safely(("DEL", *members))
+
+    async def close(self) -> None:
+        while not self._pool.empty():
+            self._pool.get_nowait().close()
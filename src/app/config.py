@@ -27,6 +27,9 @@ class Settings(BaseSettings):
     API_V1_STR: str = "/api/v1"
     SECRET_KEY: str = secrets.token_urlsafe(32)
     SERVER_NAME: str
+    # Public address of the frontend, used for the links in emails
+    SERVER_HOST: str = "http://localhost:3000"
+    SERVER_BOT: str = "Ripple"
     JWT_ALGO: str = "HS512"
     TOTP_ALGO: Literal["sha1", "sha256"] = "sha256"
     # 60 minutes * 24 hours * 8 days = 8 days
@@ -36,7 +39,37 @@ class Settings(BaseSettings):
     ENVIRONMENT: Literal["local", "staging", "production"] = "local"
 
     TOTP_SECRET_KEY: str = secrets.token_urlsafe(32)
+    # Argon2 worker threads, and how many hash operations may wait before new ones are refused
+    PASSWORD_HASH_WORKERS: int = 4
+    PASSWORD_HASH_QUEUE_MAX: int = 64
+    # Resolved users are cached per worker for authenticated requests
+    USER_CACHE_TTL_SECONDS: int = 30
+    USER_CACHE_MAXSIZE: int = 4096
+    # Verified access tokens are cached per worker. Logouts reach the other
+    # workers through CACHE_BACKEND, with "local" they apply to the worker
+    # that served them only, run "redis" with more than one worker
+    TOKEN_CACHE_TTL_SECONDS: int = 60
+    TOKEN_CACHE_MAXSIZE: int = 10000
+
+    # Shared cache for hot read endpoints, "redis" shares it between workers
+    CACHE_BACKEND: Literal["local", "redis"] = "local"
+    CACHE_URL: str = "redis://localhost:6379/0"
+    CACHE_KEY_PREFIX: str = "ripple:"
+    CACHE_DEFAULT_TTL_SECONDS: int = 60
+    CACHE_MAXSIZE: int = 10000
+    # Longest wait for the cache server to connect or answer before it counts as a miss
+    CACHE_TIMEOUT_SECONDS: float = 1.0
+    # How often API processes apply the invalidations of the other processes,
+    # such as the job worker, to their in-process caches. 0 turns it off.
+    CACHE_INVALIDATION_POLL_SECONDS: float = 1.0
+    CACHE_INVALIDATION_RETENTION_SECONDS: int = 3600
+    # Per-route timings on GET /metrics and in Server-Timing response headers
+    METRICS_ENABLED: bool = True
+
     MULTI_MAX: int = 20
+    PAGINATION_MAX_LIMIT: int = 100
+    # Search is ranked, so it pages by offset, deep pages get expensive
+    SEARCH_MAX_OFFSET: int = 1000
 
     @computed_field  # type: ignore[misc]
     @property
@@ -60,15 +93,28 @@ class Settings(BaseSettings):
     MONGO_DRIVER_VERSION: str = "2023.11.10"
     MONGO_HOST: str | int = "cluster0.sqpr57z.mongodb.net/RippleProject"
 
+    # SMTP_TLS=True sends over a plain connection, as the python-emails setup did,
+    # SMTP_SSL only applies with SMTP_TLS=False
     SMTP_TLS: bool = True
     SMTP_SSL: bool = False
+    # Upgrade plain connections with STARTTLS, the relay must offer it
+    SMTP_STARTTLS: bool = False
     SMTP_PORT: int = 587
     SMTP_HOST: str | None = None
     SMTP_USER: str | None = None
     SMTP_PASSWORD: str | None = None
 
+    SMTP_POOL_SIZE: int = 4
+    # Longest wait on any one exchange with the relay, a stuck send fails the job after it
+    SMTP_TIMEOUT_SECONDS: float = 30.0
+
     EMAILS_FROM_EMAIL: str | None = None
     EMAILS_FROM_NAME: str | None = None
+    EMAILS_TO_EMAIL: str | None = None
+    EMAIL_TEMPLATES_DIR: str = "app/email-templates/build"
+    EMAILS_VERIFICATION_ROUTE: str = "/verify-email"
+    EMAILS_RESET_ROUTE: str = "/reset-password"
+    EMAIL_BATCH_SIZE: int = 50
 
     @model_validator(mode="after")
     def _set_default_emails_from(self) -> Self:
@@ -122,10 +168,31 @@ class Settings(BaseSettings):
     AWS_SECRET_ACCESS_KEY : str
     AWS_REGION : str
     AWS_S3_BUCKET_NAME : str
+    AWS_S3_ENDPOINT_URL: str | None = None
+
+    MEDIA_STORAGE_BACKEND: Literal["local", "s3"] = "local"
+    MEDIA_LOCAL_DIRECTORY: str = "./uploads"
+    MEDIA_MAX_UPLOAD_BYTES: int = 100 * 1024 * 1024
+    MEDIA_UPLOAD_CHUNK_BYTES: int = 1024 * 1024
+    MEDIA_URL_EXPIRE_SECONDS: int = 3600
+    MEDIA_DERIVATIVE_WORKERS: int = 2
+
+    JOB_MAX_ATTEMPTS: int = 5
+    # How long a claimed job stays hidden from other workers, renewed while it
+    # runs, so it only lapses when the worker running it is gone
+    JOB_VISIBILITY_TIMEOUT_SECONDS: int = 300
+    JOB_BACKOFF_BASE_SECONDS: int = 10
+    JOB_BACKOFF_MAX_SECONDS: int = 3600
+    JOB_POLL_INTERVAL_SECONDS: float = 1.0
+    JOB_WORKER_CONCURRENCY: int = 4
     
     YOUR_GOOGLE_MAPS_API_KEY: str
     
     PAYSTACK_SECRET_KEY: str
     PAYSTACK_BASE_URL : str
+    PAYSTACK_TIMEOUT_SECONDS: float = 10.0
+    PAYSTACK_MAX_CONNECTIONS: int = 20
+    PAYSTACK_MAX_CONCURRENCY: int = 20
+    PAYSTACK_MAX_RETRIES: int = 2
 
 settings = Settings()  # type: ignore
@@ -0,0 +1,51 @@
+from typing import Any, Dict, List, Optional, Tuple
+from motor.core import AgnosticDatabase
+from odmantic import ObjectId
+from odmantic.exceptions import DuplicateKeyError
+from app.db.base import CRUDBase
+from app.contribution.models import Contribution
+from app.contribution.schemas import ContributionCreate, ContributionUpdate
+from app.pagination import fetch_page
+
+
+class CRUDContribution(CRUDBase[Contribution, ContributionCreate, ContributionUpdate]):
+
+    async def add_contribution(
+        self,
+        db: AgnosticDatabase,
+        project_id: str,
+        backer_name: str,
+        backer: str,
+        amount: int,
+        reference: Optional[str] = None,
+    ) -> Optional[Contribution]:
+        """Record a contribution, returns None when the charge `reference` is already recorded."""
+        contribution = Contribution(
+            project_id=ObjectId(project_id),
+            backer_name=backer_name,
+            backer=backer,
+            amount=amount,
+            reference=reference,
+        )
+        try:
+            return await self.engine.save(contribution)
+        except DuplicateKeyError:
+            return None
+
+    async def get_project_contributions(
+        self, db: AgnosticDatabase, project_id: str, limit: int, cursor: Optional[str] = None
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        contribution_collection = db.contribution
+        documents, next_cursor = await fetch_page(
+            contribution_collection,
+            {"project_id": ObjectId(project_id)},
+            limit=limit,
+            cursor=cursor,
+            projection={"backer_name": 1, "amount": 1, "created": 1},
+        )
+        for document in documents:
+            document["id"] = str(document.pop("_id"))
+        return documents, next_cursor
+
+
+contribution = CRUDContribution(Contribution)
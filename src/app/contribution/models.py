@@ -0,0 +1,46 @@
+from __future__ import annotations
+from datetime import datetime
+from typing import Optional
+from pydantic import EmailStr
+from odmantic import ObjectId, Field
+import pymongo
+
+from app.db.base_class import Base
+
+
+def datetime_now_sec():
+    return datetime.now().replace(microsecond=0)
+
+
+class Contribution(Base):
+    project_id: ObjectId
+    backer_name: str = Field(default="")
+    backer: EmailStr
+    amount: int
+    created: datetime = Field(default_factory=datetime_now_sec)
+    # Paystack reference of the charge, contributions moved from the project
+    # documents have none
+    reference: Optional[str] = Field(default=None)
+    # Set on every contribution of a backer once the "project funded" mail reached them
+    funded_notified: bool = Field(default=False)
+
+    model_config = {
+        "indexes": lambda: [
+            # Supports paging through the backers of a single project, newest first
+            pymongo.IndexModel(
+                [
+                    ("project_id", pymongo.ASCENDING),
+                    ("created", pymongo.DESCENDING),
+                    ("_id", pymongo.DESCENDING),
+                ],
+                name="project_created_id",
+            ),
+            # A charge is recorded once, however often its webhook is delivered
+            pymongo.IndexModel(
+                [("reference", pymongo.ASCENDING)],
+                unique=True,
+                partialFilterExpression={"reference": {"$type": "string"}},
+                name="reference_unique",
+            ),
+        ]
+    }
@@ -0,0 +1,20 @@
+from pydantic import BaseModel, Field, EmailStr
+from datetime import datetime
+
+
+class ContributionCreate(BaseModel):
+    project_id: str = Field(description="Project ID", max_length=24)
+    backer_name: str = Field(default="")
+    backer: EmailStr
+    amount: int
+
+
+class ContributionUpdate(BaseModel):
+    backer_name: str = Field(default="")
+
+
+class ContributionOut(BaseModel):
+    id: str
+    backer_name: str = Field(default="")
+    amount: int
+    created: datetime
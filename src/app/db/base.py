@@ -1,9 +1,10 @@
-from typing import Any, Dict, Generic, Optional, Type, TypeVar, Union
+from typing import Any, Dict, Generic, Optional, Set, Type, TypeVar, Union
 
 from fastapi.encoders import jsonable_encoder
 from pydantic import BaseModel
 from motor.core import AgnosticDatabase
 from odmantic import AIOEngine, ObjectId
+from pymongo import ReturnDocument
 
 from app.db.base_class import Base
 from app.config import settings
@@ -56,18 +57,74 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         db_obj: ModelType,
         obj_in: Union[UpdateSchemaType, Dict[str, Any]],
     ) -> ModelType:
-        obj_data = jsonable_encoder(db_obj)
+        """Apply `obj_in` to `db_obj` and write only the fields whose value changed."""
         if isinstance(obj_in, dict):
             update_data = obj_in
         else:
             update_data = obj_in.model_dump(exclude_unset=True)
-        for field in obj_data:
-            if field in update_data:
-                setattr(db_obj, field, update_data[field])
-        # TODO: Check if this saves changes with the setattr calls
-        await self.engine.save(db_obj)
+        changed = set()
+        for field, value in update_data.items():
+            if field == "id" or field not in self.model.__odm_fields__:
+                continue
+            before = getattr(db_obj, field)
+            setattr(db_obj, field, value)
+            # Compared after assignment, which validates and coerces the value
+            if getattr(db_obj, field) != before:
+                changed.add(field)
+        if changed:
+            await self.engine.get_collection(self.model).update_one(
+                {"_id": db_obj.id}, self._update_document(db_obj, changed)
+            )
+        # Written or unchanged, a later engine.save need not write them again
+        db_obj.__fields_modified__.difference_update(update_data)
         return db_obj
 
+    def _update_document(self, db_obj: ModelType, fields: Set[str]) -> Dict[str, Any]:
+        """`$set` the given fields, `$unset` those cleared to a None default."""
+        doc = db_obj.model_dump_doc(include=fields)
+        update: Dict[str, Dict[str, Any]] = {}
+        for field in fields:
+            key = self._key(field)
+            model_field = self.model.model_fields[field]
+            if doc[key] is None and not model_field.is_required() and model_field.default is None:
+                update.setdefault("$unset", {})[key] = ""
+            else:
+                update.setdefault("$set", {})[key] = doc[key]
+        return update
+
+    def _key(self, field: str) -> str:
+        return self.model.__odm_fields__[field].key_name
+
+    async def increment(
+        self, db: AgnosticDatabase, *, id: Any, field: str, amount: int = 1
+    ) -> Optional[int]:
+        """Atomically add `amount` to a numeric field, returns the new value.
+
+        None when there is no such document.
+        """
+        key = self._key(field)
+        document = await self.engine.get_collection(self.model).find_one_and_update(
+            {"_id": ObjectId(id)},
+            {"$inc": {key: amount}},
+            projection={key: 1},
+            return_document=ReturnDocument.AFTER,
+        )
+        return document[key] if document else None
+
+    async def add_to_set(self, db: AgnosticDatabase, *, id: Any, field: str, value: Any) -> bool:
+        """Atomically add `value` to a list field unless already there, returns whether it was added."""
+        result = await self.engine.get_collection(self.model).update_one(
+            {"_id": ObjectId(id)}, {"$addToSet": {self._key(field): value}}
+        )
+        return result.modified_count == 1
+
+    async def pull(self, db: AgnosticDatabase, *, id: Any, field: str, value: Any) -> bool:
+        """Atomically remove `value` from a list field, returns whether it was there."""
+        result = await self.engine.get_collection(self.model).update_one(
+            {"_id": ObjectId(id)}, {"$pull": {self._key(field): value}}
+        )
+        return result.modified_count == 1
+
     async def remove(self, db: AgnosticDatabase, *, id: int) -> ModelType:
         obj = await self.model.get(id)
         if obj:
@@ -0,0 +1,127 @@
+"""Reconcile the indexes declared on the models with the database.
+
+Each model declares its indexes in `model_config["indexes"]`. `ensure_indexes`
+creates the missing ones and rebuilds those whose definition changed. It
+never drops an index the models do not declare, those are only reported,
+together with the declared indexes no query used since the server started.
+
+Run with `python -m app.db.indexes` to reconcile and print the report, or
+`python -m app.db.indexes --check` to only print it.
+"""
+import asyncio
+import logging
+import sys
+from typing import Any, Dict, List, Optional, Tuple
+
+import pymongo
+from odmantic import AIOEngine
+from odmantic.index import ODMBaseIndex
+from pymongo.errors import OperationFailure
+
+from app.auth.models import Token
+from app.cache.models import CacheInvalidation
+from app.contribution.models import Contribution
+from app.db.session import get_engine
+from app.featured.models import Featured
+from app.jobs.models import Job
+from app.payment.models import Payment, PaymentEvent
+from app.project.models import Project
+from app.user.models import User
+
+logger = logging.getLogger(__name__)
+
+INDEXED_MODELS = (
+    User, Token, Project, Contribution, Featured, Payment, PaymentEvent, Job, CacheInvalidation,
+)
+
+# Options that make two indexes with the same keys behave differently
+_COMPARED_OPTIONS = ("unique", "sparse", "expireAfterSeconds", "partialFilterExpression")
+
+
+def _declared_indexes(model) -> Dict[str, pymongo.IndexModel]:
+    indexes = {}
+    for index in model.__indexes__():
+        if isinstance(index, ODMBaseIndex):
+            index = index.get_pymongo_index()
+        indexes[index.document["name"]] = index
+    return indexes
+
+
+def _same_definition(declared: Dict[str, Any], existing: Dict[str, Any]) -> bool:
+    keys = list(declared["key"].items())
+    if any(direction == pymongo.TEXT for _, direction in keys):
+        # Text indexes are stored as `_fts`/`_ftsx`, compare their weights instead
+        weights = {field: 1 for field, direction in keys if direction == pymongo.TEXT}
+        weights.update(declared.get("weights", {}))
+        if weights != existing.get("weights"):
+            return False
+    elif [(field, int(direction)) for field, direction in keys] != [
+        (field, int(direction)) for field, direction in existing["key"]
+    ]:
+        return False
+    return all(declared.get(option) == existing.get(option) for option in _COMPARED_OPTIONS)
+
+
+async def _usage(collection) -> Dict[str, int]:
+    try:
+        stats = await collection.aggregate([{"$indexStats": {}}]).to_list(length=None)
+    except OperationFailure:
+        # Not allowed for this user or not supported by the server
+        return {}
+    return {stat["name"]: stat["accesses"]["ops"] for stat in stats}
+
+
+async def ensure_indexes(
+    engine: Optional[AIOEngine] = None, *, apply: bool = True
+) -> List[Tuple[str, str, str]]:
+    """Bring the indexes in line with the models, returns `(collection, index, status)` rows.
+
+    The status is one of `ok`, `created`, `rebuilt`, `missing`, `changed`,
+    `failed: <reason>`, `undeclared` or `unused`. `missing` and `changed`
+    are only reported when `apply` is false.
+    """
+    engine = engine or get_engine()
+    report = []
+    for model in INDEXED_MODELS:
+        collection = engine.get_collection(model)
+        existing = await collection.index_information()
+        usage = await _usage(collection)
+        declared = _declared_indexes(model)
+
+        for name, index in declared.items():
+            if name not in existing:
+                status = "missing"
+            elif not _same_definition(index.document, existing[name]):
+                status = "changed"
+            else:
+                status = "unused" if usage.get(name) == 0 else "ok"
+            if apply and status in ("missing", "changed"):
+                try:
+                    if status == "changed":
+                        await collection.drop_index(name)
+                    await collection.create_indexes([index])
+                    status = "created" if status == "missing" else "rebuilt"
+                except OperationFailure as e:
+                    # Such as a unique index over values that are already duplicated
+                    status = f"failed: {e.details.get('errmsg', e) if e.details else e}"
+            report.append((collection.name, name, status))
+
+        for name in existing:
+            if name != "_id_" and name not in declared:
+                report.append((collection.name, name, "undeclared"))
+    return report
+
+
+def log_report(report: List[Tuple[str, str, str]]) -> None:
+    for collection, name, status in report:
+        level = logging.WARNING if status not in ("ok", "created", "rebuilt") else logging.INFO
+        logger.log(level, f"{collection}.{name}: {status}")
+
+
+async def main() -> None:
+    log_report(await ensure_indexes(apply="--check" not in sys.argv))
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main())
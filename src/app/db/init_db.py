@@ -2,6 +2,7 @@ from motor.core import AgnosticDatabase
 
 from app.config import settings
 from app.user import crud, schemas
+from app.db.indexes import ensure_indexes, log_report
 
 
 async def init_db(db: AgnosticDatabase) -> None:
@@ -15,3 +16,6 @@ async def init_db(db: AgnosticDatabase) -> None:
             full_name=settings.FIRST_SUPERUSER,
         )
         user = await crud.user.create(db, obj_in=user_in)  # noqa: F841
+
+    # Create or update the indexes the models declare
+    log_report(await ensure_indexes())
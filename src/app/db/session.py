@@ -2,6 +2,7 @@ from motor import motor_asyncio, core
 from odmantic import AIOEngine
 from pymongo.driver_info import DriverInfo
 from app.config import settings
+from app.middlewares.metrics import MongoCommandListener
 
 DRIVER_INFO = DriverInfo(
     name="full-stack-fastapi-mongodb", version=f"{settings.MONGO_DRIVER_VERSION}"
@@ -20,6 +21,8 @@ class _MongoClientSingleton:
 
                 # f"{settings.MONGO_DATABASE_URI}://{settings.MONGO_USERNAME}:{settings.MONGO_PASSWORD}@{settings.MONGO_HOST}:27017/?authSource=admin&directConnection=true",  # noqa
                 driver=DRIVER_INFO,
+                # Counts the commands and their duration for the request metrics
+                event_listeners=[MongoCommandListener()],
             )
             cls.instance.engine = AIOEngine(
                 client=cls.instance.mongo_client,
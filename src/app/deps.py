@@ -1,5 +1,6 @@
 from typing import Generator
 
+from app.cache import CacheBackend, get_cache_backend
 from app.db.session import MongoDatabase
 
 
@@ -9,3 +10,7 @@ def get_db() -> Generator:
         yield db
     finally:
         pass
+
+
+def get_cache() -> CacheBackend:
+    return get_cache_backend()
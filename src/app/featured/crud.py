@@ -1,11 +1,13 @@
-from typing import List, Any
+from typing import List, Any, Dict
 from fastapi.exceptions import HTTPException
 from motor.core import AgnosticDatabase
 from odmantic import ObjectId
+from pymongo.errors import DuplicateKeyError
 from app.featured.models import Featured
 from app.featured.schemas import FeaturedCreate,FeatureUpdate
 from app.db.base import CRUDBase
 from app.project.models import Project
+from app.project.utils import build_projection, serialize_project
 
 
 class CRUDFeatured(CRUDBase[Featured,FeaturedCreate,FeatureUpdate]):
@@ -19,25 +21,31 @@ class CRUDFeatured(CRUDBase[Featured,FeaturedCreate,FeatureUpdate]):
         if is_featured:
             raise HTTPException(status_code=400, detail ="Project is already a featured project")
         
-        project_in = project_collection.find_one({"_id":ObjectId(featured_project["project_id"])})
+        project_in = await project_collection.find_one({"_id":ObjectId(featured_project["project_id"])}, {"_id": 1})
         if project_in:
-            result = await featured_collection.insert_one(featured_project)
+            try:
+                result = await featured_collection.insert_one(featured_project)
+            except DuplicateKeyError:
+                # Featured concurrently, caught by the unique project_id index
+                raise HTTPException(status_code=400, detail ="Project is already a featured project")
             return str(result.inserted_id)
         raise HTTPException(status_code = 404 , detail="Project Not Found")
     
-    async def get_featured_project(self, db:AgnosticDatabase)->List[Project]:
+    async def get_featured_project(self, db:AgnosticDatabase)->List[Dict[str, Any]]:
         featured_collection = db.featured
         project_collection = db.project
         
-        featured_project =[]
-        featured = featured_collection.find()
-        async for project in featured:
-            project_id =project["project_id"]
-            project_out =await project_collection.find_one(ObjectId(project_id))
-            project_out["id"]=project_out["_id"]
-            del[project_out["_id"]]
-            featured_project.append(Project(**project_out))
-        return featured_project
+        # Featured order is insertion order
+        featured = featured_collection.find({}, {"project_id": 1}).sort("_id", 1)
+        project_ids = [project["project_id"] async for project in featured if ObjectId.is_valid(project["project_id"])]
+
+        # One batched fetch for all the featured projects instead of one per project
+        result = project_collection.find(
+            {"_id": {"$in": [ObjectId(project_id) for project_id in project_ids]}},
+            build_projection(None),
+        )
+        projects = {str(project["_id"]): project async for project in result}
+        return [serialize_project(projects[project_id]) for project_id in project_ids if project_id in projects]
     
     async def remove_featured_project(self, db:AgnosticDatabase, project_id: str)->Any:
         featured_collection = db.featured
@@ -1,5 +1,13 @@
 from odmantic import Field
+import pymongo
 from app.db.base_class import Base
 
 class Featured(Base):
-    project_id: str = Field(default=None, description="this is the id of a project from mongo db object id", max_length=24)
\ No newline at end of file
+    project_id: str = Field(default=None, description="this is the id of a project from mongo db object id", max_length=24)
+
+    model_config = {
+        "indexes": lambda: [
+            # A project is featured at most once
+            pymongo.IndexModel([("project_id", pymongo.ASCENDING)], unique=True, name="project_id_unique"),
+        ]
+    }
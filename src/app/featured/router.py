@@ -4,7 +4,8 @@ from motor.core import AgnosticDatabase
 from fastapi.responses import JSONResponse
 from fastapi.encoders import jsonable_encoder
 from app.auth.deps import get_current_active_superuser
-from app.deps import get_db
+from app.deps import get_db, get_cache
+from app.cache import CacheBackend
 from app.user.models import User
 from app.project.models import Project
 from app.featured.schemas import FeaturedCreate
@@ -19,11 +20,16 @@ router = APIRouter(
 
 @router.get("/",response_model =List[Project])
 async def get_featured_project(
-    db:AgnosticDatabase=Depends(get_db)
+    db:AgnosticDatabase=Depends(get_db),
+    cache:CacheBackend=Depends(get_cache)
 ):
     try:
-        projects =await featured.get_featured_project(db)
-        projects =jsonable_encoder(projects)
+        projects =await cache.get("featured:list")
+        if projects is None:
+            projects =await featured.get_featured_project(db)
+            projects =jsonable_encoder(projects)
+            # Featured entries embed project data, project writes drop them too
+            await cache.set("featured:list", projects, tags=["featured", "projects"])
         return JSONResponse(status_code=200, content={
                 "status": "success",
                 "message": "featured projects retrived successfully",
@@ -40,12 +46,14 @@ async def get_featured_project(
 async def add_to_featured_project(
     project_id:str,
     db:AgnosticDatabase=Depends(get_db),
-    user:User=Depends(get_current_active_superuser)
+    user:User=Depends(get_current_active_superuser),
+    cache:CacheBackend=Depends(get_cache)
 ):
     try:
         featured_project =FeaturedCreate(project_id = project_id)
     
         result =await featured.add_to_featured_collection(db,featured_project)
+        await cache.invalidate_tags("featured")
         result =jsonable_encoder(result)
         return JSONResponse(status_code=201, content={
                 "status": "success",
@@ -64,11 +72,13 @@ async def add_to_featured_project(
 async def add_to_featured_project(
     project_id:str,
     db:AgnosticDatabase=Depends(get_db),
-    user:User=Depends(get_current_active_superuser)
+    user:User=Depends(get_current_active_superuser),
+    cache:CacheBackend=Depends(get_cache)
 ):
     try:
     
         result =await featured.remove_featured_project(db,project_id)
+        await cache.invalidate_tags("featured")
         if result ==1:
             return JSONResponse(status_code=200, content={
                     "status": "success",
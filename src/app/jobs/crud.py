@@ -0,0 +1,135 @@
+import random
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+from motor.core import AgnosticDatabase
+from odmantic import ObjectId
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from app.config import settings
+from app.db.base import CRUDBase
+from app.jobs.models import DeadJob, Job
+from app.jobs.schemas import JobCreate, JobUpdate
+
+
+class CRUDJob(CRUDBase[Job, JobCreate, JobUpdate]):
+
+    async def enqueue(
+        self,
+        db: AgnosticDatabase,
+        name: str,
+        payload: Dict[str, Any],
+        *,
+        dedupe_key: Optional[str] = None,
+        max_attempts: Optional[int] = None,
+    ) -> bool:
+        """Queue a job for the workers, returns False when `dedupe_key` is already queued."""
+        job_collection = db.job
+        job = Job(
+            name=name,
+            payload=payload,
+            dedupe_key=dedupe_key,
+            max_attempts=max_attempts or settings.JOB_MAX_ATTEMPTS,
+        )
+        try:
+            await job_collection.insert_one(job.model_dump_doc())
+        except DuplicateKeyError:
+            return False
+        return True
+
+    async def claim(self, db: AgnosticDatabase, worker_id: str) -> Optional[Dict[str, Any]]:
+        """Take the next available job and hide it from other workers for the visibility timeout.
+
+        A running job whose worker died becomes available again once the
+        timeout passes.
+        """
+        job_collection = db.job
+        now = datetime.now()
+        return await job_collection.find_one_and_update(
+            {"status": {"$in": ["queued", "running"]}, "available_at": {"$lte": now}},
+            {
+                "$set": {
+                    "status": "running",
+                    # Unique per claim, a worker whose claim expired cannot touch the job
+                    "locked_by": f"{worker_id}:{uuid.uuid4().hex}",
+                    "available_at": now + timedelta(seconds=settings.JOB_VISIBILITY_TIMEOUT_SECONDS),
+                },
+                "$inc": {"attempts": 1},
+            },
+            sort=[("available_at", 1)],
+            return_document=ReturnDocument.AFTER,
+        )
+
+    async def extend(self, db: AgnosticDatabase, job: Dict[str, Any]) -> bool:
+        """Hide a running job for another visibility timeout, returns False once its claim was lost."""
+        job_collection = db.job
+        result = await job_collection.update_one(
+            {"_id": job["_id"], "locked_by": job["locked_by"]},
+            {
+                "$set": {
+                    "available_at": datetime.now() + timedelta(seconds=settings.JOB_VISIBILITY_TIMEOUT_SECONDS),
+                }
+            },
+        )
+        return result.matched_count == 1
+
+    async def complete(self, db: AgnosticDatabase, job: Dict[str, Any]) -> None:
+        job_collection = db.job
+        # Only the worker still holding the job may remove it
+        await job_collection.delete_one({"_id": job["_id"], "locked_by": job["locked_by"]})
+
+    async def fail(self, db: AgnosticDatabase, job: Dict[str, Any], error: str) -> bool:
+        """Schedule a retry with exponential backoff, or move the job to the dead letters.
+
+        Returns True when the job was dead-lettered.
+        """
+        job_collection = db.job
+        if job["attempts"] >= job["max_attempts"]:
+            await self.dead_letter(db, job, error)
+            return True
+        backoff = min(
+            settings.JOB_BACKOFF_BASE_SECONDS * 2 ** (job["attempts"] - 1),
+            settings.JOB_BACKOFF_MAX_SECONDS,
+        )
+        # Jitter spreads retries of jobs that failed together
+        backoff *= random.uniform(0.5, 1.0)
+        await job_collection.update_one(
+            {"_id": job["_id"], "locked_by": job["locked_by"]},
+            {
+                "$set": {
+                    "status": "queued",
+                    "locked_by": None,
+                    "last_error": error,
+                    "available_at": datetime.now() + timedelta(seconds=backoff),
+                }
+            },
+        )
+        return False
+
+    async def dead_letter(self, db: AgnosticDatabase, job: Dict[str, Any], error: str) -> None:
+        job_collection = db.job
+        dead_job_collection = db.dead_job
+        dead_job = DeadJob(
+            id=job["_id"],
+            name=job["name"],
+            payload=job["payload"],
+            attempts=job["attempts"],
+            last_error=error,
+            created=job["created"],
+        )
+        # Same _id, a repeated move after a crash is a no-op
+        await dead_job_collection.replace_one({"_id": job["_id"]}, dead_job.model_dump_doc(), upsert=True)
+        await job_collection.delete_one({"_id": job["_id"], "locked_by": job["locked_by"]})
+
+    async def requeue_dead(self, db: AgnosticDatabase, job_id: str) -> bool:
+        """Give a dead-lettered job a fresh set of attempts."""
+        dead_job_collection = db.dead_job
+        dead_job = await dead_job_collection.find_one_and_delete({"_id": ObjectId(job_id)})
+        if not dead_job:
+            return False
+        return await self.enqueue(db, dead_job["name"], dead_job["payload"])
+
+
+job = CRUDJob(Job)
@@ -0,0 +1,52 @@
+from __future__ import annotations
+from datetime import datetime
+from typing import Any, Dict, Optional
+from odmantic import Field
+import pymongo
+
+from app.db.base_class import Base
+
+
+def datetime_now_sec():
+    return datetime.now().replace(microsecond=0)
+
+
+class Job(Base):
+    name: str
+    payload: Dict[str, Any] = Field(default_factory=dict)
+    # queued, or running while a worker holds it until available_at
+    status: str = Field(default="queued")
+    attempts: int = Field(default=0)
+    max_attempts: int
+    available_at: datetime = Field(default_factory=datetime.now)
+    locked_by: Optional[str] = Field(default=None)
+    last_error: Optional[str] = Field(default=None)
+    # Jobs with the same key are only queued once at a time
+    dedupe_key: Optional[str] = Field(default=None)
+    created: datetime = Field(default_factory=datetime_now_sec)
+
+    model_config = {
+        "indexes": lambda: [
+            # Workers claim the job that has been available the longest
+            pymongo.IndexModel(
+                [("status", pymongo.ASCENDING), ("available_at", pymongo.ASCENDING)],
+                name="status_available_at",
+            ),
+            pymongo.IndexModel(
+                [("dedupe_key", pymongo.ASCENDING)],
+                unique=True,
+                partialFilterExpression={"dedupe_key": {"$type": "string"}},
+                name="dedupe_key_unique",
+            ),
+        ]
+    }
+
+
+class DeadJob(Base):
+    """A job that failed max_attempts times, kept for inspection and requeueing."""
+    name: str
+    payload: Dict[str, Any] = Field(default_factory=dict)
+    attempts: int
+    last_error: Optional[str] = Field(default=None)
+    created: datetime
+    failed: datetime = Field(default_factory=datetime_now_sec)
@@ -0,0 +1,13 @@
+from typing import Any, Dict, Optional
+from pydantic import BaseModel, Field
+
+
+class JobCreate(BaseModel):
+    name: str
+    payload: Dict[str, Any] = Field(default_factory=dict)
+    max_attempts: Optional[int] = None
+    dedupe_key: Optional[str] = None
+
+
+class JobUpdate(BaseModel):
+    last_error: Optional[str] = None
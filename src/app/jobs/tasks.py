@@ -0,0 +1,124 @@
+"""Handlers of the queued jobs, by job name.
+
+Handlers receive the database and the job payload. Blocking handlers are
+plain functions and run in a worker thread, the others are coroutines.
+"""
+import asyncio
+import logging
+from typing import Any, Callable, Dict, List
+
+from motor.core import AgnosticDatabase
+from odmantic import ObjectId
+from starlette.concurrency import run_in_threadpool
+
+from app.auth.schemas import EmailValidation
+from app.config import settings
+from app.mail import MailBatchError
+from app.auth.service import (
+    send_email_validation_email,
+    send_project_funded_batch,
+    send_reset_password_email,
+)
+from app.project.derivatives import generate_project_variants
+
+logger = logging.getLogger(__name__)
+
+TASKS: Dict[str, Callable[..., Any]] = {}
+
+
+def task(name: str):
+    def register(handler: Callable[..., Any]) -> Callable[..., Any]:
+        TASKS[name] = handler
+        return handler
+
+    return register
+
+
+async def run_task(db: AgnosticDatabase, name: str, payload: Dict[str, Any]) -> None:
+    handler = TASKS[name]
+    if asyncio.iscoroutinefunction(handler):
+        await handler(db, payload)
+    else:
+        await run_in_threadpool(handler, db, payload)
+
+
+@task("email.validation")
+def email_validation(db: AgnosticDatabase, payload: Dict[str, Any]) -> None:
+    send_email_validation_email(EmailValidation(**payload))
+
+
+@task("email.reset_password")
+def email_reset_password(db: AgnosticDatabase, payload: Dict[str, Any]) -> None:
+    send_reset_password_email(**payload)
+
+
+@task("email.project_funded")
+async def email_project_funded(db: AgnosticDatabase, payload: Dict[str, Any]) -> None:
+    project_collection = db.project
+    contribution_collection = db.contribution
+    project = await project_collection.find_one(
+        {"_id": ObjectId(payload["project_id"])}, {"title": 1, "amount": 1}
+    )
+    if not project:
+        return
+    # One mail per backer, however many times they contributed, and none to
+    # those an earlier, interrupted run of this job already reached
+    pipeline = [
+        {"$match": {"project_id": project["_id"]}},
+        {
+            "$group": {
+                "_id": "$backer",
+                "backer_name": {"$first": "$backer_name"},
+                "notified": {"$max": "$funded_notified"},
+            }
+        },
+        {"$match": {"notified": {"$ne": True}}},
+    ]
+    backers = [
+        (backer["_id"], backer["backer_name"])
+        async for backer in contribution_collection.aggregate(pipeline)
+    ]
+
+    async def mark_notified(delivered: List[str]) -> None:
+        if delivered:
+            await contribution_collection.update_many(
+                {"project_id": project["_id"], "backer": {"$in": delivered}},
+                {"$set": {"funded_notified": True}},
+            )
+
+    # Recorded as mails go out, a retry after a dropped connection resumes there
+    refused = 0
+    for start in range(0, len(backers), settings.EMAIL_BATCH_SIZE):
+        batch = backers[start:start + settings.EMAIL_BATCH_SIZE]
+        try:
+            failed = await run_in_threadpool(
+                send_project_funded_batch, payload["project_id"], project["title"], project["amount"], batch
+            )
+        except MailBatchError as e:
+            # Including the mails that went out before the connection failed
+            await mark_notified([mail.email_to for mail in e.sent])
+            raise
+        refused += len(failed)
+        await mark_notified([email for email, _ in batch if email not in failed])
+    if refused:
+        logger.warning(f"{refused} funded notifications of project {payload['project_id']} were refused")
+
+
+@task("payment.charge_success")
+async def payment_charge_success(db: AgnosticDatabase, payload: Dict[str, Any]) -> None:
+    # Imported here, the payment crud pulls in most of the models
+    from app.payment.crud import payment
+
+    await payment.apply_charge_success(db, payload["reference"], payload["email"], payload["amount"])
+
+
+@task("media.variants")
+async def media_variants(db: AgnosticDatabase, payload: Dict[str, Any]) -> None:
+    project_collection = db.project
+    project_id = ObjectId(payload["project_id"])
+    # Nothing to do once the project is deleted or its media replaced
+    if not await project_collection.find_one(
+        {"_id": project_id, "picture_or_video": payload["location"]}, {"_id": 1}
+    ):
+        return
+    await generate_project_variants(db, project_id, payload["location"])
@@ -0,0 +1,112 @@
+"""Worker process running the queued jobs.
+
+Run with `python -m app.jobs.worker`. Any number of workers can run side by
+side, each job is claimed by one of them at a time.
+"""
+import asyncio
+import logging
+import os
+import signal
+import socket
+import uuid
+from typing import Any, Dict, Optional
+
+from motor.core import AgnosticDatabase
+
+from app.cache import broadcast
+from app.config import settings
+from app.db.session import MongoDatabase
+from app.jobs.crud import job as job_crud
+from app.jobs.tasks import TASKS, run_task
+from app.mail import close_mail_service
+from app.project.derivatives import close_derivative_executor
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+async def process_next(db: AgnosticDatabase, worker_id: str) -> bool:
+    """Run one job, returns False when none was available."""
+    job = await job_crud.claim(db, worker_id)
+    if job is None:
+        return False
+
+    if job["attempts"] > job["max_attempts"]:
+        # Its workers kept dying before the job could finish
+        await job_crud.dead_letter(db, job, job.get("last_error") or "visibility timeout expired")
+        logger.error(f"Job {job['_id']} ({job['name']}) dead-lettered after {job['max_attempts']} attempts")
+        return True
+    if job["name"] not in TASKS:
+        await job_crud.dead_letter(db, job, f"no task named {job['name']}")
+        logger.error(f"Job {job['_id']} has unknown task {job['name']}")
+        return True
+
+    # Not cancelled on a deadline: a handler running in a thread would keep
+    # going while its retry ran. Handlers bound their own calls, such as the
+    # SMTP and Paystack timeouts, and the claim is renewed while they run.
+    keep_claimed = asyncio.create_task(_keep_claimed(db, job))
+    try:
+        await run_task(db, job["name"], job["payload"])
+    except Exception as e:
+        error: Optional[str] = f"{type(e).__name__}: {e}"
+    else:
+        error = None
+    finally:
+        keep_claimed.cancel()
+
+    if error is None:
+        await job_crud.complete(db, job)
+    elif await job_crud.fail(db, job, error):
+        logger.error(f"Job {job['_id']} ({job['name']}) dead-lettered: {error}")
+    else:
+        logger.warning(f"Job {job['_id']} ({job['name']}) attempt {job['attempts']} failed: {error}")
+    return True
+
+
+async def _keep_claimed(db: AgnosticDatabase, job: Dict[str, Any]) -> None:
+    """Renew the claim on a running job well before it lapses, so no other worker takes it."""
+    while True:
+        await asyncio.sleep(settings.JOB_VISIBILITY_TIMEOUT_SECONDS / 3)
+        try:
+            if not await job_crud.extend(db, job):
+                logger.warning(f"Job {job['_id']} ({job['name']}) was claimed by another worker")
+                return
+        except Exception:
+            logger.exception(f"Could not renew the claim on job {job['_id']}")
+
+
+async def run_worker(db: AgnosticDatabase, worker_id: str, stopping: asyncio.Event) -> None:
+    while not stopping.is_set():
+        try:
+            if await process_next(db, worker_id):
+                continue
+        except Exception:
+            logger.exception("Could not claim a job")
+        try:
+            await asyncio.wait_for(stopping.wait(), timeout=settings.JOB_POLL_INTERVAL_SECONDS)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def main() -> None:
+    db = MongoDatabase()
+    stopping = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        # Finish the jobs in hand, then exit
+        loop.add_signal_handler(sig, stopping.set)
+
+    worker_id = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+    logger.info(f"Worker {worker_id} running {settings.JOB_WORKER_CONCURRENCY} jobs at a time")
+    await asyncio.gather(
+        *(run_worker(db, worker_id, stopping) for _ in range(settings.JOB_WORKER_CONCURRENCY))
+    )
+    # Let the API processes know what the last jobs invalidated
+    await broadcast.stop()
+    close_mail_service()
+    close_derivative_executor()
+    logger.info(f"Worker {worker_id} stopped")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
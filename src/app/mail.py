@@ -0,0 +1,249 @@
+"""Outgoing email over a pool of authenticated SMTP connections.
+
+Templates are compiled once and kept by the Jinja environment. Connections
+are reused between messages, and `send_batch` delivers many messages over a
+single connection. Everything here blocks, call it from a worker thread,
+such as a queued job.
+"""
+import logging
+import queue
+import smtplib
+import threading
+import time
+from dataclasses import dataclass
+from email.message import EmailMessage
+from email.utils import formataddr
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from jinja2 import Environment, FileSystemLoader, select_autoescape
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Mail:
+    email_to: str
+    subject: str
+    html: str
+
+
+class MailBatchError(Exception):
+    """The connection failed part way through a batch.
+
+    `sent` are the mails delivered before it did, `failed` those refused so
+    far, `error` the connection error.
+    """
+
+    def __init__(self, error: Exception, sent: List[Mail], failed: List[Tuple[Mail, Exception]]):
+        super().__init__(f"{error} after {len(sent)} emails were sent")
+        self.error = error
+        self.sent = sent
+        self.failed = failed
+
+
+class SMTPPool:
+    """Keeps up to `size` logged in SMTP connections for reuse."""
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        *,
+        user: Optional[str] = None,
+        password: Optional[str] = None,
+        starttls: bool = False,
+        ssl: bool = False,
+        size: int = 4,
+        timeout: float = 30.0,
+        idle_check_seconds: float = 30.0,
+    ):
+        self.host = host
+        self.port = port
+        self.user = user
+        self.password = password
+        self.starttls = starttls
+        self.ssl = ssl
+        self.timeout = timeout
+        self.idle_check_seconds = idle_check_seconds
+        self._idle: "queue.LifoQueue[Tuple[smtplib.SMTP, float]]" = queue.LifoQueue(maxsize=size)
+
+    def _connect(self) -> smtplib.SMTP:
+        if self.ssl:
+            connection = smtplib.SMTP_SSL(self.host, self.port, timeout=self.timeout)
+        else:
+            connection = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+            if self.starttls:
+                connection.starttls()
+        if self.user:
+            connection.login(self.user, self.password or "")
+        return connection
+
+    def acquire(self) -> smtplib.SMTP:
+        while True:
+            try:
+                connection, released = self._idle.get_nowait()
+            except queue.Empty:
+                return self._connect()
+            if time.monotonic() - released < self.idle_check_seconds:
+                return connection
+            # Servers drop idle sessions, check it is still there before reuse
+            try:
+                if connection.noop()[0] == 250:
+                    return connection
+            except smtplib.SMTPException:
+                pass
+            self._quit(connection)
+
+    def release(self, connection: smtplib.SMTP) -> None:
+        try:
+            self._idle.put_nowait((connection, time.monotonic()))
+        except queue.Full:
+            self._quit(connection)
+
+    def discard(self, connection: smtplib.SMTP) -> None:
+        self._quit(connection)
+
+    def close(self) -> None:
+        while True:
+            try:
+                connection, _ = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            self._quit(connection)
+
+    @staticmethod
+    def _quit(connection: smtplib.SMTP) -> None:
+        try:
+            connection.quit()
+        except (smtplib.SMTPException, OSError):
+            connection.close()
+
+
+class MailService:
+    def __init__(self, pool: SMTPPool, templates_dir: str, mail_from: Tuple[str, str]):
+        self.pool = pool
+        self.mail_from = formataddr(mail_from)
+        self.environment = Environment(
+            loader=FileSystemLoader(templates_dir),
+            autoescape=select_autoescape(["html"]),
+            # Templates are compiled on first use and never re-read from disk
+            auto_reload=False,
+            cache_size=-1,
+        )
+        # Subjects and inline templates, compiled once per distinct source
+        self._compile = lru_cache(maxsize=256)(self.environment.from_string)
+
+    def _context(self, environment: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "server_host": settings.SERVER_HOST,
+            "server_name": settings.SERVER_NAME,
+            "server_bot": settings.SERVER_BOT,
+            **environment,
+        }
+
+    def render(
+        self, email_to: str, subject: str, template_name: str, environment: Dict[str, Any]
+    ) -> Mail:
+        """Render a template of the templates directory into a mail for `email_to`."""
+        context = self._context(environment)
+        return Mail(
+            email_to=email_to,
+            subject=self._compile(subject).render(context),
+            html=self.environment.get_template(template_name).render(context),
+        )
+
+    def render_string(
+        self, email_to: str, subject: str, html_template: str, environment: Dict[str, Any]
+    ) -> Mail:
+        context = self._context(environment)
+        return Mail(
+            email_to=email_to,
+            subject=self._compile(subject).render(context),
+            html=self._compile(html_template).render(context),
+        )
+
+    def _message(self, mail: Mail) -> EmailMessage:
+        message = EmailMessage()
+        message["From"] = self.mail_from
+        message["To"] = mail.email_to
+        message["Subject"] = mail.subject
+        message.set_content("This message is best viewed in an HTML capable email client.")
+        message.add_alternative(mail.html, subtype="html")
+        return message
+
+    def send(self, mail: Mail) -> None:
+        try:
+            failed = self.send_batch([mail])
+        except MailBatchError as e:
+            raise e.error
+        if failed:
+            raise failed[0][1]
+
+    def send_batch(self, mails: Iterable[Mail]) -> List[Tuple[Mail, Exception]]:
+        """Send every mail over one pooled connection, returns those that failed.
+
+        A dropped connection is replaced once per mail, a refused recipient
+        does not stop the rest of the batch. Any other failure raises
+        MailBatchError with the mails sent until then.
+        """
+        failed: List[Tuple[Mail, Exception]] = []
+        sent: List[Mail] = []
+        connection = self.pool.acquire()
+        try:
+            for mail in mails:
+                message = self._message(mail)
+                try:
+                    try:
+                        connection.send_message(message)
+                    except smtplib.SMTPServerDisconnected:
+                        self.pool.discard(connection)
+                        connection = self.pool.acquire()
+                        connection.send_message(message)
+                    sent.append(mail)
+                except (smtplib.SMTPRecipientsRefused, smtplib.SMTPDataError, smtplib.SMTPSenderRefused) as e:
+                    failed.append((mail, e))
+                    connection.rset()
+            logger.info(f"Sent {len(sent)} emails, {len(failed)} failed")
+        except Exception as e:
+            self.pool.discard(connection)
+            raise MailBatchError(e, sent, failed) from e
+        else:
+            self.pool.release(connection)
+        return failed
+
+
+_mail_service: Optional[MailService] = None
+_mail_service_lock = threading.Lock()
+
+
+def get_mail_service() -> MailService:
+    global _mail_service
+    with _mail_service_lock:
+        if _mail_service is None:
+            pool = SMTPPool(
+                settings.SMTP_HOST,
+                settings.SMTP_PORT,
+                user=settings.SMTP_USER,
+                password=settings.SMTP_PASSWORD,
+                starttls=settings.SMTP_STARTTLS,
+                ssl=settings.SMTP_SSL and not settings.SMTP_TLS,
+                size=settings.SMTP_POOL_SIZE,
+                timeout=settings.SMTP_TIMEOUT_SECONDS,
+            )
+            _mail_service = MailService(
+                pool,
+                settings.EMAIL_TEMPLATES_DIR,
+                (settings.EMAILS_FROM_NAME, settings.EMAILS_FROM_EMAIL),
+            )
+        return _mail_service
+
+
+def close_mail_service() -> None:
+    global _mail_service
+    with _mail_service_lock:
+        if _mail_service is not None:
+            _mail_service.pool.close()
+            _mail_service = None
@@ -1,3 +1,4 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from starlette.middleware.cors import CORSMiddleware
 from starlette.middleware.sessions import SessionMiddleware
@@ -9,14 +10,30 @@ from app.project.router import router as project_router
 from app.payment.router import router as payment_router
 from app.config import settings
 from app.middlewares.exception import ExceptionHandlerMiddleware
+from app.middlewares.metrics import MetricsMiddleware, metrics_endpoint
+from app.payment.services import close_paystack_client
+from app.cache import broadcast, close_cache_backend
+from app.db.session import MongoDatabase
 import os
 import uvicorn
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Other processes, the job worker among them, share what they drop from their caches
+    broadcast.start(MongoDatabase())
+    yield
+    await broadcast.stop()
+    # Release pooled connections on shutdown
+    await close_paystack_client()
+    await close_cache_backend()
+
+
 app = FastAPI(
     title=settings.PROJECT_NAME,
     openapi_url=f"{settings.API_V1_STR}/openapi.json",
     description=f"{settings.PROJECT_NAME} API",
+    lifespan=lifespan,
 )
 
 
@@ -48,6 +65,11 @@ app.add_middleware(SessionMiddleware, secret_key=settings.SECRET_KEY)
 #Add error  handling middleware
 # app.add_middleware(ExceptionHandlerMiddleware)
 
+# Added last so it wraps the other middlewares and times the whole request
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+    app.add_api_route("/metrics", metrics_endpoint, include_in_schema=False)
+
 # Add Routers here from modules
 app.include_router(auth_router, prefix=settings.API_V1_STR)
 app.include_router(user_router, prefix=settings.API_V1_STR)
@@ -0,0 +1,209 @@
+"""Per-route request metrics, exposed in the Prometheus text format.
+
+`MetricsMiddleware` times every request, measures the size of the response
+body and, through `MongoCommandListener`, counts the MongoDB commands the
+request issued and the time spent in them. Each response carries those
+numbers in a `Server-Timing` header, and `metrics_endpoint` serves the totals
+kept since this worker started.
+
+Motor runs commands on its thread pool with a copy of the caller's context,
+so the listener finds the stats of the request that issued a command through
+a context variable.
+"""
+import threading
+import time
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+
+from pymongo import monitoring
+from starlette.datastructures import MutableHeaders
+from starlette.requests import Request
+from starlette.responses import PlainTextResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+
+class RequestStats:
+    """MongoDB commands issued while handling one request."""
+
+    def __init__(self):
+        self.db_commands = 0
+        self.db_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def add_command(self, seconds: float) -> None:
+        # Commands of one request may run on several threads at once
+        with self._lock:
+            self.db_commands += 1
+            self.db_seconds += seconds
+
+    def server_timing(self, app_seconds: float) -> str:
+        return (
+            f'db;dur={self.db_seconds * 1000:.2f};desc="{self.db_commands} commands", '
+            f"app;dur={app_seconds * 1000:.2f}"
+        )
+
+
+_request_stats: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+class _Histogram:
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+        self.count += 1
+        self.sum += value
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**labels: str) -> str:
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests: Dict[Tuple[str, str, str], int] = {}
+        self.durations: Dict[Tuple[str, str], _Histogram] = {}
+        self.sizes: Dict[Tuple[str, str], _Histogram] = {}
+        self.request_db_commands: Dict[Tuple[str, str], int] = {}
+        self.request_db_seconds: Dict[Tuple[str, str], float] = {}
+        self.commands: Dict[str, int] = {}
+        self.command_failures: Dict[str, int] = {}
+        self.command_seconds: Dict[str, float] = {}
+
+    def observe_request(
+        self, method: str, route: str, status: int, seconds: float, size: int, stats: RequestStats
+    ) -> None:
+        key = (method, route)
+        with self._lock:
+            status_key = (method, route, str(status))
+            self.requests[status_key] = self.requests.get(status_key, 0) + 1
+            self.durations.setdefault(key, _Histogram(DURATION_BUCKETS)).observe(seconds)
+            self.sizes.setdefault(key, _Histogram(SIZE_BUCKETS)).observe(size)
+            self.request_db_commands[key] = self.request_db_commands.get(key, 0) + stats.db_commands
+            self.request_db_seconds[key] = self.request_db_seconds.get(key, 0.0) + stats.db_seconds
+
+    def observe_command(self, command: str, seconds: float, failed: bool) -> None:
+        with self._lock:
+            self.commands[command] = self.commands.get(command, 0) + 1
+            self.command_seconds[command] = self.command_seconds.get(command, 0.0) + seconds
+            if failed:
+                self.command_failures[command] = self.command_failures.get(command, 0) + 1
+
+    def render(self) -> str:
+        lines: List[str] = []
+
+        def histogram(name: str, help: str, values: Dict[Tuple[str, str], _Histogram]) -> None:
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} histogram")
+            for (method, route), hist in sorted(values.items()):
+                for bound, count in zip(hist.buckets, hist.counts):
+                    lines.append(f"{name}_bucket{_labels(method=method, route=route, le=str(bound))} {count}")
+                lines.append(f"{name}_bucket{_labels(method=method, route=route, le='+Inf')} {hist.count}")
+                lines.append(f"{name}_sum{_labels(method=method, route=route)} {hist.sum}")
+                lines.append(f"{name}_count{_labels(method=method, route=route)} {hist.count}")
+
+        def counter(name: str, help: str, values: Dict, label_names: Tuple[str, ...]) -> None:
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} counter")
+            for key, value in sorted(values.items()):
+                key = key if isinstance(key, tuple) else (key,)
+                lines.append(f"{name}{_labels(**dict(zip(label_names, key)))} {value}")
+
+        with self._lock:
+            counter("http_requests_total", "Requests handled.", self.requests, ("method", "route", "status"))
+            histogram("http_request_duration_seconds", "Time to handle a request.", self.durations)
+            histogram("http_response_size_bytes", "Size of the response bodies.", self.sizes)
+            counter(
+                "http_request_mongo_commands_total",
+                "MongoDB commands issued by requests.",
+                self.request_db_commands,
+                ("method", "route"),
+            )
+            counter(
+                "http_request_mongo_seconds_total",
+                "Time requests spent in MongoDB commands.",
+                self.request_db_seconds,
+                ("method", "route"),
+            )
+            counter("mongo_commands_total", "MongoDB commands issued.", self.commands, ("command",))
+            counter("mongo_command_failures_total", "MongoDB commands that failed.", self.command_failures, ("command",))
+            counter("mongo_command_seconds_total", "Time spent in MongoDB commands.", self.command_seconds, ("command",))
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
+
+
+class MongoCommandListener(monitoring.CommandListener):
+    """Registered on the Mongo client, attributes each command to the current request."""
+
+    def started(self, event: monitoring.CommandStartedEvent) -> None:
+        pass
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent) -> None:
+        self._record(event.command_name, event.duration_micros / 1_000_000, failed=False)
+
+    def failed(self, event: monitoring.CommandFailedEvent) -> None:
+        self._record(event.command_name, event.duration_micros / 1_000_000, failed=True)
+
+    @staticmethod
+    def _record(command: str, seconds: float, failed: bool) -> None:
+        metrics.observe_command(command, seconds, failed)
+        stats = _request_stats.get()
+        if stats is not None:
+            stats.add_command(seconds)
+
+
+class MetricsMiddleware:
+    def __init__(self, app: ASGIApp, registry: MetricsRegistry = metrics):
+        self.app = app
+        self.registry = registry
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = _request_stats.set(stats)
+        started = time.perf_counter()
+        status = 500
+        size = 0
+
+        async def send_with_timing(message: Message) -> None:
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = MutableHeaders(scope=message)
+                headers.append("Server-Timing", stats.server_timing(time.perf_counter() - started))
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _request_stats.reset(token)
+            # The template of the matched route, raw paths would make a label per id
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            self.registry.observe_request(
+                scope["method"], route, status, time.perf_counter() - started, size, stats
+            )
+
+
+async def metrics_endpoint(request: Request) -> PlainTextResponse:
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
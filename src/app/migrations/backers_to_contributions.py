@@ -0,0 +1,63 @@
+"""Move the backers embedded in project documents into the contribution collection.
+
+Run with `python -m app.migrations.backers_to_contributions`. The migration can
+be re-run safely: embedded backers keep their id as the contribution `_id`.
+Run `python -m app.reconcile_funding` afterwards to fill the funding counters.
+"""
+import asyncio
+import logging
+
+from motor.core import AgnosticDatabase
+from odmantic import ObjectId
+from pymongo.errors import BulkWriteError
+
+from app.contribution.crud import contribution
+from app.contribution.models import Contribution
+from app.db.session import MongoDatabase
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DUPLICATE_KEY = 11000
+
+
+async def migrate(db: AgnosticDatabase) -> int:
+    await contribution.configure_db(Contribution)
+
+    moved = 0
+    cursor = db.project.find({"backers": {"$exists": True}}, {"backers": 1})
+    async for project in cursor:
+        documents = []
+        for backer in project["backers"]:
+            backer_id = backer.get("id") or ObjectId()
+            documents.append(
+                {
+                    "_id": backer_id,
+                    "project_id": project["_id"],
+                    "backer_name": backer.get("backer_name", ""),
+                    "backer": backer["backer"],
+                    "amount": backer["amount"],
+                    # Backers were never timestamped, their id holds the charge time
+                    "created": backer_id.generation_time.replace(tzinfo=None),
+                }
+            )
+        if documents:
+            try:
+                await db.contribution.insert_many(documents, ordered=False)
+            except BulkWriteError as e:
+                # Already copied by an interrupted earlier run
+                if any(error["code"] != DUPLICATE_KEY for error in e.details["writeErrors"]):
+                    raise
+        await db.project.update_one({"_id": project["_id"]}, {"$unset": {"backers": ""}})
+        moved += len(documents)
+    return moved
+
+
+async def main() -> None:
+    logger.info("Moving embedded backers to the contribution collection")
+    moved = await migrate(MongoDatabase())
+    logger.info(f"Moved {moved} backers")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
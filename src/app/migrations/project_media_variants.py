@@ -0,0 +1,61 @@
+"""Record content hashes and make the resized variants of media uploaded earlier.
+
+Run with `python -m app.migrations.project_media_variants`. Projects that
+already have variants are skipped, so the migration can be re-run safely.
+"""
+import asyncio
+import hashlib
+import logging
+
+from motor.core import AgnosticDatabase
+
+from app.db.session import MongoDatabase
+from app.project.derivatives import (
+    DERIVABLE_MEDIA_TYPES,
+    close_derivative_executor,
+    generate_project_variants,
+)
+from app.project.services import sniff_media_type
+from app.storage import get_storage_backend
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+async def migrate(db: AgnosticDatabase) -> int:
+    storage = get_storage_backend()
+    derived = 0
+    cursor = db.project.find(
+        {"picture_or_video": {"$nin": [None, ""]}, "variants.thumb": {"$exists": False}},
+        {"picture_or_video": 1, "media_hash": 1, "media_type": 1},
+    )
+    async for project in cursor:
+        location = project["picture_or_video"]
+        try:
+            data = await storage.read(location)
+        except Exception as e:
+            logger.warning(f"Media of project {project['_id']} could not be read from {location}: {e}")
+            continue
+
+        media_type = project.get("media_type") or sniff_media_type(data[:16])
+        await db.project.update_one(
+            {"_id": project["_id"]},
+            {"$set": {"media_hash": hashlib.sha256(data).hexdigest(), "media_type": media_type}},
+        )
+        if media_type in DERIVABLE_MEDIA_TYPES:
+            await generate_project_variants(db, project["_id"], location)
+            derived += 1
+    return derived
+
+
+async def main() -> None:
+    logger.info("Making the media variants of existing projects")
+    try:
+        derived = await migrate(MongoDatabase())
+    finally:
+        close_derivative_executor()
+    logger.info(f"Made variants for {derived} projects")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
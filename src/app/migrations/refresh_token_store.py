@@ -0,0 +1,71 @@
+"""Move refresh tokens to their hashed form and drop the per-user token lists.
+
+Run with `python -m app.migrations.refresh_token_store`. Tokens that are still
+valid keep working, each in a family of its own, the expired ones and those
+no longer signed with SECRET_KEY are removed. The migration can be re-run
+safely: converted tokens no longer have `authenticates_id`.
+"""
+import asyncio
+import logging
+import uuid
+from datetime import datetime, timedelta
+from typing import Tuple
+
+from jose import jwt
+from motor.core import AgnosticDatabase
+from pymongo.errors import OperationFailure
+
+from app.auth.crud import hash_token
+from app.auth.models import Token
+from app.config import settings
+from app.db.session import MongoDatabase
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+async def migrate(db: AgnosticDatabase) -> Tuple[int, int]:
+    converted = removed = 0
+    now = datetime.utcnow()
+    cursor = db.token.find({"authenticates_id": {"$exists": True}})
+    async for document in cursor:
+        try:
+            claims = jwt.decode(
+                document["token"], settings.SECRET_KEY, algorithms=[settings.JWT_ALGO],
+                options={"verify_exp": False},
+            )
+            expires = datetime.utcfromtimestamp(claims["exp"])
+        except (jwt.JWTError, KeyError):
+            expires = now
+        if expires <= now:
+            await db.token.delete_one({"_id": document["_id"]})
+            removed += 1
+            continue
+        token = Token(
+            id=document["_id"],
+            token_hash=hash_token(document["token"]),
+            user_id=document["authenticates_id"],
+            family=uuid.uuid4().hex,
+            # The TTL index then removes it when the token expires
+            created=expires - timedelta(seconds=settings.REFRESH_TOKEN_EXPIRE_SECONDS),
+        )
+        await db.token.replace_one({"_id": document["_id"]}, token.model_dump_doc())
+        converted += 1
+
+    await db.user.update_many({"refresh_tokens": {"$exists": True}}, {"$unset": {"refresh_tokens": ""}})
+    try:
+        await db.user.drop_index("refresh_tokens")
+    except OperationFailure:
+        # Never created, or dropped by an earlier run
+        pass
+    return converted, removed
+
+
+async def main() -> None:
+    logger.info("Hashing the stored refresh tokens")
+    converted, removed = await migrate(MongoDatabase())
+    logger.info(f"Converted {converted} refresh tokens, removed {removed} expired ones")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,64 @@
+from typing import Any, Dict, List, Optional, Tuple
+from datetime import datetime
+import base64
+import json
+
+from bson.errors import InvalidId
+from fastapi.exceptions import HTTPException
+from motor.core import AgnosticCollection
+from odmantic import ObjectId
+
+
+def encode_cursor(value: datetime, last_id: ObjectId) -> str:
+    """Build the opaque cursor pointing just after the `(value, _id)` pair."""
+    raw = json.dumps({"v": value.isoformat(), "i": str(last_id)}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, ObjectId]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        raw = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(raw["v"]), ObjectId(raw["i"])
+    except (ValueError, KeyError, TypeError, InvalidId):
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+
+
+def keyset_filter(cursor: Optional[str], field: str = "created") -> Dict[str, Any]:
+    """Mongo filter selecting the documents after `cursor` in `(field, _id)` descending order."""
+    if not cursor:
+        return {}
+    value, last_id = decode_cursor(cursor)
+    return {"$or": [{field: {"$lt": value}}, {field: value, "_id": {"$lt": last_id}}]}
+
+
+async def fetch_page(
+    collection: AgnosticCollection,
+    query: Dict[str, Any],
+    *,
+    limit: int,
+    cursor: Optional[str] = None,
+    projection: Optional[Dict[str, Any]] = None,
+    field: str = "created",
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """Return one page of raw documents, newest first, and the cursor of the next page.
+
+    The collection must have an index on `(field, _id)` descending so a page
+    costs the same regardless of how deep into the collection it is.
+    """
+    after = keyset_filter(cursor, field)
+    if after:
+        query = {"$and": [query, after]} if query else after
+    result = (
+        collection.find(query, projection)
+        .sort([(field, -1), ("_id", -1)])
+        .limit(limit + 1)
+    )
+    documents = await result.to_list(length=limit + 1)
+
+    next_cursor = None
+    if len(documents) > limit:
+        documents = documents[:limit]
+        last = documents[-1]
+        next_cursor = encode_cursor(last[field], last["_id"])
+    return documents, next_cursor
@@ -1,12 +1,17 @@
-from typing import List, Optional, Any
+from typing import Dict, List, Optional, Any
 from fastapi.exceptions import HTTPException
 from motor.core import AgnosticDatabase
 from odmantic import ObjectId
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import DuplicateKeyError
 from app.project.models import Project
+from app.cache import get_cache_backend
 from app.db.base import CRUDBase
 from app.user.models import User
-from app.payment.models import  Payment
-from app.project.models import Backers
+from app.user.crud import user as user_crud
+from app.payment.models import  Payment, PaymentEvent
+from app.contribution.crud import contribution
+from app.jobs.crud import job
 from app.payment.schemas import PaymentCreate,PaymentUpdate
 from app.config import settings
 
@@ -14,17 +19,16 @@ from app.config import settings
 
 class CRUDPayment(CRUDBase[Payment, PaymentCreate, PaymentUpdate]):
     
-    async def get_all_payments(self, db: AgnosticDatabase) ->List[ Payment]:
+    async def get_all_payments(self, db: AgnosticDatabase) -> List[Dict[str, Any]]:
+        """Every payment as a plain document with the Payment fields, `_id` renamed to `id`.
+
+        Left for the response to serialize, no model is built per payment.
+        """
         payment_collection =db.payment
-        result = payment_collection.find()
-        payments=[]
-        count =0
-        async for document in result:
-            document["id"]=str(document["_id"])
-            del[document["_id"]]
-            payments.append(Payment(**document))
-            count+=1
-            print(count)
+        projection = {field.key_name: 1 for name, field in Payment.__odm_fields__.items() if name != "id"}
+        payments = []
+        async for document in payment_collection.find({}, projection):
+            payments.append({"id": document.pop("_id"), **document})
         return payments
           
     async def save_payment(self, db: AgnosticDatabase, payment_data: Payment) -> Payment:
@@ -34,28 +38,117 @@ class CRUDPayment(CRUDBase[Payment, PaymentCreate, PaymentUpdate]):
         return payment
 
     async def update_user_with_project(self,db:AgnosticDatabase, user_email: str, project_id: str):
-        
         user_collection =db.user
-        user = await user_collection.find_one({"email":user_email})
+        # $addToSet keeps project_backed free of duplicates however often it runs
+        user = await user_collection.find_one_and_update(
+            {"email": user_email},
+            {"$addToSet": {"project_backed": ObjectId(project_id)}},
+            projection={"_id": 1},
+        )
         if user:
-            for projects in user["project_backed"]:
-                if project_id != projects:
-                    document ={"_id":ObjectId(user["_id"])}
-                    update ={"$push":{"project_backed":ObjectId(project_id)}}
-                    await user_collection.update_one(document,update)
+            user_crud.invalidate_cached(user["_id"])
+
+    async def update_project_with_backer(
+        self, db: AgnosticDatabase, project_id: str, user_email: str, amount: int, reference: str
+    ) -> bool:
+        """Record the charge as a contribution and add it to the project totals.
 
-    async def update_project_with_backer(self,db:AgnosticDatabase, project_id: str, user_email: str, amount: int):
+        The contribution is unique per charge reference and the totals only
+        move when it is newly recorded, so replaying a charge changes nothing.
+        Returns whether the charge was applied.
+        """
         user_collection =db.user
         project_collection = db.project
-        
-        user =await user_collection.find_one({"email":user_email})
-        project = await project_collection.find_one({"_id":ObjectId(project_id)})
-        if project:
-            document ={"_id":ObjectId(project_id)}
-            backer =Backers(backer_name=user["full_name"], backer=user_email, amount =amount)
-            backer =backer.dict()
-            update = {"$push":{"backers":backer}}
-            await project_collection.update_one(document,update)
+
+        project = await project_collection.find_one({"_id": ObjectId(project_id)}, {"_id": 1})
+        if not project:
+            return False
+        user =await user_collection.find_one({"email":user_email}, {"full_name": 1})
+        backer_name = user["full_name"] if user else ""
+        recorded = await contribution.add_contribution(
+            db, project_id, backer_name, user_email, amount, reference=reference
+        )
+        if recorded is None:
+            return False
+        # Standalone MongoDB has no transactions, should this $inc be lost the
+        # contribution remains and `python -m app.reconcile_funding` restores it
+        project = await project_collection.find_one_and_update(
+            {"_id": ObjectId(project_id)},
+            {"$inc": {"raised_amount": amount, "backer_count": 1}},
+            projection={"amount": 1, "raised_amount": 1},
+            return_document=ReturnDocument.AFTER,
+        )
+        # Cached lists, search pages and featured entries show the totals
+        await get_cache_backend().invalidate_tags("projects")
+        # Only the contribution that crosses the goal notifies the backers
+        if (
+            settings.EMAILS_ENABLED
+            and project
+            and project["raised_amount"] - amount < project["amount"] <= project["raised_amount"]
+        ):
+            await job.enqueue(
+                db,
+                "email.project_funded",
+                {"project_id": project_id},
+                dedupe_key=f"email.project_funded:{project_id}",
+            )
+        return True
+
+    async def record_event(self, db: AgnosticDatabase, reference: str, event: str) -> bool:
+        """Enter a webhook event in the ledger, returns False when it was already processed."""
+        event_collection = db.payment_event
+        try:
+            await event_collection.insert_one(PaymentEvent(reference=reference, event=event).model_dump_doc())
+        except DuplicateKeyError:
+            # A delivery that failed halfway is applied again, every step is idempotent
+            existing = await event_collection.find_one({"reference": reference}, {"processed": 1})
+            return not (existing and existing.get("processed"))
+        return True
+
+    async def mark_event_processed(self, db: AgnosticDatabase, reference: str) -> None:
+        event_collection = db.payment_event
+        await event_collection.update_one({"reference": reference}, {"$set": {"processed": True}})
+
+    async def apply_charge_success(
+        self, db: AgnosticDatabase, reference: str, user_email: str, amount: int
+    ) -> bool:
+        """Apply a successful charge once, returns False for repeated deliveries."""
+        if not await self.record_event(db, reference, "charge.success"):
+            return False
+        # The project id is the first part of the reference made at initialization
+        project_id = reference.split("-")[0]
+        if ObjectId.is_valid(project_id):
+            await self.update_project_with_backer(db, project_id, user_email, amount, reference)
+            await self.update_user_with_project(db, user_email, project_id)
+        await self.mark_event_processed(db, reference)
+        return True
+
+    async def reconcile_project_funding(self, db: AgnosticDatabase) -> int:
+        """Recompute raised_amount and backer_count of every project from the
+        recorded contributions, returns the number of projects corrected."""
+        contribution_collection = db.contribution
+        project_collection = db.project
+
+        totals = {}
+        pipeline = [
+            {"$group": {"_id": "$project_id", "raised_amount": {"$sum": "$amount"}, "backer_count": {"$sum": 1}}}
+        ]
+        async for total in contribution_collection.aggregate(pipeline):
+            totals[total["_id"]] = (total["raised_amount"], total["backer_count"])
+
+        updates = []
+        cursor = project_collection.find({}, {"raised_amount": 1, "backer_count": 1})
+        async for project in cursor:
+            raised_amount, backer_count = totals.get(project["_id"], (0, 0))
+            if (project.get("raised_amount"), project.get("backer_count")) != (raised_amount, backer_count):
+                updates.append(UpdateOne(
+                    {"_id": project["_id"]},
+                    {"$set": {"raised_amount": raised_amount, "backer_count": backer_count}},
+                ))
+        if updates:
+            await project_collection.bulk_write(updates, ordered=False)
+            await get_cache_backend().invalidate_tags("projects")
+        return len(updates)
     
            
 payment =CRUDPayment(Payment)
\ No newline at end of file
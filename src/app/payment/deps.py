@@ -0,0 +1,5 @@
+from app.payment.services import PaystackClient, get_paystack_client
+
+
+def get_paystack() -> PaystackClient:
+    return get_paystack_client()
@@ -5,6 +5,7 @@ from datetime import date
 from pydantic import EmailStr
 from pydantic_extra_types.phone_numbers import PhoneNumber
 from odmantic import ObjectId, Field
+import pymongo
 from typing import List,Optional
 
 from app.db.base_class import Base
@@ -16,4 +17,29 @@ class Payment(Base):
     email: EmailStr
     amount: int
     reference: str = Field(description="Unique reference ID")
-    project_id: str = Field(description="Project ID",max_length =24)
\ No newline at end of file
+    project_id: str = Field(description="Project ID",max_length =24)
+
+    model_config = {
+        "indexes": lambda: [
+            # Paystack references identify a charge, it is recorded once
+            pymongo.IndexModel([("reference", pymongo.ASCENDING)], unique=True, name="reference_unique"),
+        ]
+    }
+
+
+def datetime_now_sec():
+    return datetime.now().replace(microsecond=0)
+
+
+class PaymentEvent(Base):
+    """Ledger of the Paystack webhook events received, one per charge reference."""
+    reference: str
+    event: str
+    processed: bool = Field(default=False)
+    received: datetime = Field(default_factory=datetime_now_sec)
+
+    model_config = {
+        "indexes": lambda: [
+            pymongo.IndexModel([("reference", pymongo.ASCENDING)], unique=True, name="reference_unique"),
+        ]
+    }
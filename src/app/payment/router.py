@@ -3,7 +3,6 @@ from fastapi.encoders import jsonable_encoder
 from fastapi.responses import JSONResponse
 from pydantic import BaseModel
 from motor.core import AgnosticDatabase
-import requests
 from app.config import settings
 import hmac
 import hashlib
@@ -14,6 +13,10 @@ from app.payment.models import Payment
 from app.user.models import User
 from app.deps import get_db
 from app.payment.crud import payment
+from app.payment.deps import get_paystack
+from app.payment.services import PaystackClient
+from app.responses import EnvelopeResponse
+from app.jobs.crud import job
 import uuid
 import pprint
 
@@ -30,12 +33,7 @@ async def get_payments(
 ):
     try:
         payments_data =await payment.get_all_payments(db)
-        payments_data =jsonable_encoder(payments_data)
-        return JSONResponse(status_code=200, content={
-            "status": "success",
-            "message": "payments data retrived successfully",
-            "data": payments_data
-        })
+        return EnvelopeResponse(payments_data, message="payments data retrived successfully")
     except Exception as e:
         return JSONResponse(status_code=500, content={
             "status": "error",
@@ -45,18 +43,13 @@ async def get_payments(
 
 
 @router.post("/initialize-payment/")
-async def initialize_payment(paymentin: PaymentCreate,user:User=Depends(get_current_user) ,db:AgnosticDatabase=Depends(get_db)):
+async def initialize_payment(paymentin: PaymentCreate,user:User=Depends(get_current_user) ,db:AgnosticDatabase=Depends(get_db), paystack:PaystackClient=Depends(get_paystack)):
     try:
         if user.email !=paymentin.email:
             raise HTTPException(status_code =400 , detail="this user is not registered")
         
         unique_reference = f"{paymentin.project_id}-{uuid.uuid4()}"
         
-        url = f"{settings.PAYSTACK_BASE_URL}/transaction/initialize"
-        headers = {
-            "Authorization": f"Bearer {settings.PAYSTACK_SECRET_KEY}",
-            "Content-Type": "application/json"
-        }
         data = {
             "first_name":paymentin.first_name,
             "last_name":paymentin.last_name,
@@ -64,7 +57,7 @@ async def initialize_payment(paymentin: PaymentCreate,user:User=Depends(get_curr
             "amount": paymentin.amount * 100 , # Amount in kobo
             "reference": unique_reference
         }
-        response = requests.post(url, headers=headers, json=data)
+        response = await paystack.initialize_transaction(data)
         if response.status_code != 200:
             raise HTTPException(status_code=response.status_code, detail="Payment initialization failed")
         
@@ -91,14 +84,9 @@ async def initialize_payment(paymentin: PaymentCreate,user:User=Depends(get_curr
 
 
 @router.get("/verify-transaction/{reference}")
-async def verify_transaction(reference: str , db:AgnosticDatabase=Depends(get_db)):
+async def verify_transaction(reference: str , db:AgnosticDatabase=Depends(get_db), paystack:PaystackClient=Depends(get_paystack)):
     try:
-        url = f"{settings.PAYSTACK_BASE_URL}/transaction/verify/{reference}"
-        headers = {
-            "Authorization": f"Bearer {settings.PAYSTACK_SECRET_KEY}",
-            "Content-Type": "application/json"
-        }
-        response = requests.get(url, headers=headers)
+        response = await paystack.verify_transaction(reference)
         if response.status_code != 200:
             raise HTTPException(status_code=response.status_code, detail="Transaction verification failed")
         
@@ -117,7 +105,7 @@ async def verify_transaction(reference: str , db:AgnosticDatabase=Depends(get_db
             # await payment.update_project_with_backer(db, project_id, user_email, amount)
             return {"status": "success"}
         else:
-            raise HTTPException(status_code=400, detials ="this transaction was not successful")
+            raise HTTPException(status_code=400, detail ="this transaction was not successful")
     except Exception as e:
         return JSONResponse(status_code=500, content={
             "status": "error",
@@ -139,7 +127,7 @@ async def paystack_webhook(request: Request, db: AgnosticDatabase = Depends(get_
             digestmod=hashlib.sha512
         ).hexdigest()
         
-        if signature != expected_signature:
+        if signature is None or not hmac.compare_digest(signature, expected_signature):
             raise HTTPException(status_code=400, detail="Invalid signature")
         
         event = json.loads(payload)
@@ -149,12 +137,16 @@ async def paystack_webhook(request: Request, db: AgnosticDatabase = Depends(get_
             user_email = event['data']['customer']['email']
             amount = event['data']['amount'] // 100  # Amount is in kobo
             
-            # Extract project ID from reference
-            project_id = transaction_reference.split('-')[0]
-            
-            await payment.update_user_with_project(db, user_email, project_id)
-            await payment.update_project_with_backer(db, project_id, user_email, amount)
-            
+            # Applied by a worker, Paystack only waits for the job to be queued.
+            # Retried deliveries of a queued reference are not queued twice.
+            queued = await job.enqueue(
+                db,
+                "payment.charge_success",
+                {"reference": transaction_reference, "email": user_email, "amount": amount},
+                dedupe_key=f"payment.charge_success:{transaction_reference}",
+            )
+            if not queued:
+                return {"status": "duplicate"}
             return {"status": "success"}
         
         return {"status": "ignored"}
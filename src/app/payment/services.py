@@ -0,0 +1,93 @@
+import asyncio
+import logging
+from typing import Any, Dict, Optional
+
+import httpx
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class PaystackClient:
+    """Shared async client for the Paystack API.
+
+    Connections are kept alive and reused between requests, the number of
+    in-flight Paystack calls is capped, and failed calls are retried a bounded
+    number of times. Pass `base_url` or `transport` to talk to a fake Paystack.
+    """
+
+    def __init__(
+        self,
+        *,
+        base_url: str = settings.PAYSTACK_BASE_URL,
+        secret_key: str = settings.PAYSTACK_SECRET_KEY,
+        timeout: float = settings.PAYSTACK_TIMEOUT_SECONDS,
+        max_connections: int = settings.PAYSTACK_MAX_CONNECTIONS,
+        max_concurrency: int = settings.PAYSTACK_MAX_CONCURRENCY,
+        max_retries: int = settings.PAYSTACK_MAX_RETRIES,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self.max_retries = max_retries
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._client = httpx.AsyncClient(
+            base_url=base_url,
+            headers={
+                "Authorization": f"Bearer {secret_key}",
+                "Content-Type": "application/json",
+            },
+            timeout=httpx.Timeout(timeout),
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections,
+            ),
+            transport=transport,
+        )
+
+    async def _request(self, method: str, url: str, **kwargs: Any) -> httpx.Response:
+        # Only GETs are safe to resend once Paystack may have seen them,
+        # other calls are retried when the connection could not be made at all
+        idempotent = method == "GET"
+        attempt = 0
+        while True:
+            try:
+                async with self._semaphore:
+                    response = await self._client.request(method, url, **kwargs)
+            except (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout):
+                if attempt >= self.max_retries:
+                    raise
+            except httpx.TransportError:
+                if not idempotent or attempt >= self.max_retries:
+                    raise
+            else:
+                if response.status_code < 500 or not idempotent or attempt >= self.max_retries:
+                    return response
+            attempt += 1
+            logger.warning(f"Retrying Paystack {method} {url}, attempt {attempt}")
+            await asyncio.sleep(0.2 * 2 ** (attempt - 1))
+
+    async def initialize_transaction(self, data: Dict[str, Any]) -> httpx.Response:
+        return await self._request("POST", "/transaction/initialize", json=data)
+
+    async def verify_transaction(self, reference: str) -> httpx.Response:
+        return await self._request("GET", f"/transaction/verify/{reference}")
+
+    async def aclose(self) -> None:
+        await self._client.aclose()
+
+
+_paystack_client: Optional[PaystackClient] = None
+
+
+def get_paystack_client() -> PaystackClient:
+    global _paystack_client
+    if _paystack_client is None:
+        _paystack_client = PaystackClient()
+    return _paystack_client
+
+
+async def close_paystack_client() -> None:
+    global _paystack_client
+    if _paystack_client is not None:
+        await _paystack_client.aclose()
+        _paystack_client = None
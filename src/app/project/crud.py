@@ -1,48 +1,88 @@
-from typing import List, Optional, Any
+from typing import List, Optional, Any, Tuple, Dict
 from fastapi.exceptions import HTTPException
+from bson.errors import InvalidId
 from motor.core import AgnosticDatabase
 from odmantic import ObjectId
-from app.project.models import Project
+from pymongo import ReturnDocument
+from app.project.models import Project, datetime_now_sec
 from app.db.base import CRUDBase
 from app.project.schemas import ProjectCreate, ProjectUpdate, ProjectOut
 from app.user.models import User
-import uuid
-import os
+from app.pagination import fetch_page
+from app.project.utils import build_projection, serialize_project, DETAIL_FIELDS
+from app.project.services import store_project_media
+from app.project.derivatives import schedule_project_variants
+from app.storage import get_storage_backend
+from fastapi import UploadFile
 import pprint
 
-UPLOAD_DIRECTORY = "./uploads"
-if not os.path.exists(UPLOAD_DIRECTORY):
-    os.makedirs(UPLOAD_DIRECTORY)
-
 class CRUDProject(CRUDBase[Project, ProjectCreate, ProjectUpdate]):
 
     async def create_project(
-        self, db: AgnosticDatabase, user: User, project_in: Project, picture_or_video: Optional[bytes] = None
+        self, db: AgnosticDatabase, user: User, project_in: Project, picture_or_video: Optional[UploadFile] = None
     ) -> Any:
         project_collection = db.project
         db_obj = project_in.dict()
 
         if picture_or_video:
-            picture_or_video_filename = f"{uuid.uuid4()}_{project_in.picture_or_video}"
-            picture_or_video_path = os.path.join(UPLOAD_DIRECTORY, picture_or_video_filename)
-            with open(picture_or_video_path, "wb") as buffer:
-                buffer.write(picture_or_video)
-            db_obj["picture_or_video"] = picture_or_video_path
-
-        result = await project_collection.insert_one(db_obj)
+            db_obj["picture_or_video"], db_obj["media_hash"] = await store_project_media(picture_or_video)
+            db_obj["media_type"] = picture_or_video.content_type
+
+        try:
+            result = await project_collection.insert_one(db_obj)
+        except Exception:
+            if picture_or_video:
+                await get_storage_backend().delete(db_obj["picture_or_video"])
+            raise
+        if picture_or_video:
+            await schedule_project_variants(db, result.inserted_id, db_obj["picture_or_video"], db_obj["media_type"])
         return str(result.inserted_id)
 
-    async def get_list_project(self, db: AgnosticDatabase) -> List[ProjectOut]:
+    async def get_list_project(
+        self,
+        db: AgnosticDatabase,
+        limit: int,
+        cursor: Optional[str] = None,
+        fields: Optional[str] = None,
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
         project_collection = db.project
-        result = project_collection.find()
-        project_list = []
-        count =0
-        async for document in result:
-            document["id"] = str(document["_id"])
-            del document["_id"]
-            document["user_id"] = str(document["user_id"])
-            project_list.append(ProjectOut(**document))
-        return project_list    
+        documents, next_cursor = await fetch_page(
+            project_collection,
+            {},
+            limit=limit,
+            cursor=cursor,
+            projection=build_projection(fields),
+        )
+        return [serialize_project(document) for document in documents], next_cursor
+
+    async def search_projects(
+        self,
+        db: AgnosticDatabase,
+        text: str,
+        query: Dict[str, Any],
+        limit: int,
+        offset: int = 0,
+        fields: Optional[str] = None,
+    ) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+        """Projects matching `text`, best match first, and the offset of the next page."""
+        project_collection = db.project
+        projection = build_projection(fields)
+        projection["score"] = {"$meta": "textScore"}
+        result = (
+            project_collection.find({"$text": {"$search": text}, **query}, projection)
+            .sort([("score", {"$meta": "textScore"}), ("_id", -1)])
+            .skip(offset)
+            .limit(limit + 1)
+        )
+        documents = await result.to_list(length=limit + 1)
+
+        next_offset = None
+        if len(documents) > limit:
+            documents = documents[:limit]
+            next_offset = offset + limit
+        for document in documents:
+            document.pop("score", None)
+        return [serialize_project(document) for document in documents], next_offset
 
     async def get_project(self, db: AgnosticDatabase, project_id: str) -> Project:
         project_collection = db.project
@@ -53,45 +93,59 @@ class CRUDProject(CRUDBase[Project, ProjectCreate, ProjectUpdate]):
         del project["_id"]
         return Project(**project)
 
-    async def get_projects_by_user(self, db: AgnosticDatabase, user_id: str) -> List[ProjectOut]:
+    async def get_projects_by_user(
+        self, db: AgnosticDatabase, user_id: str, fields: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
         project_collection = db.project
-        result = project_collection.find({"user_id": ObjectId(user_id)})
-        project_list = []
-
-        async for document in result:
-            document["id"] = str(document["_id"])
-            del document["_id"]
-            document["user_id"] = str(document["user_id"])
-            project_list.append(ProjectOut(**document))
-
-        return project_list
-
-    async def update_project(
-        self, db: AgnosticDatabase, user: User, project_id: str, project_in: ProjectUpdate
-    ) -> Project:
+        result = project_collection.find(
+            {"user_id": ObjectId(user_id)}, build_projection(fields)
+        )
+        return [serialize_project(document) async for document in result]
+
+    async def patch_project(
+        self,
+        db: AgnosticDatabase,
+        user: User,
+        project_id: str,
+        changes: Dict[str, Any],
+        expected_version: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """Apply `changes` to a project of `user` in a single round trip.
+
+        With `expected_version` the update only applies while the project is
+        still at that version, every update increments it.
+        """
         project_collection = db.project
-        update_data = {k: v for k, v in project_in.dict().items() if v is not None}
-
-        if not update_data:
+        if not changes:
             raise HTTPException(status_code=400, detail="No data provided for update")
-
-        project = await project_collection.find_one({"_id": ObjectId(project_id)})
-        if not project:
+        try:
+            _id = ObjectId(project_id)
+        except InvalidId:
+            raise HTTPException(status_code=400, detail="The project id provided is not valid")
+
+        # Ownership is part of the filter, another user's project never matches
+        query: Dict[str, Any] = {"_id": _id, "user_id": {"$in": [user.id, str(user.id)]}}
+        if expected_version is not None:
+            # Projects created before versioning have no version field, they are at 0
+            query["version"] = expected_version if expected_version else {"$in": [0, None]}
+        project = await project_collection.find_one_and_update(
+            query,
+            {"$set": {**changes, "modified": datetime_now_sec()}, "$inc": {"version": 1}},
+            projection=build_projection(None, default=DETAIL_FIELDS),
+            return_document=ReturnDocument.AFTER,
+        )
+        if project:
+            return serialize_project(project)
+
+        # Nothing matched, only now find out why
+        existing = await project_collection.find_one({"_id": _id}, {"user_id": 1})
+        if not existing:
             raise HTTPException(status_code=404, detail="Project not found")
-        
-        if str(project["user_id"]) != str(user.id):
+        if str(existing["user_id"]) != str(user.id):
             raise HTTPException(status_code=400, detail="This project does not belong to this user")
-
-        await project_collection.update_one({"_id": ObjectId(project_id)}, {"$set": update_data})
-        updated_project = await project_collection.find_one({"_id": ObjectId(project_id)})
-
-        if not updated_project:
-            raise HTTPException(status_code=404, detail="Project not found after update")
-
-        updated_project["id"] = str(updated_project["_id"])
-        del updated_project["_id"]
-
-        return Project(**updated_project)
+        raise HTTPException(
+            status_code=412, detail="The project was modified by someone else, reload it and try again"
+        )
 
     async def delete_project(self, db: AgnosticDatabase, project_id: str) -> None:
         project_collection = db.project
@@ -99,109 +153,62 @@ class CRUDProject(CRUDBase[Project, ProjectCreate, ProjectUpdate]):
         if result.deleted_count == 0:
             raise HTTPException(status_code=404, detail="Project not found")
 
-    async def get_project_image_path(self, db: AgnosticDatabase, project_id: str) -> str:
+    async def get_project_image_path(self, db: AgnosticDatabase, project_id: str) -> Dict[str, Any]:
         project_collection = db.project
-        project = await project_collection.find_one({"_id": ObjectId(project_id)})
+        project = await project_collection.find_one(
+            {"_id": ObjectId(project_id)},
+            {"_id": 0, "picture_or_video": 1, "media_hash": 1, "media_type": 1, "variants": 1},
+        )
         if not project or not project.get("picture_or_video"):
             raise HTTPException(status_code=404, detail="Project or image not found")
-        return project["picture_or_video"]
+        return project
 
-    async def get_projects_by_category(self, db: AgnosticDatabase, category: str) -> List[ProjectOut]:
+    async def get_projects_by_category(
+        self, db: AgnosticDatabase, category: str, fields: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
         category_collection = db.projectcategories
         project_collection = db.project
 
-        cat = await category_collection.find_one({"_id": ObjectId(category)})
+        cat = await category_collection.find_one({"_id": ObjectId(category)}, {"_id": 1})
         if not cat:
             raise HTTPException(status_code=400, detail="The category provided is not valid")
 
-        result = project_collection.find({"categories": category})
-        project_list = []
-
-        async for document in result:
-            document["id"] = str(document["_id"])
-            del document["_id"]
-            document["user_id"] = str(document["user_id"])
-            project_list.append(ProjectOut(**document))
+        result = project_collection.find({"categories": category}, build_projection(fields))
+        return [serialize_project(document) async for document in result]
 
-        return project_list
-
-    async def update_about(self, db: AgnosticDatabase, project_id: str, about: str) -> Project:
-        project_collection = db.project
-        document = await project_collection.find_one({"_id": ObjectId(project_id)})
-        if not document:
-            raise HTTPException(status_code=400, detail="Project not found")
-
-        await project_collection.update_one({"_id": ObjectId(project_id)}, {"$set": {"about": about}})
-        updated_project = await project_collection.find_one({"_id": ObjectId(project_id)})
-        if not updated_project:
-            raise HTTPException(status_code=404, detail="Project not found after update")
-        
-        updated_project["id"] = str(updated_project["_id"])
-        del updated_project["_id"]
-
-        return Project(**updated_project)
-
-    async def update_story(self, db: AgnosticDatabase, project_id: str, story: str) -> Project:
-        project_collection = db.project
-        document = await project_collection.find_one({"_id": ObjectId(project_id)})
-        if not document:
-            raise HTTPException(status_code=400, detail="Project not found")
-
-        await project_collection.update_one({"_id": ObjectId(project_id)}, {"$set": {"story": story}})
-        updated_project = await project_collection.find_one({"_id": ObjectId(project_id)})
-        if not updated_project:
-            raise HTTPException(status_code=404, detail="Project not found after update")
-        
-        updated_project["id"] = str(updated_project["_id"])
-        del updated_project["_id"]
-
-        return Project(**updated_project)
-
-    async def update_project_category(
-        self, db: AgnosticDatabase, project_id: str, category_id: str
-    ) -> Project:
-        project_collection = db.project
-        document = await project_collection.find_one({"_id": ObjectId(project_id)})
-        if not document:
-            raise HTTPException(status_code=400, detail="Project not found")
-
-        await project_collection.update_one({"_id": ObjectId(project_id)}, {"$set": {"categories": category_id}})
-        updated_project = await project_collection.find_one({"_id": ObjectId(project_id)})
-        if not updated_project:
-            raise HTTPException(status_code=404, detail="Project not found after update")
-        
-        updated_project["id"] = str(updated_project["_id"])
-        del updated_project["_id"]
-
-        return Project(**updated_project)
-    
-    async def get_project_without_user(self, db: AgnosticDatabase, project_id: str) -> Project:
+    async def get_project_without_user(
+        self, db: AgnosticDatabase, project_id: str, fields: Optional[str] = None
+    ) -> Dict[str, Any]:
         project_collection = db.project
-        project = await project_collection.find_one({"_id": ObjectId(project_id)})
+        project = await project_collection.find_one(
+            {"_id": ObjectId(project_id)}, build_projection(fields, default=DETAIL_FIELDS)
+        )
         if not project:
             raise HTTPException(status_code=404, detail="Project not found")
-        project["id"] = str(project["_id"])
-        del project["_id"]
-        return Project(**project)
+        return serialize_project(project)
     
-    async def get_number_of_projects(self, db: AgnosticDatabase) -> int:
+    async def get_number_of_projects(
+        self, db: AgnosticDatabase, query: Optional[Dict[str, Any]] = None
+    ) -> int:
         project_collection = db.project
-        result = project_collection.find()
-        project_list = []
-
-        async for document in result:
-            project_list.append(document)
-            number_of_projects =len(project_list)
-        return number_of_projects
+        if not query:
+            # Served from the collection metadata, no documents are read
+            return await project_collection.estimated_document_count()
+        return await project_collection.count_documents(query)
     
-    async def get_number_of_backings(self, db: AgnosticDatabase) -> int:
-        project_collection = db.project
-        cursor = project_collection.find({"backers": {"$exists": True, "$not": {"$size": 0}}})
-        number_of_backings = 0
+    async def get_number_of_backings(
+        self, db: AgnosticDatabase, query: Optional[Dict[str, Any]] = None
+    ) -> int:
+        if not query:
+            contribution_collection = db.contribution
+            return await contribution_collection.estimated_document_count()
 
-        async for document in cursor:
-            number_of_backings += sum(1 for _ in document.get("backers", []))
-
-        return number_of_backings
+        project_collection = db.project
+        pipeline = [
+            {"$match": query},
+            {"$group": {"_id": None, "number_of_backings": {"$sum": "$backer_count"}}},
+        ]
+        result = await project_collection.aggregate(pipeline).to_list(length=1)
+        return result[0]["number_of_backings"] if result else 0
      
 proj = CRUDProject(Project)
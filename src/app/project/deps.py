@@ -0,0 +1,65 @@
+from typing import Any, Dict, Optional
+from datetime import datetime
+from bson.errors import InvalidId
+from fastapi import Header, HTTPException, Query
+from odmantic import ObjectId
+
+
+def get_project_filter(
+    category: Optional[str] = Query(default=None, description="only count projects in this category id"),
+    user_id: Optional[str] = Query(default=None, description="only count projects created by this user id", max_length=24),
+    created_from: Optional[datetime] = Query(default=None, description="only count projects created at or after this date"),
+    created_to: Optional[datetime] = Query(default=None, description="only count projects created before this date"),
+) -> Dict[str, Any]:
+    """Mongo filter over the project collection built from the optional query parameters."""
+    query: Dict[str, Any] = {}
+    if category:
+        query["categories"] = category
+    if user_id:
+        try:
+            query["user_id"] = ObjectId(user_id)
+        except InvalidId:
+            raise HTTPException(status_code=400, detail="The user id provided is not valid")
+    if created_from or created_to:
+        query["created"] = {}
+        if created_from:
+            query["created"]["$gte"] = created_from
+        if created_to:
+            query["created"]["$lt"] = created_to
+    return query
+
+
+def get_project_search_filter(
+    category: Optional[str] = Query(default=None, description="only projects in this category id"),
+    state: Optional[str] = Query(default=None, description="only projects in this state"),
+    min_raised: Optional[int] = Query(default=None, ge=0, description="only projects that raised at least this amount"),
+    max_raised: Optional[int] = Query(default=None, ge=0, description="only projects that raised at most this amount"),
+) -> Dict[str, Any]:
+    """Mongo filter narrowing down project search results."""
+    query: Dict[str, Any] = {}
+    if category:
+        query["categories"] = category
+    if state:
+        query["state"] = state
+    if min_raised is not None or max_raised is not None:
+        query["raised_amount"] = {}
+        if min_raised is not None:
+            query["raised_amount"]["$gte"] = min_raised
+        if max_raised is not None:
+            query["raised_amount"]["$lte"] = max_raised
+    return query
+
+
+def get_if_match_version(
+    if_match: Optional[str] = Header(default=None, description="the project version the edit is based on"),
+) -> Optional[int]:
+    """Project version an edit requires, None when any version will do."""
+    if if_match is None or if_match.strip() == "*":
+        return None
+    value = if_match.strip()
+    if value.startswith("W/"):
+        value = value[2:]
+    try:
+        return int(value.strip('"'))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="If-Match must be a project version")
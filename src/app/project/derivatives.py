@@ -0,0 +1,115 @@
+import asyncio
+import hashlib
+import io
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Optional, Tuple
+
+from motor.core import AgnosticDatabase
+from odmantic import ObjectId
+from PIL import Image, ImageOps
+
+from app.cache import get_cache_backend
+from app.config import settings
+from app.jobs.crud import job
+from app.storage import get_storage_backend
+
+logger = logging.getLogger(__name__)
+
+# Bounding box of each variant, the aspect ratio of the original is kept
+VARIANT_SIZES: Dict[str, Tuple[int, int]] = {
+    "thumb": (160, 160),
+    "card": (480, 480),
+    "web": (1280, 1280),
+}
+
+# GIFs are left alone, resizing would drop the animation
+DERIVABLE_MEDIA_TYPES = {"image/jpeg", "image/png", "image/webp"}
+
+_derivative_executor: Optional[ProcessPoolExecutor] = None
+
+
+def render_variants(data: bytes) -> Dict[str, Tuple[bytes, int, int]]:
+    """Resize and recompress an image to every VARIANT_SIZES box as JPEG.
+
+    Runs in a worker process, returns the encoded bytes and dimensions by
+    variant name.
+    """
+    with Image.open(io.BytesIO(data)) as original:
+        original = ImageOps.exif_transpose(original)
+        if original.mode != "RGB":
+            original = original.convert("RGB")
+        variants = {}
+        for name, box in VARIANT_SIZES.items():
+            image = original.copy()
+            image.thumbnail(box, Image.Resampling.LANCZOS)
+            buffer = io.BytesIO()
+            image.save(buffer, "JPEG", quality=82, optimize=True, progressive=True)
+            variants[name] = (buffer.getvalue(), image.width, image.height)
+        return variants
+
+
+def get_derivative_executor() -> ProcessPoolExecutor:
+    global _derivative_executor
+    if _derivative_executor is None:
+        _derivative_executor = ProcessPoolExecutor(max_workers=settings.MEDIA_DERIVATIVE_WORKERS)
+    return _derivative_executor
+
+
+def close_derivative_executor() -> None:
+    global _derivative_executor
+    if _derivative_executor is not None:
+        _derivative_executor.shutdown(wait=False, cancel_futures=True)
+        _derivative_executor = None
+
+
+async def generate_project_variants(
+    db: AgnosticDatabase, project_id: ObjectId, location: str
+) -> Dict[str, Dict[str, Any]]:
+    """Store the resized variants of a project's image and record them on the project."""
+    storage = get_storage_backend()
+    data = await storage.read(location)
+    loop = asyncio.get_running_loop()
+    rendered = await loop.run_in_executor(get_derivative_executor(), render_variants, data)
+
+    stem = os.path.splitext(os.path.basename(location))[0]
+    variants = {}
+    for name, (content, width, height) in rendered.items():
+
+        async def chunks(content: bytes = content):
+            yield content
+
+        variants[name] = {
+            "location": await storage.write(f"{stem}.{name}.jpg", chunks(), "image/jpeg"),
+            "media_hash": hashlib.sha256(content).hexdigest(),
+            "width": width,
+            "height": height,
+        }
+
+    project_collection = db.project
+    result = await project_collection.update_one({"_id": project_id}, {"$set": {"variants": variants}})
+    if result.matched_count == 0:
+        # The project was deleted while the variants were being made
+        for variant in variants.values():
+            await storage.delete(variant["location"])
+    else:
+        await get_cache_backend().invalidate_tags("projects")
+    return variants
+
+
+async def schedule_project_variants(
+    db: AgnosticDatabase, project_id: ObjectId, location: str, media_type: Optional[str]
+) -> bool:
+    """Queue the variants of a newly uploaded image for the job workers.
+
+    Returns False when the media gets no variants or they are queued already.
+    """
+    if media_type not in DERIVABLE_MEDIA_TYPES:
+        return False
+    return await job.enqueue(
+        db,
+        "media.variants",
+        {"project_id": str(project_id), "location": location},
+        dedupe_key=f"media.variants:{project_id}",
+    )
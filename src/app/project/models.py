@@ -4,18 +4,20 @@ from datetime import datetime
 from datetime import date
 from pydantic import EmailStr
 from pydantic_extra_types.phone_numbers import PhoneNumber
-from odmantic import ObjectId, Field, Model
-from typing import List,Optional
+from odmantic import ObjectId, Field, Model, EmbeddedModel
+import pymongo
+from typing import Dict, List,Optional
 
 from app.db.base_class import Base
 
 def datetime_now_sec():
     return datetime.now().replace(microsecond=0)
 
-class Backers(Model):
-    backer_name:str =Field(default ="")
-    backer: EmailStr
-    amount:int
+class MediaVariant(EmbeddedModel):
+    location: str
+    media_hash: str
+    width: int
+    height: int
 
 class Project(Base):
     name : str =Field(default = None, min_length =8)
@@ -29,7 +31,43 @@ class Project(Base):
     title: str =Field(default = None, min_length =8)
     about:Optional[str] =Field(default = None, min_length =8)
     picture_or_video:Optional[str] =Field(default=None)
+    media_hash: Optional[str] = Field(default=None)
+    media_type: Optional[str] = Field(default=None)
+    variants: Dict[str, MediaVariant] = Field(default_factory=dict)
     categories: str
     story:Optional[str]=Field(default =None)
     user_id : ObjectId
-    backers:List[Backers]=Field(default_factory =list)
\ No newline at end of file
+    raised_amount: int = Field(default=0)
+    backer_count: int = Field(default=0)
+    # Incremented by every edit, clients send it back in If-Match
+    version: int = Field(default=0)
+
+    model_config = {
+        "indexes": lambda: [
+            # Supports keyset pagination of GET /projects, newest first
+            pymongo.IndexModel(
+                [("created", pymongo.DESCENDING), ("_id", pymongo.DESCENDING)],
+                name="created_id_desc",
+            ),
+            # Projects of a user and of a category, newest first
+            pymongo.IndexModel(
+                [("user_id", pymongo.ASCENDING), ("created", pymongo.DESCENDING)],
+                name="user_id_created",
+            ),
+            pymongo.IndexModel(
+                [("categories", pymongo.ASCENDING), ("created", pymongo.DESCENDING)],
+                name="categories_created",
+            ),
+            # Backs GET /projects/search, a collection can only have one text index
+            pymongo.IndexModel(
+                [
+                    ("title", pymongo.TEXT),
+                    ("name", pymongo.TEXT),
+                    ("about", pymongo.TEXT),
+                    ("story", pymongo.TEXT),
+                ],
+                weights={"title": 10, "name": 5, "about": 3, "story": 1},
+                name="project_text",
+            ),
+        ]
+    }
@@ -1,17 +1,27 @@
 # file: router.py
 import os
-from typing import List, Optional,Any, Union,Annotated
+from typing import List, Optional,Any, Union,Annotated, Dict, Literal
 from datetime import date
 from bson import ObjectId
-from fastapi import APIRouter, Depends, HTTPException, File, UploadFile,Form,Query
+from fastapi import APIRouter, Depends, HTTPException, File, UploadFile,Form,Query,Request
 from motor.core import AgnosticDatabase
-from fastapi.responses import JSONResponse,FileResponse
+from fastapi.responses import JSONResponse,FileResponse,RedirectResponse
 from fastapi.encoders import jsonable_encoder
 from app.auth.deps import get_current_active_user,get_current_active_superuser
 from app.user.models import User
 from app.project.schemas import ProjectCreate, ProjectUpdate, ProjectOut
+from app.contribution.schemas import ContributionOut
 from app.project.crud import proj
-from app.deps import get_db
+from app.project.deps import get_project_filter, get_project_search_filter, get_if_match_version
+from app.contribution.crud import contribution
+from app.deps import get_db, get_cache
+from app.cache import CacheBackend
+from app.storage import get_storage_backend
+from app.responses import (
+    media_file_response, EnvelopeResponse, dumps, raw_json, IMMUTABLE_CACHE_CONTROL, REVALIDATE_CACHE_CONTROL,
+)
+from starlette.concurrency import run_in_threadpool
+from app.config import settings
 import pprint
 from app.project.models import Project , datetime_now_sec
 
@@ -38,6 +48,7 @@ async def create_project(
     story: Optional[str] = Form(None),
     db: AgnosticDatabase = Depends(get_db),
     user: User = Depends(get_current_active_user),
+    cache: CacheBackend = Depends(get_cache),
     picture_or_video : UploadFile =File(None)
     
 ):
@@ -45,8 +56,6 @@ async def create_project(
     the user must be a registered user ."""
     
     try:
-        picture_bytes = await picture_or_video.read() if picture_or_video else None
-
         project_in= Project(
             name = name,
             address = address,
@@ -64,7 +73,8 @@ async def create_project(
         
         print(project_in)
         
-        project_id= await proj.create_project(db,user,project_in, picture_bytes)
+        project_id= await proj.create_project(db,user,project_in, picture_or_video)
+        await cache.invalidate_tags("projects")
         project_id=jsonable_encoder(project_id)
         return JSONResponse(status_code=201, content={
             "status": "success",
@@ -90,17 +100,28 @@ async def create_project(
 
 @router.get("/", response_model=List[Project])
 async def list_projects(
+    limit: int = Query(default=settings.MULTI_MAX, ge=1, le=settings.PAGINATION_MAX_LIMIT, description="number of projects per page"),
+    cursor: Optional[str] = Query(default=None, description="the next_cursor returned with the previous page"),
+    fields: Optional[str] = Query(default=None, description="comma separated project fields to return, or card"),
     db: AgnosticDatabase = Depends(get_db),
+    cache: CacheBackend = Depends(get_cache),
 ):
+    """Retrieve projects newest first, one page at a time,
+    pass the returned next_cursor to get the following page."""
     try:
         
-        projects = await proj.get_list_project(db)
-        projects = jsonable_encoder(projects)
-        return JSONResponse(status_code=200, content={
-            "status": "success",
-            "message": "Projects retrieved successfully",
-            "data": projects
-        })
+        # The page is cached already serialized, a hit is copied into the response as is
+        cache_key = f"projects:page:{limit}:{cursor}:{fields}"
+        page = await cache.get(cache_key)
+        if page is None:
+            projects, next_cursor = await proj.get_list_project(db, limit=limit, cursor=cursor, fields=fields)
+            page = {"data": dumps(projects).decode(), "next_cursor": next_cursor}
+            await cache.set(cache_key, page, tags=["projects"])
+        return EnvelopeResponse(
+            raw_json(page["data"]),
+            message="Projects retrieved successfully",
+            extra={"next_cursor": page["next_cursor"]},
+        )
     except HTTPException as e:
         return JSONResponse(status_code=e.status_code, content={
             "status": "error",
@@ -118,14 +139,16 @@ async def list_projects(
         
 @router.get("/number-of-porjects")
 async def number_of_projects(
+    query: Dict[str, Any] = Depends(get_project_filter),
     db: AgnosticDatabase = Depends(get_db),
 )->int:
     """_summary_
-        this route gives your the number of projects created.
+        this route gives your the number of projects created,
+        optionally only those matching a category, user or creation date range.
     """
     try:
         
-        num_of_projects = await proj.get_number_of_projects(db)
+        num_of_projects = await proj.get_number_of_projects(db, query)
         return JSONResponse(status_code=200, content={
             "status": "success",
             "message": "The number of projects created is:",
@@ -141,11 +164,13 @@ async def number_of_projects(
 
 @router.get("/backings")
 async def get_project_backing(
+    query: Dict[str, Any] = Depends(get_project_filter),
     db: AgnosticDatabase = Depends(get_db),
 )->int:
-    """Retrieve the total number of backings received by all the projects."""
+    """Retrieve the total number of backings received by all the projects,
+    optionally only those matching a category, user or creation date range."""
     try:
-        project_backing = await proj.get_number_of_backings(db)
+        project_backing = await proj.get_number_of_backings(db, query)
         return JSONResponse(status_code=200, content={
             "status": "success",
             "message": "Projects received a total backing of:",
@@ -158,6 +183,48 @@ async def get_project_backing(
             "data": None
         })   
         
+@router.get("/search", response_model=List[ProjectOut])
+async def search_projects(
+    q: str = Query(..., min_length=2, max_length=100, description="words to look for in the title, name, about and story"),
+    limit: int = Query(default=settings.MULTI_MAX, ge=1, le=settings.PAGINATION_MAX_LIMIT, description="number of projects per page"),
+    offset: int = Query(default=0, ge=0, le=settings.SEARCH_MAX_OFFSET, description="the next_offset returned with the previous page"),
+    fields: Optional[str] = Query(default=None, description="comma separated project fields to return, or card"),
+    query: Dict[str, Any] = Depends(get_project_search_filter),
+    db: AgnosticDatabase = Depends(get_db),
+    cache: CacheBackend = Depends(get_cache),
+):
+    """Search projects, best matches first. Matches in the title rank above
+    the name, then the about and the story. Results can be narrowed down by
+    category, state and amount raised."""
+    try:
+        cache_key = f"projects:search:{q}:{sorted(query.items())}:{limit}:{offset}:{fields}"
+        page = await cache.get(cache_key)
+        if page is None:
+            projects, next_offset = await proj.search_projects(
+                db, q, query, limit=limit, offset=offset, fields=fields
+            )
+            page = {"data": jsonable_encoder(projects), "next_offset": next_offset}
+            await cache.set(cache_key, page, tags=["projects"])
+        return JSONResponse(status_code=200, content={
+            "status": "success",
+            "message": "Projects retrieved successfully",
+            "data": page["data"],
+            "next_offset": page["next_offset"]
+        })
+    except HTTPException as e:
+        return JSONResponse(status_code=e.status_code, content={
+            "status": "error",
+            "message": e.detail,
+            "data": None
+        })
+    except Exception as e:
+        return JSONResponse(status_code=500, content={
+            "status": "error",
+            "message": str(e),
+            "data": None
+        })
+
+
 @router.get("/{project_id}", response_model=ProjectOut)
 async def read_project(
     project_id: str,
@@ -185,20 +252,54 @@ async def read_project(
             "data": None
         })
 
-@router.put("/{project_id}", response_model=ProjectOut)
-async def update_project(
+@router.get("/{project_id}/backers", response_model=List[ContributionOut])
+async def get_project_backers(
     project_id: str,
-    project_in: ProjectUpdate,
+    limit: int = Query(default=settings.MULTI_MAX, ge=1, le=settings.PAGINATION_MAX_LIMIT, description="number of backers per page"),
+    cursor: Optional[str] = Query(default=None, description="the next_cursor returned with the previous page"),
     db: AgnosticDatabase = Depends(get_db),
-    user: User = Depends(get_current_active_user)
 ):
+    """Retrieve the backers of a project newest first, one page at a time,
+    pass the returned next_cursor to get the following page."""
     try:
-        updated_project = await proj.update_project(db,user, project_id, project_in)
-        updated_project = jsonable_encoder(updated_project)
+        backers, next_cursor = await contribution.get_project_contributions(db, project_id, limit=limit, cursor=cursor)
+        backers = jsonable_encoder(backers)
         return JSONResponse(status_code=200, content={
             "status": "success",
-            "message": "Project updated successfully",
-            "data": updated_project
+            "message": "Project backers retrieved successfully",
+            "data": backers,
+            "next_cursor": next_cursor
+        })
+    except HTTPException as e:
+        return JSONResponse(status_code=e.status_code, content={
+            "status": "error",
+            "message": e.detail,
+            "data": None
+        })
+    except Exception as e:
+        return JSONResponse(status_code=400, content={
+            "status": "error",
+            "message": str(e),
+            "data": None
+        })
+
+async def _patch_project(
+    db: AgnosticDatabase,
+    user: User,
+    cache: CacheBackend,
+    project_id: str,
+    changes: Dict[str, Any],
+    expected_version: Optional[int],
+    message: str,
+) -> JSONResponse:
+    """Shared by the project edit routes, one atomic update of the project."""
+    try:
+        project = await proj.patch_project(db, user, project_id, changes, expected_version)
+        await cache.invalidate_tags("projects")
+        return JSONResponse(status_code=200, headers={"ETag": f'"{project["version"]}"'}, content={
+            "status": "success",
+            "message": message,
+            "data": jsonable_encoder(project)
         })
     except HTTPException as e:
         return JSONResponse(status_code=e.status_code, content={
@@ -213,14 +314,34 @@ async def update_project(
             "data": None
         })
 
+
+@router.put("/{project_id}", response_model=ProjectOut)
+async def update_project(
+    project_id: str,
+    project_in: ProjectUpdate,
+    expected_version: Optional[int] = Depends(get_if_match_version),
+    db: AgnosticDatabase = Depends(get_db),
+    user: User = Depends(get_current_active_user),
+    cache: CacheBackend = Depends(get_cache)
+):
+    """Update the given fields of a project, fields left out or null are kept.
+    Send the project version as If-Match to only apply the update when
+    nobody changed the project since it was read."""
+    changes = {k: v for k, v in project_in.model_dump().items() if v is not None}
+    return await _patch_project(
+        db, user, cache, project_id, changes, expected_version, "Project updated successfully"
+    )
+
 @router.delete("/{project_id}")
 async def delete_project(
     project_id: str,
     db: AgnosticDatabase = Depends(get_db),
-    user: User = Depends(get_current_active_superuser)
+    user: User = Depends(get_current_active_superuser),
+    cache: CacheBackend = Depends(get_cache)
 ):
     try:
         await proj.delete_project(db, project_id)
+        await cache.invalidate_tags("projects")
         return JSONResponse(status_code=200, content={
             "status": "success",
             "message": "Project deleted successfully",
@@ -242,18 +363,25 @@ async def delete_project(
 
 @router.get("/user/project", response_model=List[ProjectOut])
 async def get_user_projects(
+    fields: Optional[str] = Query(default=None, description="comma separated project fields to return, or card"),
     db: AgnosticDatabase = Depends(get_db),
     user: User = Depends(get_current_active_user)
 ):
     """Retrieve projects created by the current user"""
     try:
-        user_projects = await proj.get_projects_by_user(db, user.id)
+        user_projects = await proj.get_projects_by_user(db, user.id, fields=fields)
         user_projects = jsonable_encoder(user_projects)
         return JSONResponse(status_code=200, content={
             "status": "success",
             "message": "User projects retrieved successfully",
             "data": user_projects
         })
+    except HTTPException as e:
+        return JSONResponse(status_code=e.status_code, content={
+            "status": "error",
+            "message": e.detail,
+            "data": None
+        })
     except Exception as e:
         return JSONResponse(status_code=500, content={
             "status": "error",
@@ -266,91 +394,71 @@ async def get_user_projects(
 async def update_about_project(
     project_id: str = Query(description="the project ID", max_length=24),
     about: str = Query(description="update for the about field",max_length=2000),
+    expected_version: Optional[int] = Depends(get_if_match_version),
     user:User =Depends(get_current_active_user),
-    db: AgnosticDatabase=Depends(get_db)
+    db: AgnosticDatabase=Depends(get_db),
+    cache: CacheBackend = Depends(get_cache)
 ):
-    
-    try:
-        project = await proj.update_about(db,project_id,about)
-        project =jsonable_encoder(project)
-        return JSONResponse(status_code=200, content={
-                "status": "success",
-                "message": "Projects about filed updated successfully retrieved successfully",
-                "data": project
-            })
-    except Exception as e:
-        return JSONResponse(status_code=500, content={
-            "status": "error",
-            "message": str(e),
-            "data": None
-        }) 
+    return await _patch_project(
+        db, user, cache, project_id, {"about": about}, expected_version,
+        "Projects about filed updated successfully retrieved successfully",
+    )
 
 
 
 @router.put("/project/update_story")
-async def update_about_project(
+async def update_story_project(
     project_id: str = Query(description="the project ID", max_length=24),
     story: str = Query(description="update for the about field",max_length=2000),
+    expected_version: Optional[int] = Depends(get_if_match_version),
     user:User =Depends(get_current_active_user),
-    db: AgnosticDatabase=Depends(get_db)
+    db: AgnosticDatabase=Depends(get_db),
+    cache: CacheBackend = Depends(get_cache)
 ):
-    
-    try:
-        project = await proj.update_story(db,project_id,story)
-        project =jsonable_encoder(project)
-        return JSONResponse(status_code=200, content={
-                "status": "success",
-                "message": "Projects about filed updated successfully retrieved successfully",
-                "data": project
-            })
-    except Exception as e:
-        return JSONResponse(status_code=500, content={
-            "status": "error",
-            "message": str(e),
-            "data": None
-        }) 
+    return await _patch_project(
+        db, user, cache, project_id, {"story": story}, expected_version,
+        "Projects about filed updated successfully retrieved successfully",
+    )
 
 
 @router.put("/project/update_category")
 async def update_project_catagory(
     project_id: str = Query(description="the project ID", max_length=24),
     category_id: str =Query(description="the category id", max_length=24),
-    # user:User =Depends(get_current_active_user),
-    db: AgnosticDatabase=Depends(get_db)
+    expected_version: Optional[int] = Depends(get_if_match_version),
+    user:User =Depends(get_current_active_user),
+    db: AgnosticDatabase=Depends(get_db),
+    cache: CacheBackend = Depends(get_cache)
 ):
     """This route updates the category field of a project, 
     obtain the category id from the project category route
     , use the id to update the category a project created"""
-    
-    try:
-        project = await proj.update_project_category(db,project_id,category_id)
-        project =jsonable_encoder(project)
-        return JSONResponse(status_code=200, content={
-                "status": "success",
-                "message": "Projects about filed updated successfully retrieved successfully",
-                "data": project
-            })
-    except Exception as e:
-        return JSONResponse(status_code=500, content={
-            "status": "error",
-            "message": str(e),
-            "data": None
-        }) 
+    return await _patch_project(
+        db, user, cache, project_id, {"categories": category_id}, expected_version,
+        "Projects about filed updated successfully retrieved successfully",
+    )
 
 @router.get("/filter/category", response_model=List[ProjectOut])
 async def filter_projects_by_category(
     category: str = Query(..., description="Category to filter projects by"),
+    fields: Optional[str] = Query(default=None, description="comma separated project fields to return, or card"),
     db: AgnosticDatabase = Depends(get_db),
 ):
     """Retrieve projects filtered by category"""
     try:
-        projects = await proj.get_projects_by_category(db, category)
+        projects = await proj.get_projects_by_category(db, category, fields=fields)
         projects = jsonable_encoder(projects)
         return JSONResponse(status_code=200, content={
             "status": "success",
             "message": "Projects filtered by category retrieved successfully",
             "data": projects
         })
+    except HTTPException as e:
+        return JSONResponse(status_code=e.status_code, content={
+            "status": "error",
+            "message": e.detail,
+            "data": None
+        })
     except Exception as e:
         return JSONResponse(status_code=500, content={
             "status": "error",
@@ -362,13 +470,14 @@ async def filter_projects_by_category(
 @router.get("/project/{project_id}", response_model=ProjectOut)
 async def get_user_projects(
     project_id =str,
+    fields: Optional[str] = Query(default=None, description="comma separated project fields to return, or card"),
     db: AgnosticDatabase = Depends(get_db),
 ):
     """Retrieve project with the project_id without , authorising a user,
     this route give you a project when provided with the project id"""
     
     try:
-        project = await proj.get_project_without_user(db, project_id)
+        project = await proj.get_project_without_user(db, project_id, fields=fields)
         project = jsonable_encoder(project)
         return JSONResponse(status_code=200, content={
             "status": "success",
@@ -376,6 +485,12 @@ async def get_user_projects(
             "data": project
         })
 
+    except HTTPException as e:
+        return JSONResponse(status_code=e.status_code, content={
+            "status": "error",
+            "message": e.detail,
+            "data": None
+        })
     except Exception as e:
         return JSONResponse(status_code=500, content={
             "status": "error",
@@ -386,20 +501,64 @@ async def get_user_projects(
 
 @router.get("/image_or_video/{project_id}")
 async def get_project_image(
+    request: Request,
     project_id: str,
-    db: AgnosticDatabase = Depends(get_db)
+    size: Optional[Literal["thumb", "card", "web"]] = Query(default=None, description="resized variant to return, the original when not given"),
+    v: Optional[str] = Query(default=None, description="content hash from the project's media_url"),
+    db: AgnosticDatabase = Depends(get_db),
+    cache: CacheBackend = Depends(get_cache),
 ):
     """Retrieve the image or video of a project by project ID, 
-    provide the project id , in the route to receive the image or video"""
+    provide the project id , in the route to receive the image or video.
+    Byte ranges and conditional requests are supported. Images can be
+    requested at a smaller size, the original is returned until the resized
+    variants are ready."""
     try:
-        image_path = await proj.get_project_image_path(db, project_id)
-        if not os.path.exists(image_path):
+        cache_key = f"projects:media:{project_id}"
+        media = await cache.get(cache_key)
+        if media is None:
+            media = await proj.get_project_image_path(db, project_id)
+            await cache.set(cache_key, media, tags=["projects"])
+
+        location = media["picture_or_video"]
+        media_hash = media.get("media_hash")
+        media_type = media.get("media_type")
+        variant = (media.get("variants") or {}).get(size) if size else None
+        if variant:
+            location, media_hash, media_type = variant["location"], variant["media_hash"], "image/jpeg"
+
+        storage = get_storage_backend()
+        image_url = await storage.presigned_url(location)
+        if image_url:
+            return RedirectResponse(image_url)
+        image_path = storage.local_path(location)
+        try:
+            stat_result = await run_in_threadpool(os.stat, image_path) if image_path else None
+        except FileNotFoundError:
+            stat_result = None
+        if stat_result is None:
             return JSONResponse(status_code=404, content={
                 "status": "error",
                 "message": "Image not found",
                 "data": None
             })
-        return FileResponse(image_path)
+
+        if media_hash:
+            etag = f'"{media_hash}"'
+        else:
+            # Media uploaded before content hashes were recorded
+            etag = f'W/"{int(stat_result.st_mtime)}-{stat_result.st_size}"'
+        cache_control = (
+            IMMUTABLE_CACHE_CONTROL if media_hash and v == media_hash else REVALIDATE_CACHE_CONTROL
+        )
+        return media_file_response(
+            request,
+            image_path,
+            stat_result=stat_result,
+            etag=etag,
+            media_type=media_type,
+            cache_control=cache_control,
+        )
     except HTTPException as e:
         return JSONResponse(status_code=e.status_code, content={
             "status": "error",
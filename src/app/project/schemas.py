@@ -3,20 +3,13 @@
 from pydantic import BaseModel, Field,EmailStr
 from odmantic import ObjectId
 from datetime import datetime , date
-from typing import Optional,List
+from typing import Dict, Optional,List
 
 
 
 def datetime_now_sec():
     return datetime.now().replace(microsecond=0)
 
-class Backers(BaseModel):
-    backer_name:str=Field(default ="")
-    backers: EmailStr
-    amount:int
-
-
-
 class ProjectCreate(BaseModel):
     name: str = Field(default =None , description = "The name of user creating the project",example ="JohnDoe", min_length =8, max_length =64)
     address: str =Field(default =None , description = "The addres of the user",example ="Lagos,Nigeria",max_length =1000)
@@ -27,7 +20,6 @@ class ProjectCreate(BaseModel):
     about: Optional[str]=Field(default =None , description = "The user states what their kickstarted is about",example ="JohnDoe", min_length =8, max_length =600)
     categories: str=Field(default =None , description = "The user add the categories of his/her project",example ="Design $ tech", max_length =24)
     story: Optional[str]=Field(default =None , description = "user shares the story of the project",example ="user story", min_length =8, max_length =1000)
-    backers:List[Backers] =Field(default_factory =list)
 
 
 class Projectin(ProjectCreate):
@@ -45,6 +37,11 @@ class ProjectUpdate(BaseModel):
     categories: Optional[str] = None
     story: Optional[str] = None
 
+class MediaVariantOut(BaseModel):
+    url: str
+    width: int
+    height: int
+
 class ProjectOut(BaseModel):
     id: str
     name: str
@@ -58,7 +55,12 @@ class ProjectOut(BaseModel):
     title: Optional[str] = Field(default = None)
     about: Optional[str] = Field(default = None)
     picture_or_video: Optional[str]= Field(default = None)
+    media_url: Optional[str] = Field(default = None)
+    variants: Dict[str, MediaVariantOut] = Field(default_factory = dict)
     categories: Optional[str] = Field(default = None)
     story: Optional[str] = Field(default = None)
     user_id: Optional[str] = Field(default = None)
+    raised_amount: int = Field(default = 0)
+    backer_count: int = Field(default = 0)
+    version: int = Field(default = 0)
     featured:Optional[bool]=Field(default =False)
\ No newline at end of file
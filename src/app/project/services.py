@@ -0,0 +1,99 @@
+import hashlib
+import os
+import re
+import uuid
+from typing import AsyncIterator, Optional, Tuple
+
+from fastapi import UploadFile
+from fastapi.exceptions import HTTPException
+
+from app.config import settings
+from app.storage import get_storage_backend
+
+# Media a project may be illustrated with, by declared content type
+ALLOWED_MEDIA_TYPES = {
+    "image/jpeg",
+    "image/png",
+    "image/gif",
+    "image/webp",
+    "video/mp4",
+    "video/quicktime",
+    "video/webm",
+}
+
+_UNSAFE_FILENAME_CHARS = re.compile(r"[^A-Za-z0-9._-]+")
+
+
+def sniff_media_type(head: bytes) -> Optional[str]:
+    """Guess the media type from the leading bytes of a file."""
+    if head.startswith(b"\xff\xd8\xff"):
+        return "image/jpeg"
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "image/png"
+    if head.startswith((b"GIF87a", b"GIF89a")):
+        return "image/gif"
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    if head[4:8] == b"ftyp":
+        return "video/quicktime" if head[8:10] == b"qt" else "video/mp4"
+    if head.startswith(b"\x1a\x45\xdf\xa3"):
+        return "video/webm"
+    return None
+
+
+def _matches(declared: str, sniffed: Optional[str]) -> bool:
+    if sniffed is None:
+        return False
+    # mp4 and quicktime share the ISO container, either is accepted for the other
+    containers = {"video/mp4", "video/quicktime"}
+    return declared == sniffed or {declared, sniffed} <= containers
+
+
+async def iter_upload(
+    upload: UploadFile, max_bytes: int, chunk_size: int, digest: Optional["hashlib._Hash"] = None
+) -> AsyncIterator[bytes]:
+    """Yield the uploaded file chunk by chunk, checking its type and size on the way.
+
+    Every chunk is also fed to `digest` when one is given.
+    """
+    received = 0
+    first = True
+    while True:
+        chunk = await upload.read(chunk_size)
+        if not chunk:
+            break
+        if first:
+            if not _matches(upload.content_type, sniff_media_type(chunk)):
+                raise HTTPException(status_code=415, detail="File content does not match its type")
+            first = False
+        received += len(chunk)
+        if received > max_bytes:
+            raise HTTPException(status_code=413, detail="File is too large")
+        if digest is not None:
+            digest.update(chunk)
+        yield chunk
+    if first:
+        raise HTTPException(status_code=400, detail="Uploaded file is empty")
+
+
+async def store_project_media(upload: UploadFile) -> Tuple[str, str]:
+    """Stream an uploaded picture or video to the media storage.
+
+    Returns the location of the stored file and the sha256 of its content.
+    """
+    if upload.content_type not in ALLOWED_MEDIA_TYPES:
+        raise HTTPException(status_code=415, detail="Unsupported media type")
+    max_bytes = settings.MEDIA_MAX_UPLOAD_BYTES
+    if upload.size is not None and upload.size > max_bytes:
+        raise HTTPException(status_code=413, detail="File is too large")
+
+    filename = _UNSAFE_FILENAME_CHARS.sub("_", os.path.basename(upload.filename or "media"))
+    key = f"{uuid.uuid4()}_{filename}"
+    digest = hashlib.sha256()
+    storage = get_storage_backend()
+    location = await storage.write(
+        key,
+        iter_upload(upload, max_bytes, settings.MEDIA_UPLOAD_CHUNK_BYTES, digest),
+        upload.content_type,
+    )
+    return location, digest.hexdigest()
@@ -0,0 +1,80 @@
+from typing import Any, Dict, Iterable, Optional
+from fastapi.exceptions import HTTPException
+from app.config import settings
+from app.project.schemas import ProjectOut
+
+# Project fields a client may select with `fields=`
+PROJECT_FIELDS = frozenset(ProjectOut.model_fields) - {"id", "featured", "media_url"}
+
+# What a project card in a list view needs, no backers and no story/about bodies
+CARD_FIELDS = (
+    "name",
+    "title",
+    "amount",
+    "state",
+    "categories",
+    "picture_or_video",
+    "variants",
+    "duration",
+    "created",
+    "user_id",
+    "raised_amount",
+    "backer_count",
+)
+
+# Everything shown on the project page
+DETAIL_FIELDS = tuple(sorted(PROJECT_FIELDS))
+
+
+def build_projection(fields: Optional[str], default: Iterable[str] = CARD_FIELDS) -> Dict[str, Any]:
+    """Map a `fields=` query value to a Mongo projection.
+
+    `card` selects CARD_FIELDS, any other value is a comma separated list of
+    project fields, and no value falls back to `default`.
+    """
+    if not fields:
+        selected = set(default)
+    elif fields == "card":
+        selected = set(CARD_FIELDS)
+    else:
+        selected = {field.strip() for field in fields.split(",") if field.strip()}
+        unknown = selected - PROJECT_FIELDS
+        if unknown:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Unknown project fields: {', '.join(sorted(unknown))}",
+            )
+    # `created` is always returned, it is the pagination key
+    selected.add("created")
+    if "picture_or_video" in selected:
+        selected.add("media_hash")
+    return {field: 1 for field in selected}
+
+
+def media_url(project_id: str, media_hash: Optional[str], size: Optional[str] = None) -> str:
+    """URL of the project media, versioned by content hash so it can be cached forever."""
+    url = f"{settings.API_V1_STR}/projects/image_or_video/{project_id}"
+    params = [f"size={size}"] if size else []
+    if media_hash:
+        params.append(f"v={media_hash}")
+    return f"{url}?{'&'.join(params)}" if params else url
+
+
+def serialize_project(document: Dict[str, Any]) -> Dict[str, Any]:
+    """Turn a (projected) project document into its API representation."""
+    document["id"] = str(document.pop("_id"))
+    if document.get("user_id") is not None:
+        document["user_id"] = str(document["user_id"])
+    media_hash = document.pop("media_hash", None)
+    if document.get("picture_or_video"):
+        document["media_url"] = media_url(document["id"], media_hash)
+    if "variants" in document:
+        document["variants"] = {
+            size: {
+                "url": media_url(document["id"], variant["media_hash"], size),
+                "width": variant["width"],
+                "height": variant["height"],
+            }
+            for size, variant in (document["variants"] or {}).items()
+        }
+    return document
@@ -7,7 +7,8 @@ from fastapi.encoders import jsonable_encoder
 from app.auth.deps import get_current_active_superuser
 from app.project_categories.schemas import ProjectCreate, ProjectCateUpdate
 from app.project_categories.crud import procat
-from app.deps import get_db
+from app.deps import get_db, get_cache
+from app.cache import CacheBackend
 from app.user.models import User
 
 router = APIRouter(
@@ -20,10 +21,12 @@ async def create_project_category(
     *,
     db: AgnosticDatabase = Depends(get_db),
     project_in: ProjectCreate,
-    current_user: User = Depends(get_current_active_superuser)
+    current_user: User = Depends(get_current_active_superuser),
+    cache: CacheBackend = Depends(get_cache)
 ):
     try:
         project_category = await procat.create_project_category(db=db, obj_in=project_in)
+        await cache.invalidate_tags("project_categories")
         return JSONResponse(status_code=200, content={
             "status": "success",
             "message": "Project category created successfully",
@@ -41,10 +44,12 @@ async def delete_project_category(
     *,
     db: AgnosticDatabase = Depends(get_db),
     id: str,
-    current_user: User = Depends(get_current_active_superuser)
+    current_user: User = Depends(get_current_active_superuser),
+    cache: CacheBackend = Depends(get_cache)
 ):
     try:
         result = await procat.delete_project_category(db=db, id=id)
+        await cache.invalidate_tags("project_categories")
         if result == True:
             return JSONResponse(status_code=200, content={
                 "status": "success",
@@ -60,11 +65,15 @@ async def delete_project_category(
 
 @router.get("/", response_model=List[ProjectCreate])
 async def get_project_categories(
-    db: AgnosticDatabase = Depends(get_db)
+    db: AgnosticDatabase = Depends(get_db),
+    cache: CacheBackend = Depends(get_cache)
 ):
     try:
-        categories = await procat.get_project_categories(db=db)
-        categories = jsonable_encoder(categories)
+        categories = await cache.get("project_categories:list")
+        if categories is None:
+            categories = await procat.get_project_categories(db=db)
+            categories = jsonable_encoder(categories)
+            await cache.set("project_categories:list", categories, tags=["project_categories"])
         return JSONResponse(status_code=200, content={
             "status": "success",
             "message": "Project categories retrieved successfully",
@@ -0,0 +1,18 @@
+import asyncio
+import logging
+
+from app.db.session import MongoDatabase
+from app.payment.crud import payment
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+async def main() -> None:
+    logger.info("Reconciling project funding counters")
+    corrected = await payment.reconcile_project_funding(MongoDatabase())
+    logger.info(f"Corrected the funding counters of {corrected} projects")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,172 @@
+import os
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Any, Mapping, Optional, Tuple
+
+import anyio
+import orjson
+from bson import Decimal128, ObjectId
+from fastapi import Request
+from fastapi.responses import FileResponse, Response
+from pydantic import BaseModel
+
+# For URLs that embed the content hash, the bytes behind them never change
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "public, no-cache"
+
+
+def _default(obj: Any) -> Any:
+    # orjson handles datetimes, dicts and lists itself, only what it does not know gets here
+    if isinstance(obj, ObjectId):
+        return str(obj)
+    if isinstance(obj, BaseModel):
+        return obj.model_dump()
+    if isinstance(obj, Decimal128):
+        return str(obj.to_decimal())
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    """JSON for Mongo documents and models as they are, no jsonable_encoder pass needed."""
+    return orjson.dumps(content, default=_default)
+
+
+def raw_json(text: str) -> orjson.Fragment:
+    """Embed already serialized JSON, e.g. from the cache, as is."""
+    return orjson.Fragment(text)
+
+
+class EnvelopeResponse(Response):
+    """The `status`/`message`/`data` envelope, serialized in a single pass by orjson.
+
+    `extra` keys, such as `next_cursor`, are added next to `data`.
+    """
+
+    media_type = "application/json"
+
+    def __init__(
+        self,
+        data: Any = None,
+        *,
+        message: str,
+        status: str = "success",
+        status_code: int = 200,
+        extra: Optional[Mapping[str, Any]] = None,
+        headers: Optional[Mapping[str, str]] = None,
+    ):
+        content = {"status": status, "message": message, "data": data}
+        if extra:
+            content.update(extra)
+        super().__init__(content, status_code=status_code, headers=headers)
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+class RangeFileResponse(FileResponse):
+    """FileResponse sending only the inclusive `byte_range` of the file."""
+
+    def __init__(self, path: str, byte_range: Tuple[int, int], **kwargs):
+        super().__init__(path, status_code=206, **kwargs)
+        self.byte_range = byte_range
+        start, end = byte_range
+        self.headers["content-length"] = str(end - start + 1)
+        self.headers["content-range"] = f"bytes {start}-{end}/{self.stat_result.st_size}"
+
+    async def __call__(self, scope, receive, send) -> None:
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        start, end = self.byte_range
+        if scope["method"].upper() == "HEAD":
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+        else:
+            remaining = end - start + 1
+            async with await anyio.open_file(self.path, mode="rb") as file:
+                await file.seek(start)
+                while remaining > 0:
+                    chunk = await file.read(min(self.chunk_size, remaining))
+                    # An empty read means the file shrank, end the body there
+                    remaining = remaining - len(chunk) if chunk else 0
+                    await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
+        if self.background is not None:
+            await self.background()
+
+
+def parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """Parse a single `bytes=` range, None when it cannot be satisfied.
+
+    Raises ValueError for headers that should be ignored (malformed or with
+    several ranges), the whole file is sent for those.
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        raise ValueError(header)
+    first, _, last = spec.strip().partition("-")
+    if not first:
+        # Suffix range, the last `last` bytes
+        length = int(last)
+        if length <= 0:
+            return None
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = int(last) if last else size - 1
+    if start > end and last:
+        raise ValueError(header)
+    if start >= size:
+        return None
+    return start, min(end, size - 1)
+
+
+def _not_modified(request: Request, etag: str, modified: float) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        # If-None-Match uses the weak comparison
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        return "*" in tags or etag.removeprefix("W/") in tags
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return int(modified) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def media_file_response(
+    request: Request,
+    path: str,
+    *,
+    stat_result: os.stat_result,
+    etag: str,
+    media_type: Optional[str] = None,
+    cache_control: str = REVALIDATE_CACHE_CONTROL,
+) -> Response:
+    """Serve a file honouring conditional GETs and single byte ranges."""
+    headers = {
+        "etag": etag,
+        "last-modified": formatdate(stat_result.st_mtime, usegmt=True),
+        "cache-control": cache_control,
+        "accept-ranges": "bytes",
+    }
+    if _not_modified(request, etag, stat_result.st_mtime):
+        return Response(status_code=304, headers=headers)
+
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    # A stale If-Range means the client's partial copy is outdated, send it
+    # all. Weak tags never match If-Range.
+    if range_header and (if_range is None or (if_range == etag and not etag.startswith("W/"))):
+        try:
+            byte_range = parse_range(range_header, stat_result.st_size)
+        except ValueError:
+            pass
+        else:
+            if byte_range is None:
+                return Response(
+                    status_code=416,
+                    headers={**headers, "content-range": f"bytes */{stat_result.st_size}"},
+                )
+            return RangeFileResponse(
+                path, byte_range, headers=headers, media_type=media_type, stat_result=stat_result
+            )
+    return FileResponse(path, headers=headers, media_type=media_type, stat_result=stat_result)
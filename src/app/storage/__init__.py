@@ -0,0 +1,29 @@
+from typing import Optional
+
+from app.config import settings
+from app.storage.base import StorageBackend
+from app.storage.local import LocalStorageBackend
+
+__all__ = ["LocalStorageBackend", "StorageBackend", "get_storage_backend"]
+
+_storage_backend: Optional[StorageBackend] = None
+
+
+def get_storage_backend() -> StorageBackend:
+    global _storage_backend
+    if _storage_backend is None:
+        if settings.MEDIA_STORAGE_BACKEND == "s3":
+            # boto3 is only loaded when S3 storage is configured
+            from app.storage.s3 import S3StorageBackend
+
+            _storage_backend = S3StorageBackend(
+                settings.AWS_S3_BUCKET_NAME,
+                region=settings.AWS_REGION,
+                access_key_id=settings.AWS_ACCESS_KEY_ID,
+                secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
+                endpoint_url=settings.AWS_S3_ENDPOINT_URL,
+                url_expire_seconds=settings.MEDIA_URL_EXPIRE_SECONDS,
+            )
+        else:
+            _storage_backend = LocalStorageBackend(settings.MEDIA_LOCAL_DIRECTORY)
+    return _storage_backend
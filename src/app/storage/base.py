@@ -0,0 +1,26 @@
+from typing import AsyncIterator, Optional
+
+
+class StorageBackend:
+    """Interface of the media storage.
+
+    `write` consumes the content chunk by chunk and returns the location to
+    keep on the document, the other methods take that location back.
+    """
+
+    async def write(self, key: str, chunks: AsyncIterator[bytes], content_type: str) -> str:
+        raise NotImplementedError
+
+    async def read(self, location: str) -> bytes:
+        raise NotImplementedError
+
+    async def delete(self, location: str) -> None:
+        raise NotImplementedError
+
+    def local_path(self, location: str) -> Optional[str]:
+        """Path of the file when it can be served straight from disk."""
+        return None
+
+    async def presigned_url(self, location: str) -> Optional[str]:
+        """Time-limited URL clients can download the file from directly."""
+        return None
@@ -0,0 +1,51 @@
+import os
+from typing import AsyncIterator, Optional
+
+from starlette.concurrency import run_in_threadpool
+
+from app.storage.base import StorageBackend
+
+
+class LocalStorageBackend(StorageBackend):
+    """Stores media on the local disk, the location is the file path."""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    async def write(self, key: str, chunks: AsyncIterator[bytes], content_type: str) -> str:
+        path = os.path.join(self.directory, key)
+        partial_path = f"{path}.part"
+        buffer = await run_in_threadpool(open, partial_path, "wb")
+        try:
+            async for chunk in chunks:
+                await run_in_threadpool(buffer.write, chunk)
+            await run_in_threadpool(buffer.close)
+            # Only complete uploads ever appear under their final name
+            await run_in_threadpool(os.replace, partial_path, path)
+        except BaseException:
+            await run_in_threadpool(buffer.close)
+            await run_in_threadpool(_remove_if_exists, partial_path)
+            raise
+        return path
+
+    async def read(self, location: str) -> bytes:
+        return await run_in_threadpool(_read_file, location)
+
+    async def delete(self, location: str) -> None:
+        await run_in_threadpool(_remove_if_exists, location)
+
+    def local_path(self, location: str) -> Optional[str]:
+        return location
+
+
+def _read_file(path: str) -> bytes:
+    with open(path, "rb") as buffer:
+        return buffer.read()
+
+
+def _remove_if_exists(path: str) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
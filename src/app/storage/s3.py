@@ -0,0 +1,107 @@
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+import boto3
+from starlette.concurrency import run_in_threadpool
+
+from app.storage.base import StorageBackend
+
+# S3 refuses multipart parts smaller than 5 MiB, except the last one
+MIN_PART_SIZE = 5 * 1024 * 1024
+
+
+class S3StorageBackend(StorageBackend):
+    """Stores media in an S3-compatible bucket through multipart uploads.
+
+    At most one part is held in memory at a time. Set `endpoint_url` to use
+    any S3-compatible server, such as a local stand-in.
+    """
+
+    def __init__(
+        self,
+        bucket: str,
+        *,
+        region: str,
+        access_key_id: str,
+        secret_access_key: str,
+        endpoint_url: Optional[str] = None,
+        url_expire_seconds: int = 3600,
+    ):
+        self.bucket = bucket
+        self.url_expire_seconds = url_expire_seconds
+        self.client = boto3.client(
+            "s3",
+            region_name=region,
+            aws_access_key_id=access_key_id,
+            aws_secret_access_key=secret_access_key,
+            endpoint_url=endpoint_url,
+        )
+
+    def _parse(self, location: str) -> Tuple[str, str]:
+        bucket, _, key = location.removeprefix("s3://").partition("/")
+        return bucket, key
+
+    async def write(self, key: str, chunks: AsyncIterator[bytes], content_type: str) -> str:
+        upload = await run_in_threadpool(
+            self.client.create_multipart_upload,
+            Bucket=self.bucket,
+            Key=key,
+            ContentType=content_type,
+        )
+        upload_id = upload["UploadId"]
+        parts: List[Dict[str, Any]] = []
+        buffer = bytearray()
+
+        async def upload_part(body: bytes) -> None:
+            part_number = len(parts) + 1
+            result = await run_in_threadpool(
+                self.client.upload_part,
+                Bucket=self.bucket,
+                Key=key,
+                UploadId=upload_id,
+                PartNumber=part_number,
+                Body=body,
+            )
+            parts.append({"ETag": result["ETag"], "PartNumber": part_number})
+
+        try:
+            async for chunk in chunks:
+                buffer.extend(chunk)
+                if len(buffer) >= MIN_PART_SIZE:
+                    await upload_part(bytes(buffer))
+                    buffer.clear()
+            if buffer or not parts:
+                await upload_part(bytes(buffer))
+            await run_in_threadpool(
+                self.client.complete_multipart_upload,
+                Bucket=self.bucket,
+                Key=key,
+                UploadId=upload_id,
+                MultipartUpload={"Parts": parts},
+            )
+        except BaseException:
+            await run_in_threadpool(
+                self.client.abort_multipart_upload,
+                Bucket=self.bucket,
+                Key=key,
+                UploadId=upload_id,
+            )
+            raise
+        return f"s3://{self.bucket}/{key}"
+
+    async def read(self, location: str) -> bytes:
+        bucket, key = self._parse(location)
+        result = await run_in_threadpool(self.client.get_object, Bucket=bucket, Key=key)
+        return await run_in_threadpool(result["Body"].read)
+
+    async def delete(self, location: str) -> None:
+        bucket, key = self._parse(location)
+        await run_in_threadpool(self.client.delete_object, Bucket=bucket, Key=key)
+
+    async def presigned_url(self, location: str) -> Optional[str]:
+        bucket, key = self._parse(location)
+        return await run_in_threadpool(
+            self.client.generate_presigned_url,
+            "get_object",
+            Params={"Bucket": bucket, "Key": key},
+            ExpiresIn=self.url_expire_seconds,
+        )
@@ -0,0 +1,28 @@
+import os
+
+# Settings without defaults, for modules that read them at import. The tests
+# talk to local fakes, nothing here reaches a real service.
+for name, value in {
+    "SERVER_NAME": "ripple-tests",
+    "PROJECT_NAME": "Ripple",
+    "MONGO_DATABASE": "ripple_tests",
+    "MONGO_DATABASE_URI": "mongodb://localhost:27017",
+    "MONGO_USERNAME": "ripple",
+    "MONGO_PASSWORD": "ripple",
+    "FIRST_SUPERUSER": "admin@example.com",
+    "FIRST_SUPERUSER_PASSWORD": "ripple-admin",
+    "GOOGLE_CLIENT_ID": "test",
+    "GOOGLE_CLIENT_SECRET": "test",
+    "MICROSOFT_CLIENT_ID": "test",
+    "MICROSOFT_CLIENT_SECRET": "test",
+    "APPLE_CLIENT_ID": "test",
+    "APPLE_CLIENT_SECRET": "test",
+    "AWS_ACCESS_KEY_ID": "test",
+    "AWS_SECRET_ACCESS_KEY": "test",
+    "AWS_REGION": "us-east-1",
+    "AWS_S3_BUCKET_NAME": "ripple-tests",
+    "YOUR_GOOGLE_MAPS_API_KEY": "test",
+    "PAYSTACK_SECRET_KEY": "sk_test",
+    "PAYSTACK_BASE_URL": "https://paystack.test",
+}.items():
+    os.environ.setdefault(name, value)
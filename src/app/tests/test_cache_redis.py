@@ -0,0 +1,161 @@
+import asyncio
+import time
+import unittest
+from typing import Dict, List, Optional, Set
+
+from app.cache.redis import RedisCacheBackend, RedisError
+
+
+class FakeRedisServer:
+    """Just enough of a Redis server for the commands the cache backend sends."""
+
+    def __init__(self) -> None:
+        self.values: Dict[bytes, bytes] = {}
+        self.sets: Dict[bytes, Set[bytes]] = {}
+        self.connections = 0
+        # Seconds to wait before answering, to run into the client timeout
+        self.delay = 0.0
+        # Answer EXEC with a failed command in the middle of its reply
+        self.fail_in_exec = False
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self) -> str:
+        self._server = await asyncio.start_server(self._serve, "127.0.0.1", 0)
+        port = self._server.sockets[0].getsockname()[1]
+        return f"redis://127.0.0.1:{port}/0"
+
+    async def stop(self) -> None:
+        self._server.close()
+        await self._server.wait_closed()
+
+    async def _read_command(self, reader: asyncio.StreamReader) -> Optional[List[bytes]]:
+        line = await reader.readline()
+        if not line:
+            return None
+        args = []
+        for _ in range(int(line[1:-2])):
+            length = int((await reader.readline())[1:-2])
+            args.append((await reader.readexactly(length + 2))[:-2])
+        return args
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.connections += 1
+        queued: Optional[List[List[bytes]]] = None
+        try:
+            while True:
+                args = await self._read_command(reader)
+                if args is None:
+                    break
+                if self.delay:
+                    await asyncio.sleep(self.delay)
+                name = args[0].upper()
+                if name == b"MULTI":
+                    queued = []
+                    reply = b"+OK\r\n"
+                elif name == b"EXEC":
+                    replies = [self._reply(command) for command in queued or []]
+                    if self.fail_in_exec:
+                        replies[0] = b"-ERR injected\r\n"
+                    reply = b"*%d\r\n" % len(replies) + b"".join(replies)
+                    queued = None
+                elif queued is not None:
+                    queued.append(args)
+                    reply = b"+QUEUED\r\n"
+                else:
+                    reply = self._reply(args)
+                writer.write(reply)
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    def _reply(self, args: List[bytes]) -> bytes:
+        name, args = args[0].upper(), args[1:]
+        if name == b"GET":
+            value = self.values.get(args[0])
+            return b"$-1\r\n" if value is None else b"$%d\r\n%s\r\n" % (len(value), value)
+        if name == b"SET":
+            self.values[args[0]] = args[1]
+            return b"+OK\r\n"
+        if name == b"DEL":
+            removed = 0
+            for key in args:
+                removed += (self.values.pop(key, None) is not None) + (self.sets.pop(key, None) is not None)
+            return b":%d\r\n" % removed
+        if name == b"SADD":
+            self.sets.setdefault(args[0], set()).update(args[1:])
+            return b":%d\r\n" % (len(args) - 1)
+        if name == b"EXPIRE":
+            return b":1\r\n"
+        if name == b"SMEMBERS":
+            members = sorted(self.sets.get(args[0], ()))
+            return b"*%d\r\n" % len(members) + b"".join(
+                b"$%d\r\n%s\r\n" % (len(member), member) for member in members
+            )
+        return b"-ERR unknown command '%s'\r\n" % name.lower()
+
+
+class RedisCacheBackendTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self.server = FakeRedisServer()
+        url = await self.server.start()
+        self.cache = RedisCacheBackend(url, ttl=60, prefix="test:", timeout=0.2)
+
+    async def asyncTearDown(self) -> None:
+        await self.cache.close()
+        await self.server.stop()
+
+    async def test_round_trip_reuses_the_pooled_connection(self) -> None:
+        await self.cache.set("page", {"items": [1, 2]})
+        self.assertEqual(await self.cache.get("page"), {"items": [1, 2]})
+        self.assertIsNone(await self.cache.get("missing"))
+        self.assertEqual(self.server.connections, 1)
+
+    async def test_invalidate_tags_drops_the_tagged_entries(self) -> None:
+        await self.cache.set("first", 1, tags=["projects"])
+        await self.cache.set("second", 2, tags=["projects"])
+        await self.cache.set("other", 3, tags=["users"])
+        await self.cache.invalidate_tags("projects")
+        self.assertIsNone(await self.cache.get("first"))
+        self.assertIsNone(await self.cache.get("second"))
+        self.assertEqual(await self.cache.get("other"), 3)
+        self.assertNotIn(b"test:tag:projects", self.server.sets)
+
+    async def test_slow_reply_is_a_miss_and_drops_the_connection(self) -> None:
+        await self.cache.set("page", 1)
+        self.server.delay = 1.0
+        started = time.monotonic()
+        self.assertIsNone(await self.cache.get("page"))
+        self.assertLess(time.monotonic() - started, 0.9)
+        # The late reply must not answer the next command
+        self.server.delay = 0.0
+        self.assertEqual(await self.cache.get("page"), 1)
+        self.assertEqual(self.server.connections, 2)
+
+    async def test_connect_timeout(self) -> None:
+        # AUTH is the first thing sent on a new connection
+        self.cache.password = "secret"
+        self.server.delay = 1.0
+        started = time.monotonic()
+        self.assertIsNone(await self.cache.get("page"))
+        self.assertLess(time.monotonic() - started, 0.9)
+        self.assertTrue(self.cache._pool.empty())
+
+    async def test_error_inside_exec_reply_drops_the_connection(self) -> None:
+        await self.cache.set("first", 1, tags=["projects"])
+        self.server.fail_in_exec = True
+        await self.cache.invalidate_tags("projects")
+        self.assertTrue(self.cache._pool.empty())
+        # A new connection answers the next command with its own reply
+        self.server.fail_in_exec = False
+        self.assertEqual(await self.cache.get("first"), 1)
+        self.assertEqual(self.server.connections, 2)
+
+    async def test_error_reply_keeps_the_connection(self) -> None:
+        with self.assertRaises(RedisError):
+            await self.cache._execute(("NOSUCHCOMMAND",), ("GET", "test:page"))
+        self.assertEqual(self.cache._pool.qsize(), 1)
+        await self.cache.set("page", 1)
+        self.assertEqual(await self.cache.get("page"), 1)
+        self.assertEqual(self.server.connections, 1)
@@ -0,0 +1,72 @@
+import asyncio
+import threading
+import time
+import unittest
+from typing import Any, Dict, Optional
+from unittest import mock
+
+from odmantic import ObjectId
+
+from app.config import settings
+from app.jobs import worker
+
+
+class ProcessNextTest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.job = {
+            "_id": ObjectId(),
+            "name": "test.slow",
+            "payload": {},
+            "attempts": 1,
+            "max_attempts": 3,
+            "locked_by": "worker:claim",
+        }
+        self.crud = mock.patch.multiple(
+            worker.job_crud,
+            claim=mock.AsyncMock(return_value=self.job),
+            extend=mock.AsyncMock(return_value=True),
+            complete=mock.AsyncMock(),
+            fail=mock.AsyncMock(return_value=False),
+        )
+        self.crud.start()
+        self.addCleanup(self.crud.stop)
+        visibility = mock.patch.object(settings, "JOB_VISIBILITY_TIMEOUT_SECONDS", 0.15)
+        visibility.start()
+        self.addCleanup(visibility.stop)
+        self.finished = threading.Event()
+
+    def slow_handler(self, seconds: float, error: Optional[Exception] = None):
+        def handler(db: Any, payload: Dict[str, Any]) -> None:
+            time.sleep(seconds)
+            self.finished.set()
+            if error:
+                raise error
+
+        return handler
+
+    async def test_claim_is_renewed_until_a_long_job_finishes(self) -> None:
+        with mock.patch.dict(worker.TASKS, {"test.slow": self.slow_handler(0.4)}):
+            self.assertTrue(await worker.process_next(None, "worker"))
+        self.assertTrue(self.finished.is_set())
+        # Renewed every third of the visibility timeout, the claim never lapsed
+        self.assertGreaterEqual(worker.job_crud.extend.await_count, 5)
+        worker.job_crud.complete.assert_awaited_once_with(None, self.job)
+        worker.job_crud.fail.assert_not_awaited()
+
+        renewals = worker.job_crud.extend.await_count
+        await asyncio.sleep(0.2)
+        self.assertEqual(worker.job_crud.extend.await_count, renewals)
+
+    async def test_failure_is_only_recorded_once_the_handler_stopped(self) -> None:
+        handler = self.slow_handler(0.4, error=TimeoutError("timed out"))
+        with mock.patch.dict(worker.TASKS, {"test.slow": handler}):
+            self.assertTrue(await worker.process_next(None, "worker"))
+        self.assertTrue(self.finished.is_set())
+        worker.job_crud.fail.assert_awaited_once_with(None, self.job, "TimeoutError: timed out")
+        worker.job_crud.complete.assert_not_awaited()
+
+    async def test_renewal_stops_once_the_claim_is_lost(self) -> None:
+        worker.job_crud.extend.return_value = False
+        with mock.patch.dict(worker.TASKS, {"test.slow": self.slow_handler(0.4)}):
+            await worker.process_next(None, "worker")
+        worker.job_crud.extend.assert_awaited_once()
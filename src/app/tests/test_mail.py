@@ -0,0 +1,162 @@
+import smtplib
+import unittest
+from email.message import EmailMessage
+from typing import List, Optional, Set
+from unittest import mock
+
+from odmantic import ObjectId
+
+from app.jobs.tasks import email_project_funded
+from app.mail import Mail, MailBatchError, MailService, SMTPPool
+
+
+class FakeSMTP:
+    """Stands in for smtplib.SMTP, every instance is one connection to the relay."""
+
+    # Set by the tests, shared by all connections
+    instances: List["FakeSMTP"] = []
+    refused: Set[str] = set()
+    # Connections opened from now on drop after sending this many messages
+    disconnect_after: Optional[int] = None
+    refuse_connections = False
+
+    def __init__(self, host: str, port: int, timeout: float):
+        if FakeSMTP.refuse_connections:
+            raise ConnectionRefusedError("relay is down")
+        self.timeout = timeout
+        self.sent: List[EmailMessage] = []
+        self.logins = 0
+        self.resets = 0
+        self.closed = False
+        self.drop_after = FakeSMTP.disconnect_after
+        FakeSMTP.instances.append(self)
+
+    def login(self, user: str, password: str) -> None:
+        self.logins += 1
+
+    def noop(self):
+        return (250, b"OK")
+
+    def send_message(self, message: EmailMessage) -> None:
+        if self.closed or (self.drop_after is not None and len(self.sent) >= self.drop_after):
+            self.closed = True
+            raise smtplib.SMTPServerDisconnected("Connection unexpectedly closed")
+        if message["To"] in FakeSMTP.refused:
+            raise smtplib.SMTPRecipientsRefused({message["To"]: (550, b"No such user")})
+        self.sent.append(message)
+
+    def rset(self) -> None:
+        self.resets += 1
+
+    def quit(self) -> None:
+        if self.closed:
+            raise smtplib.SMTPServerDisconnected("not connected")
+        self.closed = True
+
+    def close(self) -> None:
+        self.closed = True
+
+
+def mails(*addresses: str) -> List[Mail]:
+    return [Mail(email_to=address, subject="Hello", html="<p>Hello</p>") for address in addresses]
+
+
+class MailServiceTest(unittest.TestCase):
+    def setUp(self) -> None:
+        FakeSMTP.instances = []
+        FakeSMTP.refused = set()
+        FakeSMTP.disconnect_after = None
+        FakeSMTP.refuse_connections = False
+        patcher = mock.patch("app.mail.smtplib.SMTP", FakeSMTP)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.pool = SMTPPool("smtp.test", 587, user="ripple", password="secret", size=2, timeout=5.0)
+        self.service = MailService(self.pool, "app/email-templates/build", ("Ripple", "noreply@example.com"))
+        self.addCleanup(self.pool.close)
+
+    def delivered(self) -> List[str]:
+        return [message["To"] for connection in FakeSMTP.instances for message in connection.sent]
+
+    def test_connection_is_reused_between_mails(self) -> None:
+        for mail in mails("a@example.com", "b@example.com"):
+            self.service.send(mail)
+        self.assertEqual(self.service.send_batch(mails("c@example.com", "d@example.com")), [])
+        self.assertEqual(len(FakeSMTP.instances), 1)
+        self.assertEqual(FakeSMTP.instances[0].logins, 1)
+        self.assertEqual(FakeSMTP.instances[0].timeout, 5.0)
+        self.assertEqual(self.delivered(), ["a@example.com", "b@example.com", "c@example.com", "d@example.com"])
+
+    def test_idle_connection_is_checked_before_reuse(self) -> None:
+        self.pool.idle_check_seconds = 0
+        self.service.send(mails("a@example.com")[0])
+        with mock.patch.object(FakeSMTP, "noop", side_effect=smtplib.SMTPServerDisconnected()):
+            self.service.send(mails("b@example.com")[0])
+        self.assertEqual(len(FakeSMTP.instances), 2)
+        self.assertEqual(self.delivered(), ["a@example.com", "b@example.com"])
+
+    def test_reconnects_after_the_relay_drops_the_connection(self) -> None:
+        FakeSMTP.disconnect_after = 2
+        failed = self.service.send_batch(mails("a@example.com", "b@example.com", "c@example.com"))
+        self.assertEqual(failed, [])
+        self.assertEqual(len(FakeSMTP.instances), 2)
+        self.assertEqual(self.delivered(), ["a@example.com", "b@example.com", "c@example.com"])
+        # The dropped connection is not pooled again
+        self.assertIs(self.pool.acquire(), FakeSMTP.instances[1])
+
+    def test_refused_recipients_do_not_stop_the_batch(self) -> None:
+        FakeSMTP.refused = {"gone@example.com"}
+        failed = self.service.send_batch(mails("a@example.com", "gone@example.com", "b@example.com"))
+        self.assertEqual([mail.email_to for mail, _ in failed], ["gone@example.com"])
+        self.assertIsInstance(failed[0][1], smtplib.SMTPRecipientsRefused)
+        self.assertEqual(self.delivered(), ["a@example.com", "b@example.com"])
+        self.assertEqual(FakeSMTP.instances[0].resets, 1)
+        with self.assertRaises(smtplib.SMTPRecipientsRefused):
+            self.service.send(mails("gone@example.com")[0])
+        self.assertEqual(len(FakeSMTP.instances), 1)
+
+    def test_connection_failure_reports_the_mails_already_sent(self) -> None:
+        FakeSMTP.disconnect_after = 2
+        FakeSMTP.refused = {"gone@example.com"}
+        batch = mails("a@example.com", "gone@example.com", "b@example.com", "c@example.com")
+        original = self.pool._connect
+
+        def connect_once():
+            # The relay goes away for good after the first connection
+            FakeSMTP.refuse_connections = bool(FakeSMTP.instances)
+            return original()
+
+        with mock.patch.object(self.pool, "_connect", connect_once):
+            with self.assertRaises(MailBatchError) as raised:
+                self.service.send_batch(batch)
+        self.assertEqual([mail.email_to for mail in raised.exception.sent], ["a@example.com", "b@example.com"])
+        self.assertEqual([mail.email_to for mail, _ in raised.exception.failed], ["gone@example.com"])
+        self.assertIsInstance(raised.exception.error, ConnectionRefusedError)
+        self.assertTrue(FakeSMTP.instances[0].closed)
+
+    def test_send_raises_the_connection_error(self) -> None:
+        FakeSMTP.refuse_connections = True
+        with self.assertRaises(ConnectionRefusedError):
+            self.service.send(mails("a@example.com")[0])
+
+
+class EmailProjectFundedTest(unittest.IsolatedAsyncioTestCase):
+    async def test_backers_reached_before_a_connection_failure_are_marked(self) -> None:
+        project_id = ObjectId()
+        db = mock.MagicMock()
+        db.project.find_one = mock.AsyncMock(return_value={"_id": project_id, "title": "Wells", "amount": 100})
+        db.contribution.aggregate.return_value.__aiter__.return_value = [
+            {"_id": "a@example.com", "backer_name": "A", "notified": None},
+            {"_id": "b@example.com", "backer_name": "B", "notified": None},
+            {"_id": "c@example.com", "backer_name": "C", "notified": None},
+        ]
+        db.contribution.update_many = mock.AsyncMock()
+        error = MailBatchError(ConnectionRefusedError("relay is down"), mails("a@example.com", "b@example.com"), [])
+
+        with mock.patch("app.jobs.tasks.send_project_funded_batch", side_effect=error):
+            with self.assertRaises(MailBatchError):
+                await email_project_funded(db, {"project_id": str(project_id)})
+
+        db.contribution.update_many.assert_awaited_once_with(
+            {"project_id": project_id, "backer": {"$in": ["a@example.com", "b@example.com"]}},
+            {"$set": {"funded_notified": True}},
+        )
@@ -0,0 +1,133 @@
+import unittest
+from typing import Callable, List
+
+import httpx
+
+from app.deps import get_db
+from app.main import app
+from app.payment.deps import get_paystack
+from app.payment.services import PaystackClient
+
+
+def paystack_client(handler: Callable[[httpx.Request], httpx.Response], max_retries: int = 2) -> PaystackClient:
+    return PaystackClient(
+        base_url="https://paystack.test",
+        secret_key="sk_test",
+        timeout=1.0,
+        max_retries=max_retries,
+        transport=httpx.MockTransport(handler),
+    )
+
+
+class PaystackClientTest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.requests: List[httpx.Request] = []
+
+    def respond(self, *outcomes: object) -> Callable[[httpx.Request], httpx.Response]:
+        """A transport answering each request with the next outcome, a status code or an exception."""
+        remaining = list(outcomes)
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            self.requests.append(request)
+            outcome = remaining.pop(0)
+            if isinstance(outcome, Exception):
+                raise outcome
+            return httpx.Response(outcome, json={"status": outcome == 200, "data": {"status": "success"}})
+
+        return handler
+
+    async def test_sends_the_secret_key(self) -> None:
+        client = paystack_client(self.respond(200))
+        response = await client.verify_transaction("ref-1")
+        await client.aclose()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.requests[0].url, "https://paystack.test/transaction/verify/ref-1")
+        self.assertEqual(self.requests[0].headers["Authorization"], "Bearer sk_test")
+
+    async def test_get_is_retried_on_server_errors(self) -> None:
+        client = paystack_client(self.respond(502, 503, 200))
+        response = await client.verify_transaction("ref-1")
+        await client.aclose()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(self.requests), 3)
+
+    async def test_get_returns_the_last_server_error_once_retries_run_out(self) -> None:
+        client = paystack_client(self.respond(500, 500, 500, 200))
+        response = await client.verify_transaction("ref-1")
+        await client.aclose()
+        self.assertEqual(response.status_code, 500)
+        self.assertEqual(len(self.requests), 3)
+
+    async def test_get_is_retried_after_a_read_timeout(self) -> None:
+        client = paystack_client(self.respond(httpx.ReadTimeout("timed out"), 200))
+        response = await client.verify_transaction("ref-1")
+        await client.aclose()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(self.requests), 2)
+
+    async def test_client_errors_are_returned_without_retrying(self) -> None:
+        client = paystack_client(self.respond(404))
+        response = await client.verify_transaction("ref-1")
+        await client.aclose()
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(len(self.requests), 1)
+
+    async def test_post_is_not_resent_once_paystack_may_have_seen_it(self) -> None:
+        client = paystack_client(self.respond(502, 200))
+        response = await client.initialize_transaction({"amount": 100})
+        await client.aclose()
+        self.assertEqual(response.status_code, 502)
+
+        client = paystack_client(self.respond(httpx.ReadTimeout("timed out"), 200))
+        with self.assertRaises(httpx.ReadTimeout):
+            await client.initialize_transaction({"amount": 100})
+        await client.aclose()
+        self.assertEqual(len(self.requests), 2)
+
+    async def test_post_is_retried_when_the_connection_failed(self) -> None:
+        client = paystack_client(self.respond(httpx.ConnectError("refused"), httpx.ConnectTimeout("timed out"), 200))
+        response = await client.initialize_transaction({"amount": 100})
+        await client.aclose()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(self.requests), 3)
+
+    async def test_connection_errors_are_raised_once_retries_run_out(self) -> None:
+        client = paystack_client(self.respond(*[httpx.ConnectError("refused")] * 2), max_retries=1)
+        with self.assertRaises(httpx.ConnectError):
+            await client.verify_transaction("ref-1")
+        await client.aclose()
+        self.assertEqual(len(self.requests), 2)
+
+
+class VerifyTransactionRouteTest(unittest.IsolatedAsyncioTestCase):
+    async def verify(self, handler: Callable[[httpx.Request], httpx.Response]) -> httpx.Response:
+        client = paystack_client(handler, max_retries=0)
+        app.dependency_overrides[get_paystack] = lambda: client
+        app.dependency_overrides[get_db] = lambda: None
+        try:
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as http:
+                return await http.get("/api/v1/payment/verify-transaction/ref-1")
+        finally:
+            app.dependency_overrides.clear()
+            await client.aclose()
+
+    async def test_successful_transaction(self) -> None:
+        response = await self.verify(
+            lambda request: httpx.Response(200, json={"data": {"status": "success"}})
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {"status": "success"})
+
+    async def test_paystack_error_is_an_error_envelope(self) -> None:
+        response = await self.verify(lambda request: httpx.Response(404, json={"status": False}))
+        self.assertEqual(response.status_code, 500)
+        self.assertEqual(response.json()["status"], "error")
+        self.assertIn("Transaction verification failed", response.json()["message"])
+
+    async def test_paystack_timeout_is_an_error_envelope(self) -> None:
+        def timeout(request: httpx.Request) -> httpx.Response:
+            raise httpx.ReadTimeout("timed out", request=request)
+
+        response = await self.verify(timeout)
+        self.assertEqual(response.status_code, 500)
+        self.assertEqual(response.json(), {"status": "error", "message": "timed out", "data": None})
@@ -0,0 +1,150 @@
+import io
+import os
+import tempfile
+import unittest
+from typing import AsyncIterator, List
+from unittest import mock
+
+import boto3
+from fastapi import HTTPException, UploadFile
+from moto import mock_aws
+from starlette.datastructures import Headers
+
+import app.storage
+from app.config import settings
+from app.project.services import store_project_media
+from app.storage.local import LocalStorageBackend
+from app.storage.s3 import MIN_PART_SIZE, S3StorageBackend
+
+MiB = 1024 * 1024
+JPEG_HEAD = b"\xff\xd8\xff\xe0"
+
+
+async def chunked(data: bytes, size: int = MiB) -> AsyncIterator[bytes]:
+    for start in range(0, len(data), size):
+        yield data[start:start + size]
+
+
+async def failing_after(data: bytes) -> AsyncIterator[bytes]:
+    async for chunk in chunked(data):
+        yield chunk
+    raise RuntimeError("client went away")
+
+
+def jpeg_upload(size: int) -> UploadFile:
+    # The size is unknown until the body is read, as with chunked uploads
+    return UploadFile(
+        io.BytesIO(JPEG_HEAD + b"\0" * (size - len(JPEG_HEAD))),
+        filename="cover photo.jpg",
+        headers=Headers({"content-type": "image/jpeg"}),
+    )
+
+
+class LocalStorageBackendTest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.storage = LocalStorageBackend(self.directory.name)
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    async def test_write_read_delete(self) -> None:
+        data = os.urandom(3 * MiB + 5)
+        location = await self.storage.write("media.bin", chunked(data), "application/octet-stream")
+        self.assertEqual(location, os.path.join(self.directory.name, "media.bin"))
+        self.assertEqual(self.storage.local_path(location), location)
+        self.assertEqual(await self.storage.read(location), data)
+        self.assertEqual(os.listdir(self.directory.name), ["media.bin"])
+        await self.storage.delete(location)
+        await self.storage.delete(location)
+        self.assertEqual(os.listdir(self.directory.name), [])
+
+    async def test_interrupted_write_leaves_nothing(self) -> None:
+        with self.assertRaises(RuntimeError):
+            await self.storage.write("media.bin", failing_after(b"\0" * 2 * MiB), "application/octet-stream")
+        self.assertEqual(os.listdir(self.directory.name), [])
+
+    async def test_upload_over_the_size_cap_is_refused(self) -> None:
+        with mock.patch.object(app.storage, "_storage_backend", self.storage), mock.patch.object(
+            settings, "MEDIA_MAX_UPLOAD_BYTES", 2 * MiB
+        ):
+            with self.assertRaises(HTTPException) as raised:
+                await store_project_media(jpeg_upload(3 * MiB))
+            location, _ = await store_project_media(jpeg_upload(2 * MiB))
+        self.assertEqual(raised.exception.status_code, 413)
+        self.assertEqual(os.listdir(self.directory.name), [os.path.basename(location)])
+        self.assertTrue(location.endswith("_cover_photo.jpg"))
+
+
+class S3StorageBackendTest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.aws = mock_aws()
+        self.aws.start()
+        self.s3 = boto3.client("s3", region_name="us-east-1")
+        self.s3.create_bucket(Bucket="media")
+        self.storage = S3StorageBackend(
+            "media", region="us-east-1", access_key_id="test", secret_access_key="test"
+        )
+        # Sizes of the parts sent, the backend holds at most one in memory
+        self.part_sizes: List[int] = []
+        upload_part = self.storage.client.upload_part
+
+        def record_part(**kwargs):
+            self.part_sizes.append(len(kwargs["Body"]))
+            return upload_part(**kwargs)
+
+        self.storage.client.upload_part = record_part
+
+    def tearDown(self) -> None:
+        self.aws.stop()
+
+    def open_uploads(self) -> list:
+        return self.s3.list_multipart_uploads(Bucket="media").get("Uploads", [])
+
+    def keys(self) -> List[str]:
+        return [item["Key"] for item in self.s3.list_objects_v2(Bucket="media").get("Contents", [])]
+
+    async def test_streams_in_parts(self) -> None:
+        data = os.urandom(2 * MIN_PART_SIZE + 3 * MiB)
+        location = await self.storage.write("media.bin", chunked(data), "application/octet-stream")
+        self.assertEqual(location, "s3://media/media.bin")
+        self.assertEqual(self.part_sizes, [MIN_PART_SIZE, MIN_PART_SIZE, 3 * MiB])
+        self.assertEqual(await self.storage.read(location), data)
+        head = self.s3.head_object(Bucket="media", Key="media.bin")
+        self.assertEqual(head["ContentType"], "application/octet-stream")
+        self.assertTrue(head["ETag"].strip('"').endswith("-3"))
+        self.assertEqual(self.open_uploads(), [])
+
+    async def test_small_and_empty_files_are_one_part(self) -> None:
+        for key, data in [("small.bin", b"small"), ("empty.bin", b"")]:
+            self.part_sizes.clear()
+            location = await self.storage.write(key, chunked(data), "application/octet-stream")
+            self.assertEqual(self.part_sizes, [len(data)])
+            self.assertEqual(await self.storage.read(location), data)
+
+    async def test_presigned_url_and_delete(self) -> None:
+        location = await self.storage.write("media.bin", chunked(b"data"), "application/octet-stream")
+        url = await self.storage.presigned_url(location)
+        self.assertIn("/media.bin?", url)
+        self.assertIn("Expires=", url)
+        await self.storage.delete(location)
+        self.assertEqual(self.keys(), [])
+
+    async def test_interrupted_write_aborts_the_upload(self) -> None:
+        with self.assertRaises(RuntimeError):
+            await self.storage.write("media.bin", failing_after(b"\0" * (MIN_PART_SIZE + MiB)), "application/octet-stream")
+        # A part went out before the failure, the aborted upload drops it
+        self.assertEqual(self.part_sizes, [MIN_PART_SIZE])
+        self.assertEqual(self.open_uploads(), [])
+        self.assertEqual(self.keys(), [])
+
+    async def test_upload_over_the_size_cap_is_aborted(self) -> None:
+        with mock.patch.object(app.storage, "_storage_backend", self.storage), mock.patch.object(
+            settings, "MEDIA_MAX_UPLOAD_BYTES", MIN_PART_SIZE + MiB
+        ):
+            with self.assertRaises(HTTPException) as raised:
+                await store_project_media(jpeg_upload(MIN_PART_SIZE + 2 * MiB))
+        self.assertEqual(raised.exception.status_code, 413)
+        self.assertEqual(self.part_sizes, [MIN_PART_SIZE])
+        self.assertEqual(self.open_uploads(), [])
+        self.assertEqual(self.keys(), [])
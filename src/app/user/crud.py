@@ -6,8 +6,10 @@ from motor.core import AgnosticDatabase
 from bson import ObjectId
 import pprint
 
-from app.auth.security import get_password_hash, verify_password_hash
+from app.auth.security import get_password_hash_async, verify_password_hash_async
 from app.db.base import CRUDBase
+from app.cache import TTLCache, broadcast
+from app.config import settings
 from app.user.models import User
 from datetime import date
 
@@ -24,8 +26,30 @@ import json
 import bson
 from bson import json_util
 
+user_cache = TTLCache(
+    maxsize=settings.USER_CACHE_MAXSIZE, ttl=settings.USER_CACHE_TTL_SECONDS
+)
+broadcast.subscribe("user", user_cache.pop)
+
+
 # ODM, Schema, Schema
 class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
+    async def get_cached(self, db: AgnosticDatabase, id: Any) -> User | None:
+        """Like `get`, served from the per-worker user cache when possible."""
+        user = user_cache.get(str(id))
+        if user is None:
+            user = await self.get(db, id)
+            if not user:
+                return None
+            user_cache.set(str(id), user)
+        # Callers may modify the user, never hand out the cached instance
+        return user.model_copy(deep=True)
+
+    @staticmethod
+    def invalidate_cached(id: Any) -> None:
+        user_cache.pop(str(id))
+        broadcast.publish("user", [id])
+
     async def get_by_email(
         self, db: AgnosticDatabase, *, email: EmailStr
     ) -> User | None:  # noqa
@@ -36,7 +60,7 @@ class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
         user = {
             **obj_in.model_dump(),
             "email": obj_in.email,
-            "hashed_password": get_password_hash(obj_in.password)
+            "hashed_password": await get_password_hash_async(obj_in.password)
             if obj_in.password is not None
             else None,
             "full_name": obj_in.full_name,
@@ -57,12 +81,14 @@ class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
         else:
             update_data = obj_in.model_dump(exclude_unset=True)
         if update_data.get("password"):
-            hashed_password = get_password_hash(update_data["password"])
+            hashed_password = await get_password_hash_async(update_data["password"])
             del update_data["password"]
             update_data["hashed_password"] = hashed_password
         if update_data.get("email") and db_obj.email != update_data["email"]:
             update_data["email_validated"] = False
-        return await super().update(db, db_obj=db_obj, obj_in=update_data)
+        user = await super().update(db, db_obj=db_obj, obj_in=update_data)
+        self.invalidate_cached(user.id)
+        return user
 
     async def authenticate(
         self, db: AgnosticDatabase, *, email: str, password: str
@@ -70,39 +96,29 @@ class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
         user = await self.get_by_email(db, email=email)
         if not user:
             return None
-        if not verify_password_hash(
+        if not await verify_password_hash_async(
             plain_password=password, hashed_password=user.hashed_password
         ):
             return None
         return user
 
     async def validate_email(self, db: AgnosticDatabase, *, db_obj: User) -> User:
-        obj_in = UserUpdate(**UserInDB.model_validate(db_obj).model_dump())
-        obj_in.email_validated = True
-        return await self.update(db=db, db_obj=db_obj, obj_in=obj_in)
+        return await self.update(db=db, db_obj=db_obj, obj_in={"email_validated": True})
 
     async def activate_totp(
         self, db: AgnosticDatabase, *, db_obj: User, totp_in: NewTOTP
     ) -> User:
-        obj_in = UserUpdate(**UserInDB.model_validate(db_obj).model_dump())
-        obj_in = obj_in.model_dump(exclude_unset=True)
-        obj_in["totp_secret"] = totp_in.secret
-        return await self.update(db=db, db_obj=db_obj, obj_in=obj_in)
+        return await self.update(db=db, db_obj=db_obj, obj_in={"totp_secret": totp_in.secret})
 
     async def deactivate_totp(self, db: AgnosticDatabase, *, db_obj: User) -> User:
-        obj_in = UserUpdate(**UserInDB.model_validate(db_obj).model_dump())
-        obj_in = obj_in.model_dump(exclude_unset=True)
-        obj_in["totp_secret"] = None
-        obj_in["totp_counter"] = None
-        return await self.update(db=db, db_obj=db_obj, obj_in=obj_in)
+        return await self.update(
+            db=db, db_obj=db_obj, obj_in={"totp_secret": None, "totp_counter": None}
+        )
 
     async def update_totp_counter(
         self, db: AgnosticDatabase, *, db_obj: User, new_counter: int
     ) -> User:
-        obj_in = UserUpdate(**UserInDB.model_validate(db_obj).model_dump())
-        obj_in = obj_in.model_dump(exclude_unset=True)
-        obj_in["totp_counter"] = new_counter
-        return await self.update(db=db, db_obj=db_obj, obj_in=obj_in)
+        return await self.update(db=db, db_obj=db_obj, obj_in={"totp_counter": new_counter})
 
     async def toggle_user_state(
         self, db: AgnosticDatabase, *, obj_in: Union[UserUpdate, Dict[str, Any]]
@@ -149,6 +165,7 @@ class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
         
         #updating user
         updated_user = await user_collection.update_one(document_to_update, update)
+        self.invalidate_cached(document_to_update["_id"])
         # pprint.pprint(updated_user)
         print(updated_user.matched_count)
         
@@ -5,6 +5,7 @@ from datetime import date
 from pydantic import EmailStr
 from pydantic_extra_types.phone_numbers import PhoneNumber
 from odmantic import ObjectId, Field
+import pymongo
 from typing import List
 
 from app.db.base_class import Base
@@ -32,6 +33,12 @@ class User(Base):
     email_validated: bool = Field(default=False)
     is_active: bool = Field(default=True)
     is_superuser: bool = Field(default=True)
-    refresh_tokens: list[ObjectId] = Field(default_factory=list)
     verification_pin: str = Field(default=None)
     project_backed:Optional[List[ObjectId]] = Field(default_factory=list)
+
+    model_config = {
+        "indexes": lambda: [
+            # Login and every lookup by email, one account per address
+            pymongo.IndexModel([("email", pymongo.ASCENDING)], unique=True, name="email_unique"),
+        ]
+    }
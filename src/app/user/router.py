@@ -16,7 +16,7 @@ from app.user import models
 from app import deps
 from app.config import settings
 from app.auth import security
-from app.auth.service import send_email_validation_email
+from app.jobs.crud import job
 from app.auth.schemas import EmailValidation 
 from app.auth import deps as auth_deps
 # from exceptions import BaseException
@@ -84,11 +84,11 @@ async def create_user_profile(
             email=email, subject="Email Verification", token=verification_pin
         )  # noqa
 
+        user = await crud.user.create(db, obj_in=user_in)
+
         # send email verifiication to email
         if settings.EMAILS_ENABLED and email:
-            send_email_validation_email(email_data)
-
-        user = await crud.user.create(db, obj_in=user_in)
+            await job.enqueue(db, "email.validation", email_data.model_dump())
 
         return JSONResponse(
             status_code=201,
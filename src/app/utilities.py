@@ -1,10 +1,7 @@
-import logging
 from typing import Any, Dict
 
-import emails
-from emails.template import JinjaTemplate
-
 from app.config import settings
+from app.mail import get_mail_service
 
 
 def send_email(
@@ -14,27 +11,5 @@ def send_email(
     environment: Dict[str, Any] = {},
 ) -> None:
     assert settings.EMAILS_ENABLED, "no provided configuration for email variables"
-    message = emails.Message(
-        subject=JinjaTemplate(subject_template),
-        html=JinjaTemplate(html_template),
-        mail_from=(settings.EMAILS_FROM_NAME, settings.EMAILS_FROM_EMAIL),
-    )
-    smtp_options = {"host": settings.SMTP_HOST, "port": settings.SMTP_PORT}
-
-    if settings.SMTP_TLS:
-        # https://python-emails.readthedocs.io/en/latest/
-        smtp_options["tls"] = False
-    elif settings.SMTP_SSL:
-        smtp_options["ssl"] = True
-
-    if settings.SMTP_USER:
-        smtp_options["user"] = settings.SMTP_USER
-    if settings.SMTP_PASSWORD:
-        smtp_options["password"] = settings.SMTP_PASSWORD
-    # Add common template environment elements
-    environment["server_host"] = settings.SERVER_HOST
-    environment["server_name"] = settings.SERVER_NAME
-    environment["server_bot"] = settings.SERVER_BOT
-    response = message.send(to=email_to, render=environment, smtp=smtp_options)
-    logging.info(f"send email result: {response}")
-    print(environment, smtp_options, "email sent well")
+    mail_service = get_mail_service()
+    mail_service.send(mail_service.render_string(email_to, subject_template, html_template, environment))
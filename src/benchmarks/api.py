@@ -0,0 +1,215 @@
+"""Latency and throughput of the hot API endpoints at increasing concurrency.
+
+Seeds the database, then sends `--requests` requests per scenario at each
+concurrency level and prints a JSON report, keep one per commit and diff
+them with `benchmarks.compare`. Run from `src/` with the app settings in the
+environment and MONGO_DATABASE pointing at a throwaway database:
+
+    python -m benchmarks.api --concurrency 1,16,64 --requests 500 --drop > before.json
+
+By default the app runs in-process, so the client shares the event loop with
+it. Pass `--base-url` to drive a running server that uses the same database,
+or `--mongomock` to run without MongoDB (needs the `mongomock-motor` package,
+numbers are then only comparable with other `--mongomock` runs).
+"""
+import argparse
+import asyncio
+import hashlib
+import hmac
+import itertools
+import json
+import subprocess
+import time
+from dataclasses import asdict
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+import httpx
+
+from app.config import settings
+from benchmarks import seed
+from benchmarks.stats import summarize
+
+PREFIX = settings.API_V1_STR
+SCENARIOS = ["login", "list", "detail", "featured", "category", "webhook"]
+
+
+def _use_mongomock() -> None:
+    try:
+        from mongomock_motor import AsyncMongoMockClient
+    except ImportError:
+        raise SystemExit("--mongomock needs the mongomock-motor package")
+    from odmantic import AIOEngine
+    from app.db import session
+
+    client = AsyncMongoMockClient()
+    instance = object.__new__(session._MongoClientSingleton)
+    instance.mongo_client = client
+    instance.engine = AIOEngine(client=client, database=settings.MONGO_DATABASE)
+    session._MongoClientSingleton.instance = instance
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _webhook_request(reference: str, email: str, project_id: str) -> Dict[str, Any]:
+    body = json.dumps({
+        "event": "charge.success",
+        "data": {
+            "reference": reference,
+            "amount": 500000,
+            "customer": {"email": email},
+            "metadata": {"project_id": project_id},
+        },
+    }).encode()
+    signature = hmac.new(settings.PAYSTACK_SECRET_KEY.encode(), msg=body, digestmod=hashlib.sha512).hexdigest()
+    return {
+        "method": "POST",
+        "url": f"{PREFIX}/payment/webhook/",
+        "content": body,
+        "headers": {"x-paystack-signature": signature, "content-type": "application/json"},
+    }
+
+
+def _scenarios(fixture: seed.Fixture, token: str, run_id: str) -> Dict[str, Callable[[int], Dict[str, Any]]]:
+    """Build the `i`-th request of each scenario, spread over the seeded data."""
+    emails, project_ids, category_ids = fixture.emails, fixture.project_ids, fixture.category_ids
+    return {
+        "login": lambda i: {
+            "method": "POST",
+            "url": f"{PREFIX}/auth/login/oauth",
+            "data": {"username": emails[i % len(emails)], "password": seed.PASSWORD},
+        },
+        "list": lambda i: {"method": "GET", "url": f"{PREFIX}/projects/", "params": {"fields": "card"}},
+        "detail": lambda i: {
+            "method": "GET",
+            "url": f"{PREFIX}/projects/{project_ids[i % len(project_ids)]}",
+            "headers": {"Authorization": f"Bearer {token}"},
+        },
+        "featured": lambda i: {"method": "GET", "url": f"{PREFIX}/featured-projects/"},
+        "category": lambda i: {
+            "method": "GET",
+            "url": f"{PREFIX}/projects/filter/category",
+            "params": {"category": category_ids[i % len(category_ids)], "fields": "card"},
+        },
+        # A fresh reference each time, so every delivery queues a job
+        "webhook": lambda i: _webhook_request(
+            f"bench-{run_id}-{i}", emails[i % len(emails)], project_ids[i % len(project_ids)]
+        ),
+    }
+
+
+async def _run_level(
+    client: httpx.AsyncClient, build: Callable[[int], Dict[str, Any]], concurrency: int, requests: int, offset: int
+) -> Dict[str, float]:
+    latencies: List[float] = []
+    errors = 0
+    numbers = iter(range(offset, offset + requests))
+
+    async def worker() -> None:
+        nonlocal errors
+        for i in numbers:
+            request = build(i)
+            started = time.perf_counter()
+            try:
+                response = await client.request(**request)
+                ok = response.status_code < 400
+            except httpx.HTTPError:
+                ok = False
+            latencies.append(time.perf_counter() - started)
+            errors += not ok
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return {**summarize(latencies, time.perf_counter() - started), "errors": errors}
+
+
+async def _login(client: httpx.AsyncClient, email: str) -> str:
+    response = await client.post(
+        f"{PREFIX}/auth/login/oauth", data={"username": email, "password": seed.PASSWORD}
+    )
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+
+async def main(args: argparse.Namespace) -> None:
+    volumes = seed.volumes_from_arguments(args)
+    if args.mongomock:
+        _use_mongomock()
+    from app.db.indexes import ensure_indexes
+    from app.db.session import MongoDatabase, get_engine
+
+    db = MongoDatabase()
+    if args.drop:
+        await seed.drop(db)
+    if not args.mongomock:
+        await ensure_indexes(get_engine())
+    fixture = await seed.seed(db, volumes, random_seed=args.random_seed)
+    if not (fixture.emails and fixture.project_ids and fixture.category_ids):
+        raise SystemExit("The scenarios need at least one user, project and category")
+
+    if args.base_url:
+        client = httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout)
+    else:
+        from app.main import app
+
+        client = httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app), base_url="http://benchmark", timeout=args.timeout
+        )
+
+    results: Dict[str, Dict[str, Dict[str, float]]] = {}
+    async with client:
+        token = await _login(client, fixture.emails[0])
+        scenarios = _scenarios(fixture, token, run_id=f"{time.time_ns():x}")
+        offset = itertools.count(step=args.requests + args.warmup)
+        for name in args.scenarios:
+            build = scenarios[name]
+            results[name] = {}
+            for concurrency in args.concurrency:
+                start = next(offset)
+                # Warm connections and caches, not part of the numbers
+                await _run_level(client, build, concurrency, args.warmup, start)
+                results[name][str(concurrency)] = await _run_level(
+                    client, build, concurrency, args.requests, start + args.warmup
+                )
+
+    report = {
+        "benchmark": "api",
+        "commit": _git_commit(),
+        "created": datetime.now().replace(microsecond=0).isoformat(),
+        "target": args.base_url or ("in-process, mongomock" if args.mongomock else "in-process"),
+        "requests_per_level": args.requests,
+        "volumes": asdict(volumes),
+        "results": results,
+    }
+    print(json.dumps(report, indent=2))
+
+
+def _csv(kind: Callable[[str], Any]) -> Callable[[str], List[Any]]:
+    return lambda value: [kind(item.strip()) for item in value.split(",") if item.strip()]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scenarios", type=_csv(str), default=SCENARIOS, help=f"comma separated, of {','.join(SCENARIOS)}")
+    parser.add_argument("--concurrency", type=_csv(int), default=[1, 16, 64], help="comma separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=200, help="measured requests per scenario and level")
+    parser.add_argument("--warmup", type=int, default=20, help="unmeasured requests sent before each level")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--base-url", default=None, help="drive a running server instead of the app in-process")
+    parser.add_argument("--mongomock", action="store_true", help="run in-process against an in-memory database")
+    parser.add_argument("--drop", action="store_true", help="drop the seeded collections first")
+    seed.add_volume_arguments(parser)
+    args = parser.parse_args()
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+    if args.mongomock and args.base_url:
+        parser.error("--mongomock only applies to the in-process app")
+    asyncio.run(main(args))
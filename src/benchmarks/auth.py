@@ -0,0 +1,60 @@
+"""Per-request cost of the auth dependency chain, with and without the verified token cache.
+
+Resolves the current user from bearer tokens the way `get_current_user` does
+for every authenticated request. The users are in the user cache, so what is
+left is verifying the token. Run from `src/` with the app settings in the
+environment:
+
+    python -m benchmarks.auth --tokens 100 --requests 20000
+"""
+import argparse
+import asyncio
+import json
+import time
+from typing import Dict, List
+
+from odmantic import ObjectId
+
+from app.auth import deps, security
+from app.user.crud import user_cache
+from app.user.models import User
+from benchmarks.stats import summarize
+
+
+async def _run(tokens: List[str], requests: int, cached: bool) -> Dict[str, float]:
+    deps.verified_tokens.clear()
+    latencies: List[float] = []
+    started = time.perf_counter()
+    for i in range(requests):
+        if not cached:
+            deps.verified_tokens.clear()
+        call_started = time.perf_counter()
+        token_data = await deps.get_access_token_payload(tokens[i % len(tokens)])
+        await deps.get_current_user(db=None, token_data=token_data)
+        latencies.append(time.perf_counter() - call_started)
+    return summarize(latencies, time.perf_counter() - started)
+
+
+async def main(token_count: int, requests: int) -> None:
+    tokens = []
+    for i in range(token_count):
+        user = User(id=ObjectId(), email=f"bench{i}@bench.example.com", verification_pin="000000")
+        user_cache.set(str(user.id), user, ttl=3600)
+        tokens.append(security.create_access_token(subject=user.id))
+
+    report = {
+        "benchmark": "auth",
+        "tokens": token_count,
+        "requests": requests,
+        "uncached": await _run(tokens, requests, cached=False),
+        "cached": await _run(tokens, requests, cached=True),
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tokens", type=int, default=100)
+    parser.add_argument("--requests", type=int, default=20000)
+    args = parser.parse_args()
+    asyncio.run(main(args.tokens, args.requests))
@@ -0,0 +1,83 @@
+"""Compare two benchmark reports, such as the ones of two commits.
+
+Every summary found in both reports is listed with the change of its
+latencies and throughput. Exits with status 1 when a p95 latency grew, or a
+throughput dropped, by more than `--threshold` percent:
+
+    python -m benchmarks.compare before.json after.json --threshold 10
+"""
+import argparse
+import json
+import sys
+from typing import Any, Dict, Iterator, List, Tuple
+
+METRICS = ("p50_ms", "p95_ms", "p99_ms", "rps")
+
+
+def summaries(report: Dict[str, Any], path: Tuple[str, ...] = ()) -> Iterator[Tuple[str, Dict[str, float]]]:
+    """Yield `(path, summary)` for every `benchmarks.stats.summarize` result in the report."""
+    for key, value in report.items():
+        if not isinstance(value, dict):
+            continue
+        if "p50_ms" in value:
+            yield "/".join(path + (key,)), value
+        else:
+            yield from summaries(value, path + (key,))
+
+
+def change(before: float, after: float) -> float:
+    """Relative change in percent, 0 when there is nothing to compare to."""
+    return round((after - before) / before * 100, 1) if before else 0.0
+
+
+def compare(before: Dict[str, Any], after: Dict[str, Any], threshold: float) -> Tuple[List[Dict[str, Any]], List[str]]:
+    after_summaries = dict(summaries(after))
+    rows, regressions = [], []
+    for path, old in summaries(before):
+        new = after_summaries.get(path)
+        if new is None:
+            continue
+        row: Dict[str, Any] = {"path": path}
+        for metric in METRICS:
+            row[metric] = [old.get(metric, 0.0), new.get(metric, 0.0), change(old.get(metric, 0.0), new.get(metric, 0.0))]
+        rows.append(row)
+        # Latency regresses upwards, throughput downwards
+        if row["p95_ms"][2] > threshold or row["rps"][2] < -threshold:
+            regressions.append(path)
+    return rows, regressions
+
+
+def main(before_path: str, after_path: str, threshold: float, as_json: bool) -> int:
+    with open(before_path) as f:
+        before = json.load(f)
+    with open(after_path) as f:
+        after = json.load(f)
+    rows, regressions = compare(before, after, threshold)
+
+    if as_json:
+        print(json.dumps({
+            "before": before.get("commit"),
+            "after": after.get("commit"),
+            "threshold": threshold,
+            "rows": rows,
+            "regressions": regressions,
+        }, indent=2))
+    else:
+        print(f"{before.get('commit') or before_path} -> {after.get('commit') or after_path}")
+        width = max((len(row["path"]) for row in rows), default=4)
+        print(f"{'path':<{width}}  " + "  ".join(f"{metric:>24}" for metric in METRICS))
+        for row in rows:
+            cells = [f"{old:>9} {new:>9} {pct:>+4}%" for old, new, pct in (row[metric] for metric in METRICS)]
+            flag = "  <- regression" if row["path"] in regressions else ""
+            print(f"{row['path']:<{width}}  " + "  ".join(f"{cell:>24}" for cell in cells) + flag)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("before")
+    parser.add_argument("after")
+    parser.add_argument("--threshold", type=float, default=10.0, help="allowed change in percent")
+    parser.add_argument("--json", action="store_true", help="print the comparison as JSON")
+    args = parser.parse_args()
+    sys.exit(main(args.before, args.after, args.threshold, args.json))
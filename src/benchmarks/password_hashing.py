@@ -0,0 +1,77 @@
+"""Login latency under concurrent load, Argon2 run inline versus on the hashing pool.
+
+Each simulated client logs in repeatedly while a heartbeat task measures how
+long the event loop stays blocked. Run from `src/` with the app settings in the
+environment:
+
+    python -m benchmarks.password_hashing --clients 16 --logins 8
+"""
+import argparse
+import asyncio
+import json
+import time
+from typing import Awaitable, Callable, Dict, List
+
+from app.auth import security
+from benchmarks.stats import summarize
+
+PASSWORD = "Password123!"
+
+
+async def _heartbeat(lags: List[float], stop: asyncio.Event, interval: float = 0.005) -> None:
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append(time.perf_counter() - started - interval)
+
+
+async def _run(login: Callable[[], Awaitable[bool]], clients: int, logins: int) -> Dict[str, Dict[str, float]]:
+    latencies: List[float] = []
+    lags: List[float] = []
+    stop = asyncio.Event()
+
+    async def client() -> None:
+        for _ in range(logins):
+            started = time.perf_counter()
+            # A request yields to the loop before it gets to the password
+            # check (body parsing, user lookup), so time spent queued behind
+            # other blocked requests counts towards its latency
+            await asyncio.sleep(0)
+            assert await login()
+            latencies.append(time.perf_counter() - started)
+
+    heartbeat = asyncio.create_task(_heartbeat(lags, stop))
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(clients)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await heartbeat
+    return {"login": summarize(latencies, elapsed), "event_loop_lag": summarize(lags, elapsed)}
+
+
+async def main(clients: int, logins: int) -> None:
+    hashed = security.get_password_hash(PASSWORD)
+
+    async def inline_login() -> bool:
+        return security.verify_password_hash(plain_password=PASSWORD, hashed_password=hashed)
+
+    async def pooled_login() -> bool:
+        return await security.verify_password_hash_async(plain_password=PASSWORD, hashed_password=hashed)
+
+    report = {
+        "benchmark": "password_hashing",
+        "clients": clients,
+        "logins_per_client": logins,
+        "workers": security.settings.PASSWORD_HASH_WORKERS,
+        "inline": await _run(inline_login, clients, logins),
+        "pooled": await _run(pooled_login, clients, logins),
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--logins", type=int, default=8)
+    args = parser.parse_args()
+    asyncio.run(main(args.clients, args.logins))
@@ -0,0 +1,184 @@
+"""Fill a database with generated users, projects, backers and payments.
+
+The data is reproducible for a given `--random-seed`. Every user shares the
+password `PASSWORD`, so the login benchmark can use any of them. Run from
+`src/` with MONGO_DATABASE pointing at a throwaway database:
+
+    python -m benchmarks.seed --users 1000 --projects 5000 --backers 50000 --drop
+"""
+import argparse
+import asyncio
+import json
+import logging
+import random
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, Dict, List
+
+from motor.core import AgnosticDatabase
+from odmantic import ObjectId
+
+from app.auth import security
+from app.contribution.models import Contribution
+from app.db.indexes import ensure_indexes
+from app.db.session import MongoDatabase, get_engine
+from app.featured.models import Featured
+from app.payment.models import Payment
+from app.project.models import Project
+from app.user.models import User
+
+logger = logging.getLogger(__name__)
+
+PASSWORD = "Password123!"
+EMAIL_DOMAIN = "bench.example.com"
+CATEGORY_NAMES = ["Education", "Health", "Environment", "Technology", "Community", "Arts", "Sports", "Relief"]
+COLLECTIONS = ["user", "token", "project", "projectcategories", "contribution", "payment", "featured", "job"]
+WORDS = (
+    "clean water school library solar farm clinic bridge garden youth music "
+    "housing market books laptops well road training kitchen theatre rescue"
+).split()
+BATCH_SIZE = 1000
+
+
+@dataclass
+class Volumes:
+    users: int = 200
+    projects: int = 1000
+    backers: int = 5000
+    payments: int = 2000
+    featured: int = 20
+    categories: int = len(CATEGORY_NAMES)
+
+
+@dataclass
+class Fixture:
+    """What the benchmarks need to know about the seeded data."""
+    user_ids: List[str] = field(default_factory=list)
+    emails: List[str] = field(default_factory=list)
+    project_ids: List[str] = field(default_factory=list)
+    category_ids: List[str] = field(default_factory=list)
+
+
+def _sentence(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize()
+
+
+async def _insert(collection, documents: List[Dict[str, Any]]) -> None:
+    for start in range(0, len(documents), BATCH_SIZE):
+        await collection.insert_many(documents[start:start + BATCH_SIZE], ordered=False)
+
+
+async def seed(db: AgnosticDatabase, volumes: Volumes, *, random_seed: int = 0) -> Fixture:
+    rng = random.Random(random_seed)
+    fixture = Fixture()
+    now = datetime.now().replace(microsecond=0)
+    # Hashing is deliberately slow, every user gets the same hash
+    hashed_password = security.get_password_hash(PASSWORD)
+
+    categories = [{"name": CATEGORY_NAMES[i % len(CATEGORY_NAMES)]} for i in range(volumes.categories)]
+    if categories:
+        result = await db.projectcategories.insert_many(categories)
+        fixture.category_ids = [str(id) for id in result.inserted_ids]
+
+    users = []
+    for i in range(volumes.users):
+        user = User(
+            email=f"user{i}@{EMAIL_DOMAIN}",
+            full_name=f"Bench User {i}",
+            hashed_password=hashed_password,
+            email_validated=True,
+            verification_pin="000000",
+            is_superuser=False,
+        )
+        users.append(user.model_dump_doc())
+        fixture.user_ids.append(str(user.id))
+        fixture.emails.append(user.email)
+    await _insert(db.user, users)
+
+    owner_ids = [user["_id"] for user in users] or [ObjectId()]
+    projects = []
+    for i in range(volumes.projects):
+        project = Project(
+            name=f"Project {i} {_sentence(rng, 2)}",
+            title=_sentence(rng, 5),
+            about=_sentence(rng, 30),
+            story=_sentence(rng, 120),
+            address=f"{i} Bench Street",
+            state=rng.choice(["Lagos", "Abuja", "Enugu", "Kano", "Oyo"]),
+            amount=rng.randrange(10_000, 1_000_000, 1000),
+            categories=rng.choice(fixture.category_ids) if fixture.category_ids else "",
+            user_id=rng.choice(owner_ids),
+            created=now - timedelta(minutes=volumes.projects - i),
+        )
+        projects.append(project.model_dump_doc())
+        fixture.project_ids.append(str(project.id))
+
+    contributions = []
+    for i in range(volumes.backers if projects else 0):
+        project = rng.choice(projects)
+        amount = rng.randrange(500, 50_000, 500)
+        project["raised_amount"] += amount
+        project["backer_count"] += 1
+        contribution = Contribution(
+            project_id=project["_id"],
+            backer_name=f"Bench User {i % max(volumes.users, 1)}",
+            backer=f"user{i % max(volumes.users, 1)}@{EMAIL_DOMAIN}",
+            amount=amount,
+            reference=f"bench-contribution-{i}",
+        )
+        contributions.append(contribution.model_dump_doc())
+    await _insert(db.project, projects)
+    await _insert(db.contribution, contributions)
+
+    payments = []
+    for i in range(volumes.payments if projects else 0):
+        payment = Payment(
+            first_name="Bench",
+            last_name=f"User {i}",
+            email=f"user{i % max(volumes.users, 1)}@{EMAIL_DOMAIN}",
+            amount=rng.randrange(500, 50_000, 500),
+            reference=f"bench-payment-{i}",
+            project_id=rng.choice(fixture.project_ids),
+        )
+        payments.append(payment.model_dump_doc())
+    await _insert(db.payment, payments)
+
+    featured_ids = fixture.project_ids[-volumes.featured:] if volumes.featured else []
+    featured = [Featured(project_id=project_id).model_dump_doc() for project_id in featured_ids]
+    await _insert(db.featured, featured)
+    return fixture
+
+
+async def drop(db: AgnosticDatabase) -> None:
+    for name in COLLECTIONS:
+        await db.drop_collection(name)
+
+
+async def main(volumes: Volumes, random_seed: int, drop_first: bool) -> None:
+    db = MongoDatabase()
+    if drop_first:
+        await drop(db)
+    await ensure_indexes(get_engine())
+    fixture = await seed(db, volumes, random_seed=random_seed)
+    logger.info(f"Seeded {db.name}")
+    print(json.dumps({"volumes": asdict(volumes), "category_ids": fixture.category_ids}, indent=2))
+
+
+def add_volume_arguments(parser: argparse.ArgumentParser) -> None:
+    defaults = Volumes()
+    for name in asdict(defaults):
+        parser.add_argument(f"--{name}", type=int, default=getattr(defaults, name))
+    parser.add_argument("--random-seed", type=int, default=0)
+
+
+def volumes_from_arguments(args: argparse.Namespace) -> Volumes:
+    return Volumes(**{name: getattr(args, name) for name in asdict(Volumes())})
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    add_volume_arguments(parser)
+    parser.add_argument("--drop", action="store_true", help="drop the seeded collections first")
+    args = parser.parse_args()
+    asyncio.run(main(volumes_from_arguments(args), args.random_seed, args.drop))
@@ -0,0 +1,130 @@
+"""Time to render the list_projects and get_payments envelopes, before and after EnvelopeResponse.
+
+Builds the documents both handlers get from MongoDB in memory and renders
+them the old way (models where the handler built them, jsonable_encoder,
+then JSONResponse with the stdlib json) and through EnvelopeResponse. Run
+from `src/` with the app settings in the environment:
+
+    python -m benchmarks.serialization --items 10000 --repeat 20
+"""
+import argparse
+import json
+import random
+import time
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from odmantic import ObjectId
+
+from app.payment.models import Payment
+from app.project.models import Project
+from app.project.utils import build_projection, serialize_project
+from app.responses import EnvelopeResponse, dumps, raw_json
+from benchmarks.seed import EMAIL_DOMAIN, _sentence
+from benchmarks.stats import summarize
+
+
+def _project_documents(items: int, rng: random.Random) -> List[Dict[str, Any]]:
+    """Project cards as get_list_project returns them."""
+    now = datetime.now().replace(microsecond=0)
+    projection = build_projection(None)
+    documents = []
+    for i in range(items):
+        document = Project(
+            name=f"Project {i} {_sentence(rng, 2)}",
+            title=_sentence(rng, 5),
+            address=f"{i} Bench Street",
+            state="Lagos",
+            amount=rng.randrange(10_000, 1_000_000, 1000),
+            categories=str(ObjectId()),
+            user_id=ObjectId(),
+            created=now - timedelta(minutes=i),
+        ).model_dump_doc()
+        card = {key: value for key, value in document.items() if key in projection or key == "_id"}
+        documents.append(serialize_project(card))
+    return documents
+
+
+def _payment_documents(items: int, rng: random.Random) -> List[Dict[str, Any]]:
+    """Payments as stored, with `_id`."""
+    return [
+        Payment(
+            first_name="Bench",
+            last_name=f"User {i}",
+            email=f"user{i}@{EMAIL_DOMAIN}",
+            amount=rng.randrange(500, 50_000, 500),
+            reference=f"bench-payment-{i}",
+            project_id=str(ObjectId()),
+        ).model_dump_doc()
+        for i in range(items)
+    ]
+
+
+def _time(render: Callable[[], bytes], repeat: int) -> Dict[str, float]:
+    latencies = []
+    size = 0
+    started = time.perf_counter()
+    for _ in range(repeat):
+        call_started = time.perf_counter()
+        size = len(render())
+        latencies.append(time.perf_counter() - call_started)
+    return {**summarize(latencies, time.perf_counter() - started), "bytes": size}
+
+
+def main(items: int, repeat: int) -> None:
+    rng = random.Random(0)
+    projects = _project_documents(items, rng)
+    payments = _payment_documents(items, rng)
+    cached_page = dumps(projects).decode()
+    message = "Projects retrieved successfully"
+
+    def projects_before() -> bytes:
+        content = {"status": "success", "message": message, "data": jsonable_encoder(projects), "next_cursor": None}
+        return JSONResponse(content).body
+
+    def projects_after() -> bytes:
+        return EnvelopeResponse(projects, message=message, extra={"next_cursor": None}).body
+
+    def projects_cached() -> bytes:
+        return EnvelopeResponse(raw_json(cached_page), message=message, extra={"next_cursor": None}).body
+
+    def payments_before() -> bytes:
+        models = []
+        for document in payments:
+            document = dict(document, id=str(document["_id"]))
+            del document["_id"]
+            models.append(Payment(**document))
+        content = {"status": "success", "message": "payments", "data": jsonable_encoder(models)}
+        return JSONResponse(content).body
+
+    def payments_after() -> bytes:
+        documents = [{"id": document["_id"], **{k: v for k, v in document.items() if k != "_id"}} for document in payments]
+        return EnvelopeResponse(documents, message="payments").body
+
+    assert json.loads(projects_before())["data"] == json.loads(projects_after())["data"]
+    assert json.loads(payments_before())["data"] == json.loads(payments_after())["data"]
+    report = {
+        "benchmark": "serialization",
+        "items": items,
+        "repeat": repeat,
+        "list_projects": {
+            "before": _time(projects_before, repeat),
+            "after": _time(projects_after, repeat),
+            "after_cache_hit": _time(projects_cached, repeat),
+        },
+        "get_payments": {
+            "before": _time(payments_before, repeat),
+            "after": _time(payments_after, repeat),
+        },
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--items", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    main(args.items, args.repeat)